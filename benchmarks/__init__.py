@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the BibTex parser and import path, see `python -m benchmarks --help`.
+"""
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'publications_bootstrap.tests.settings')
+
+if __name__ == "__main__":
+    from . import generator, suite
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmarks of the BibTex parser and import path.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(generator.SIZES),
+                        help='number of entries of the synthetic bibliographies')
+    parser.add_argument('--stages', nargs='+', choices=suite.STAGES, default=list(suite.STAGES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs per stage, the best is kept')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results of a previous run to compare with')
+    parser.add_argument('--generate', metavar='PATH',
+                        help='only write a synthetic bibliography of the first size to this file')
+    args = parser.parse_args()
+
+    if args.generate:
+        generator.write(args.generate, args.sizes[0], args.seed)
+        sys.exit(0)
+
+    django.setup()
+    results = suite.run(args.sizes, args.seed, args.repeat, args.stages)
+    if args.output:
+        suite.dump(results, args.output)
+    if args.compare:
+        for line in suite.compare(suite.load(args.compare), results):
+            print(line)
+    elif not args.output:
+        print(json.dumps(results, indent=2, sort_keys=True))
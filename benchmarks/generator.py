@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic generator of synthetic bibliographies in BibTex format.
+
+The same size and seed always produce the same bibliography, so that results can be compared across commits. Entries
+include TeX-escaped and unicode accents, nested braces (up to the two levels supported by the parser), long author
+lists and some of the edge cases found in real-world exports: uppercase entry types, quoted and bare values, month
+macros, line breaks in URLs, escaped percent signs, ``@`` signs within values and comments between entries.
+"""
+from __future__ import unicode_literals
+
+import io
+import random
+
+SIZES = (1000, 10000, 100000)
+
+GIVEN_NAMES = ['Matthias', 'Jörn-Philipp', 'Ralf M.', 'Lucas', 'Sebastian', 'Jakob', 'Haluk', 'Syed Abbas Ali',
+               'Constantin R.', 'Julie A.', 'Shwetak N', 'Marc', 'Zoë', 'François', 'Nuño', 'Åsa', 'Ψυχή', 'C F']
+FAMILY_NAMES = ['Bethge', 'Lies', 'H{\\"a}fner', 'Theis', 'Gerwinn', 'Macke', 'Do{\\u{g}}an', 'Shah', 'Simovski',
+                'Kientz', 'Patel', 'Bourqui', 'M{\\"u}ller', 'Gau{\\ss}', 'van der Markt', 'von Neumann',
+                'Schr\\"odinger', 'Fran\\c{c}ois', 'Kümmerer', 'Jiménez']
+SUFFIXES = ['', '', '', '', '', '', 'Jr.', 'III']
+WORDS = ['neural', 'coding', 'sparse', 'representation', 'inference', 'saliency', 'population', 'dynamics',
+         'galaxy', 'metamaterials', 'alignment', 'estimation', 'Bayesian', 'optimal', 'natural', 'images', 'noise',
+         'correlations', 'spiking', 'model', 'learning', 'deep', 'features', 'cortex', 'retina']
+# values are enclosed in braces, so decorations nest at most one more level: the parser supports two levels only
+TITLE_DECORATIONS = ['{DNA} sequencing of {\\em E. coli}', '$L_p$-spherical', 'How good is 85\\%?',
+                     'The {M}arkov property of {Gaussian} {P}rocesses', '{\\"U}ber die {S}ch{\\"a}rfe',
+                     '$\\alpha$-stable L{\\\'e}vy flights']
+JOURNALS = ['Neural Computation', 'PLoS Computational Biology', 'J. Opt.', 'Monthly Notices of the Royal Astronomical '
+            'Society', 'Frontiers in Neural Circuits', 'CoRR']
+PUBLISHERS = ['Springer', 'Oxford University Press', '{IEEE}', 'ACM', 'MIT Press']
+COUNTRIES = ['CH', 'USA', 'Germany', 'Wallis and Futuna', 'Narnia']
+MONTHS = ['jan', 'feb', 'Mar', '"April"', '{may}', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec', '"Foo"']
+ENTRY_TYPES = ['article', 'article', 'article', 'ARTICLE', 'inproceedings', 'inproceedings', 'conference', 'book',
+               'manual', 'techreport', 'incollection', 'inbook', 'misc']
+
+
+def _author(rng):
+    name = '{}, {}'.format(rng.choice(FAMILY_NAMES), rng.choice(GIVEN_NAMES))
+    suffix = rng.choice(SUFFIXES)
+    return '{} {}'.format(name, suffix) if suffix else name
+
+
+def _authors(rng):
+    roll = rng.random()
+    if roll < 0.02:
+        count = rng.randint(50, 200)  # consortium papers
+    elif roll < 0.2:
+        count = rng.randint(8, 30)
+    else:
+        count = rng.randint(1, 7)
+    return ' and\n              '.join(_author(rng) for _ in range(count))
+
+
+def _title(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(3, 14))]
+    words[0] = words[0].capitalize()
+    if rng.random() < 0.3:
+        words.insert(rng.randint(0, len(words)), rng.choice(TITLE_DECORATIONS))
+    return ' '.join(words)
+
+
+def entry(index, rng):
+    """
+    Returns a single BibTex entry as a string.
+    """
+    entry_type = rng.choice(ENTRY_TYPES)
+    year = rng.randint(1950, 2024)
+    fields = [
+        ('author', '{' + _authors(rng) + '}'),
+        ('title', '{' + _title(rng) + '}' if rng.random() < 0.8 else '"' + _title(rng) + '"'),
+        ('year', str(year) if rng.random() < 0.5 else '{' + str(year) + '}'),
+    ]
+    if entry_type.lower() == 'article':
+        fields.append(('journal', '{' + rng.choice(JOURNALS) + '}'))
+        fields.append(('volume', '{' + str(rng.randint(1, 400)) + '}'))
+        fields.append(('number', '{' + str(rng.randint(1, 12)) + '}'))
+    else:
+        fields.append(('booktitle', '{Proceedings of the ' + _title(rng) + '}'))
+        fields.append(('publisher', '{' + rng.choice(PUBLISHERS) + '}'))
+    if rng.random() < 0.7:
+        first = rng.randint(1, 1000)
+        fields.append(('pages', '{' + '{}--{}'.format(first, first + rng.randint(1, 40)) + '}'))
+    if rng.random() < 0.6:
+        fields.append(('month', rng.choice(MONTHS)))
+    if rng.random() < 0.5:
+        fields.append(('doi', '{10.' + str(1000 + index % 9000) + '/synthetic.' + str(index) + '}'))
+    if rng.random() < 0.3:
+        fields.append(('url', '{http://example.org/' + str(index) + '/\n                  a=' + str(rng.random())
+                       + '}'))
+    if rng.random() < 0.2:
+        fields.append(('country', '{' + rng.choice(COUNTRIES) + '}'))
+    if rng.random() < 0.2:
+        fields.append(('note', '{Contact: author' + str(index) + '@example.org}'))
+    if rng.random() < 0.3:
+        fields.append(('keywords', '{' + ', '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))) + '}'))
+    if rng.random() < 0.1:
+        fields.append(('abstract', '{' + ' '.join(_title(rng) + '.' for _ in range(rng.randint(3, 20))) + '}'))
+    rng.shuffle(fields)
+    body = ',\n'.join('  {:<9} = {}'.format(key, value) for key, value in fields)
+    return '@{}{{synthetic:{},\n{}\n}}\n'.format(entry_type, index, body)
+
+
+def generate(size, seed=0):
+    """
+    Yields the entries of a synthetic bibliography, with an occasional comment in between.
+    """
+    rng = random.Random(seed)
+    for index in range(size):
+        if rng.random() < 0.01:
+            yield '% Comment with an e-mail: someone@example.org\n\n'
+        yield entry(index, rng)
+        yield '\n'
+
+
+def bibliography(size, seed=0):
+    """
+    Returns a synthetic bibliography as a string.
+    """
+    return ''.join(generate(size, seed))
+
+
+def write(path, size, seed=0):
+    with io.open(path, 'w', encoding='utf-8') as f:
+        for chunk in generate(size, seed):
+            f.write(chunk)
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Times the stages of a BibTex import separately, and the rendering of the imported publications, and records their
+memory peaks.
+
+Stages
+------
+parse
+    `bibtex.parse` on the whole bibliography held in memory.
+iterparse
+    `bibtex.iterparse` streaming the bibliography from a file.
+type_mapping
+    Resolution of the publication type of every entry.
+model_construction
+    Creation of unsaved publications from the entries, including the parsing of the authors.
+insert
+    Batched insertion of the publications in the database, rolled back afterwards.
+flatten_authors
+    Rendering of the author list of every publication by the `flatten_authors` filter.
+flatten_authors_template
+    Same, with the former template-based rendering, for comparison.
+citations
+    Formatting of every publication with the chicago citation style.
+citations_template
+    Same, with the chicago template, for comparison.
+author_search
+    Prefix search of 1000 authors, by the first letters of their family name, in the index of all the authors.
+facets
+    Counts of all the publications by value of each facet, once the facet index is built.
+export
+    BibTex export of all the publications, streamed by chunks as with the export views.
+export_template
+    Same, rendering the whole export template at once, for comparison.
+"""
+from __future__ import unicode_literals
+
+import copy
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+from . import generator
+
+STAGES = ('parse', 'iterparse', 'type_mapping', 'model_construction', 'insert', 'flatten_authors',
+          'flatten_authors_template', 'citations', 'citations_template', 'author_search', 'facets',
+          'export', 'export_template')
+
+# Stages measured while the publications are inserted
+DATABASE_STAGES = ('facets', 'export', 'export_template')
+
+EXPORT_TEMPLATE = 'publications_bootstrap/export/publications.bib'
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _measure(func, repeat):
+    """
+    Returns the best wall time over `repeat` runs and the memory peak of an additional, traced run.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_memory': peak}
+
+
+def run_size(size, seed=0, repeat=3, stages=STAGES):
+    from django.db import transaction
+    from django.template.loader import render_to_string
+
+    from publications_bootstrap.authors import author_index
+    from publications_bootstrap.bibtex import iterparse, parse
+    from publications_bootstrap.citations import TemplateStyle, get_style, template_name
+    from publications_bootstrap.exports import stream_template
+    from publications_bootstrap.facets import facet_index, get_facets
+    from publications_bootstrap.importers import publication_from_entry, save_publications
+    from publications_bootstrap.models import Publication
+    from publications_bootstrap.registry import type_registry
+    from publications_bootstrap.templatetags.publication_extras import flatten_authors
+
+    results = {}
+    data = generator.bibliography(size, seed)
+    fd, path = tempfile.mkstemp(suffix='.bib')
+    os.close(fd)
+    try:
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+
+        entries = parse(data)
+        results['entries'] = len(entries)
+        results['bytes'] = len(data.encode('utf-8'))
+
+        def stage_parse():
+            parse(data)
+
+        def stage_iterparse():
+            with io.open(path, 'rb') as f:
+                for _ in iterparse(f):
+                    pass
+
+        def stage_type_mapping():
+            type_registry.clear()
+            for entry in entries:
+                type_registry.get_by_bibtex_type(entry['type'])
+
+        def construct():
+            # entries are modified in place during the construction
+            return [publication_from_entry(entry) for entry in copy.deepcopy(entries)]
+
+        def stage_model_construction():
+            construct()
+
+        publications = construct()
+
+        def stage_insert():
+            try:
+                with transaction.atomic():
+                    save_publications(iter(publications))
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            authors = [publication.authors_escaped() for publication in publications]
+
+        def stage_flatten_authors():
+            for publication_authors in authors:
+                flatten_authors(publication_authors, 'limit=6&last=, and')
+
+        def stage_flatten_authors_template():
+            for publication_authors in authors:
+                flatten_authors(publication_authors,
+                                'limit=6&last=, and&template=publications_bootstrap/filters/authors.html')
+
+        def stage_citations():
+            get_style('chicago').format_all(publications)
+
+        def stage_citations_template():
+            TemplateStyle(template_name('chicago')).format_all(publications)
+
+        def stage_author_search():
+            for prefix in prefixes:
+                author_index.search(prefix, 10)
+
+        if 'author_search' in stages:
+            # The index is built from the inserted publications and kept in memory after the rollback
+            try:
+                with transaction.atomic():
+                    save_publications(iter(construct()))
+                    author_index.clear()
+                    prefixes = [author.key[:3] for author in author_index.all()[:1000]]
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        def stage_facets():
+            get_facets()
+
+        def stage_export():
+            for _ in stream_template(EXPORT_TEMPLATE, {'publications': Publication.objects.select_related('type')}):
+                pass
+
+        def stage_export_template():
+            render_to_string(EXPORT_TEMPLATE, {'publications': Publication.objects.select_related('type')})
+
+        funcs = {
+            'parse': stage_parse,
+            'iterparse': stage_iterparse,
+            'type_mapping': stage_type_mapping,
+            'model_construction': stage_model_construction,
+            'insert': stage_insert,
+            'flatten_authors': stage_flatten_authors,
+            'flatten_authors_template': stage_flatten_authors_template,
+            'citations': stage_citations,
+            'citations_template': stage_citations_template,
+            'author_search': stage_author_search,
+            'facets': stage_facets,
+            'export': stage_export,
+            'export_template': stage_export_template,
+        }
+        for stage in stages:
+            if stage not in DATABASE_STAGES:
+                results[stage] = _measure(funcs[stage], repeat)
+        if any(stage in DATABASE_STAGES for stage in stages):
+            try:
+                with transaction.atomic():
+                    save_publications(iter(construct()))
+                    if 'facets' in stages:
+                        facet_index.index
+                    for stage in stages:
+                        if stage in DATABASE_STAGES:
+                            results[stage] = _measure(funcs[stage], repeat)
+                    raise _Rollback
+            except _Rollback:
+                pass
+            author_index.clear()
+            facet_index.clear()
+    finally:
+        os.remove(path)
+    return results
+
+
+def metadata():
+    import django
+
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                         cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'machine': platform.machine(),
+    }
+
+
+def run(sizes=generator.SIZES, seed=0, repeat=3, stages=STAGES):
+    """
+    Runs the benchmarks against a temporary test database.
+
+    Returns
+    -------
+    dict
+        Results, serializable to JSON.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        results = {str(size): run_size(size, seed, repeat, stages) for size in sizes}
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    return {'meta': dict(metadata(), seed=seed, repeat=repeat), 'results': results}
+
+
+def compare(baseline, current):
+    """
+    Yields lines comparing two sets of results, as ratios current / baseline.
+    """
+    yield '{:>8} {:<20} {:>12} {:>12} {:>8} {:>12}'.format('size', 'stage', 'baseline (s)', 'current (s)', 'ratio',
+                                                          'memory ratio')
+    for size, stages in sorted(current['results'].items(), key=lambda item: int(item[0])):
+        for stage in STAGES:
+            if stage not in stages or stage not in baseline['results'].get(size, {}):
+                continue
+            old, new = baseline['results'][size][stage], stages[stage]
+            yield '{:>8} {:<20} {:>12.4f} {:>12.4f} {:>8.2f} {:>12.2f}'.format(
+                size, stage, old['seconds'], new['seconds'], new['seconds'] / old['seconds'],
+                new['peak_memory'] / float(old['peak_memory'] or 1))
+
+
+def dump(results, path):
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(results, indent=2, sort_keys=True))
+
+
+def load(path):
+    with io.open(path, encoding='utf-8') as f:
+        return json.load(f)
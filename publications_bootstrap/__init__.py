@@ -7,3 +7,5 @@ __docformat__ = 'numpy'
 __version__ = '2.3.1'
 __version_info__ = tuple([int(num) if num.isdigit() else num for num in __version__.replace('-', '.', 1).split('.')])
 __status__ = 'Stable'
+
+default_app_config = 'publications_bootstrap.apps.PublicationsBootstrapConfig'
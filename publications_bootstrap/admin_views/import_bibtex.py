@@ -1,163 +1,69 @@
 # -*- coding: utf-8 -*-
 
-import re
-
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
-from django_countries import countries
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 
 from ..bibtex import parse
-from ..models import Publication, Type
-
-# mapping of months
-MONTHS = {
-    'jan': 1, 'january': 1,
-    'feb': 2, 'february': 2,
-    'mar': 3, 'march': 3,
-    'apr': 4, 'april': 4,
-    'may': 5,
-    'jun': 6, 'june': 6,
-    'jul': 7, 'july': 7,
-    'aug': 8, 'august': 8,
-    'sep': 9, 'september': 9,
-    'oct': 10, 'october': 10,
-    'nov': 11, 'november': 11,
-    'dec': 12, 'december': 12}
-
-COUNTRIES_BY_CODE = dict(countries)
-# Reversed dict
-try:
-    # Python 2.7.x
-    COUNTRIES_BY_NAME = {v: k for k, v in COUNTRIES_BY_CODE.iteritems()}
-except:
-    # Python 3+
-    COUNTRIES_BY_NAME = {v: k for k, v in COUNTRIES_BY_CODE.items()}
-
-
-def import_bibtex(request):
+from ..importers import FORMAT_NAMES, PARSERS, iterparse, publication_from_entry, save_publications
+from ..registry import type_registry
+from ..validation import validate
+
+
+def _bibliography_entries(request):
+    """
+    Returns an iterator over the entries submitted, either as an uploaded file (optionally gzip-compressed) in any of
+    the supported formats or as BibTex through the text area.
+    """
+    upload = request.FILES.get('bibliography_file')
+    if upload is not None:
+        upload.seek(0)
+        format = request.POST.get('format')
+        return iterparse(upload, upload.name, format if format in PARSERS else None)
+    return iter(parse(request.POST.get('bibliography', '')))
+
+
+@csrf_protect
+def _import_bibtex(request):
     if request.method == 'POST':
-        # try to parse BibTex
-        bib = parse(request.POST['bibliography'])
-
         # container for error messages
         errors = {}
 
-        # publication types
-        types = Type.objects.all()
-
         # check for errors
-        if not bib:
-            if not request.POST['bibliography']:
-                errors['bibliography'] = 'This field is required.'
+        if 'bibliography_file' not in request.FILES and not request.POST.get('bibliography'):
+            errors['bibliography'] = 'This field is required.'
 
-        if not errors:
-            publications = []
-
-            # try adding publications
-            for entry in bib:
-                if 'title' in entry and 'author' in entry and 'year' in entry:
-                    # parse authors
-                    authors = entry['author'].split(' and ')
-                    for i in range(len(authors)):
-                        author = authors[i].split(',')
-                        author = [author[-1]] + author[:-1]
-                        authors[i] = ' '.join(author)
-                    authors = ', '.join(authors)
-
-                    # add missing keys
-                    keys = [
-                        'journal',
-                        'booktitle',
-                        'address',
-                        'publisher',
-                        'editor',
-                        'edition',
-                        'institution',
-                        'school',
-                        'organization',
-                        'series',
-                        'url',
-                        'doi',
-                        'isbn',
-                        'tags',
-                        'note',
-                        'abstract',
-                        'month']
-
-                    for key in keys:
-                        if key not in entry:
-                            entry[key] = ''
-
-                    # map integer fields to integers
-                    entry['month'] = Publication.EMonths.get(MONTHS.get(entry['month'].lower(), 0), None)
-
-                    for field in ['volume', 'number', 'chapter', 'section']:
-                        entry[field] = entry.get(field, None)
-
-                    # remove whitespace characters (likely due to line breaks)
-                    entry['url'] = re.sub(r'\s', '', entry['url'])
-
-                    if 'country' not in entry:
-                        entry['country'] = ''
-                    else:
-                        if entry['country'].strip() in COUNTRIES_BY_NAME:
-                            entry['country'] = COUNTRIES_BY_NAME[entry['country'].strip()]
-                        elif entry['country'].upper() in COUNTRIES_BY_CODE:
-                            entry['country'] = entry['country'].upper()
-                        else:
-                            entry['country'] = ''
-
-                    # determine type
-                    type_id = None
-
-                    for t in types:
-                        if entry['type'] in t.bibtex_type_list:
-                            type_id = t.id
-                            break
-
-                    if type_id is None:
-                        errors['bibliography'] = 'Type "{}" unknown.'.format(entry['type'])
-                        break
-
-                    # add publication
-                    publications.append(Publication(
-                        type_id=type_id,
-                        citekey=entry['key'],
-                        title=entry['title'],
-                        authors=authors,
-                        year=entry['year'],
-                        month=entry['month'],
-                        journal=entry['journal'],
-                        book_title=entry['booktitle'],
-                        publisher=entry['publisher'],
-                        location=entry['address'],
-                        country=entry['country'],
-                        editor=entry['editor'],
-                        edition=entry['edition'],
-                        institution=entry['institution'],
-                        school=entry['school'],
-                        organization=entry['organization'],
-                        series=entry['series'],
-                        volume=entry['volume'],
-                        number=entry['number'],
-                        chapter=entry['chapter'],
-                        section=entry['section'],
-                        note=entry['note'],
-                        url=entry['url'],
-                        doi=entry['doi'],
-                        isbn=entry['isbn'],
-                        external=False,
-                        abstract=entry['abstract'],
-                        tags=entry['tags'],
-                        status=Publication.EStatuses.PUBLISHED))
-                else:
-                    errors['bibliography'] = 'Make sure that the keys <title>, <author> and <year> are present.'
-                    break
+        if not errors and '_validate' in request.POST:
+            # dry run, nothing is written, in this process rather than in workers forked from the web server
+            report = validate(_bibliography_entries(request), workers=1)
+            return render(
+                request,
+                'admin/publications_bootstrap/import_bibtex.html', {
+                    'report': report,
+                    'report_errors': sum(1 for r in report if r['errors']),
+                    'title': 'Import BibTex',
+                    'types': type_registry.all(),
+                    'formats': FORMAT_NAMES,
+                    'request': request})
 
-            if not publications:
-                errors['bibliography'] = 'No valid BibTex entries found.'
+        count = 0
+        msg = None
+        if not errors:
+            entries = _bibliography_entries(request)
+            try:
+                # all or nothing, the whole import is rolled back on the first invalid entry
+                with transaction.atomic():
+                    count = save_publications(publication_from_entry(entry) for entry in entries)
+                    if not count:
+                        raise ValueError('No valid entries found.')
+            except ValueError as e:
+                errors['bibliography'] = str(e)
+            except Exception:
+                msg = 'Some error occurred during saving of publications.'
 
         if errors:
             # some error occurred
@@ -166,20 +72,15 @@ def import_bibtex(request):
                 'admin/publications_bootstrap/import_bibtex.html', {
                     'errors': errors,
                     'title': 'Import BibTex',
-                    'types': Type.objects.all(),
+                    'types': type_registry.all(),
+                    'formats': FORMAT_NAMES,
                     'request': request})
         else:
-            try:
-                # save publications
-                for publication in publications:
-                    publication.save()
-            except:
-                msg = 'Some error occurred during saving of publications.'
-            else:
-                if len(publications) > 1:
-                    msg = 'Successfully added {} publications.'.format(len(publications))
+            if msg is None:
+                if count > 1:
+                    msg = 'Successfully added {} publications.'.format(count)
                 else:
-                    msg = 'Successfully added {} publication.'.format(len(publications))
+                    msg = 'Successfully added {} publication.'.format(count)
 
             # show message
             messages.info(request, msg)
@@ -188,8 +89,16 @@ def import_bibtex(request):
             return HttpResponseRedirect('../')
     else:
         return render(request, 'admin/publications_bootstrap/import_bibtex.html', {'title': 'Import BibTex',
-                                                                                   'types': Type.objects.all(),
+                                                                                   'types': type_registry.all(),
+                                                                                   'formats': FORMAT_NAMES,
                                                                                    'request': request})
 
 
-import_bibtex = staff_member_required(import_bibtex)
+def import_bibtex(request):
+    # uploaded bibliographies are streamed to a temporary file instead of being held in memory, which must be set up
+    # before the CSRF check reads the request body
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+    return _import_bibtex(request)
+
+
+import_bibtex = staff_member_required(csrf_exempt(import_bibtex))
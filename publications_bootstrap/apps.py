@@ -9,8 +9,13 @@ class PublicationsBootstrapConfig(AppConfig):
     # TODO: check if dependencies are met
 
     defaults = {}
-    for param in ['bibliography', 'citation', 'marker', 'sorting']:
+    for param in ['authors_template', 'bibliography', 'cache', 'cache_control', 'citation', 'download_permission',
+                  'marker', 'sendfile', 'sendfile_url', 'sorting', 'thumbnails']:
         try:
             defaults[param] = getattr(settings, '{}_{}'.format(name.upper(), param.upper()))
         except AttributeError:
             pass
+
+    def ready(self):
+        # connect signal receivers
+        from . import authors, caching, checks, facets, registry, thumbnails  # noqa
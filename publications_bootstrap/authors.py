@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from bisect import bisect_left, insort
+from collections import namedtuple
+from functools import lru_cache
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import PUBLICATIONS, index_versions
+from .models import Publication
+
+Author = namedtuple('Author', ['key', 'name', 'slug', 'count'])
+
+
+def simplify_key(name):
+    """
+    Simplified representation of a name or prefix, as searched in the author index.
+    """
+    return ' '.join(Publication.simplify_name(name).split())
+
+
+@lru_cache(maxsize=65536)
+def _parse_author(author):
+    """
+    Returns the key (family name first) and the name of an author, parsed as when a publication is loaded.
+    """
+    # The model is not initialized, which would take most of the time when building the index
+    publication = Publication.__new__(Publication)
+    publication.authors, publication.title = author, ''
+    publication._produce_author_lists()
+    given, family = publication.authors_list_split[0]
+    return simplify_key(' '.join([family, given])), publication.authors_list[0]
+
+
+def _publication_authors(authors):
+    """
+    Returns the authors of a publication, as a mapping of their keys to their names, in their order.
+    """
+    keys = {}
+    for author in Publication.split_authors(authors):
+        if author:
+            key, name = _parse_author(author)
+            keys.setdefault(key, name)
+    return keys
+
+
+class AuthorIndex(object):
+    """
+    Process-level index of the authors of all the publications, sorted by simplified name (family name first) so that
+    they are searched by prefix without querying the database. It is built lazily on first access, updated whenever a
+    publication is saved or deleted in this process once the transaction is committed, and rebuilt when the version of
+    the publications changes in the cache, so that the changes made by other processes are seen, or every
+    `INDEX_MAX_AGE` seconds if caching is disabled.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._index = None
+
+    @staticmethod
+    def _versions():
+        return index_versions((PUBLICATIONS,))
+
+    def _build(self, versions):
+        index = {'versions': versions, 'keys': [], 'names': {}, 'counts': {}, 'publications': {}}
+        for pk, authors in Publication.objects.values_list('pk', 'authors').order_by('pk').iterator():
+            self._add(index, pk, _publication_authors(authors))
+        index['keys'].sort()
+        return index
+
+    @staticmethod
+    def _add(index, pk, authors, sort=False):
+        index['publications'][pk] = authors
+        for key, name in authors.items():
+            if key in index['counts']:
+                index['counts'][key] += 1
+                continue
+            index['counts'][key] = 1
+            index['names'][key] = name
+            if sort:
+                insort(index['keys'], key)
+            else:
+                index['keys'].append(key)
+
+    @staticmethod
+    def _remove(index, pk):
+        for key in index['publications'].pop(pk, {}):
+            index['counts'][key] -= 1
+            if not index['counts'][key]:
+                del index['counts'][key], index['names'][key]
+                del index['keys'][bisect_left(index['keys'], key)]
+
+    @property
+    def index(self):
+        versions = self._versions()
+        index = self._index
+        if index is None or index['versions'] != versions:
+            with self._lock:
+                if self._index is None or self._index['versions'] != versions:
+                    self._index = self._build(versions)
+                index = self._index
+        return index
+
+    def clear(self):
+        self._index = None
+
+    def update(self, pk, authors):
+        """
+        Updates the authors of a saved publication, if the index is built.
+        """
+        with self._lock:
+            if self._index is not None:
+                self._remove(self._index, pk)
+                self._add(self._index, pk, _publication_authors(authors), sort=True)
+
+    def remove(self, pk):
+        """
+        Removes the authors of a deleted publication, if the index is built.
+        """
+        with self._lock:
+            if self._index is not None:
+                self._remove(self._index, pk)
+
+    def _author(self, index, key):
+        name = index['names'][key]
+        return Author(key, name, name.lower().replace(' ', '+'), index['counts'][key])
+
+    def get(self, key):
+        """
+        Returns the author with the given key, or None.
+        """
+        with self._lock:
+            index = self.index
+            return self._author(index, key) if key in index['names'] else None
+
+    def all(self):
+        """
+        Returns all the authors, sorted by simplified name.
+        """
+        with self._lock:
+            index = self.index
+            return [self._author(index, key) for key in index['keys']]
+
+    def search(self, prefix, limit=None):
+        """
+        Returns the authors whose simplified name, family name first, starts with the given prefix.
+
+        Parameters
+        ----------
+        prefix : str
+        limit : int
+            Maximal number of authors returned, all by default.
+
+        Returns
+        -------
+        list of Author
+            Authors sorted by simplified name, with the number of their publications.
+        """
+        prefix = simplify_key(prefix)
+        authors = []
+        with self._lock:
+            index = self.index
+            keys = index['keys']
+            for i in range(bisect_left(keys, prefix), len(keys)):
+                if not keys[i].startswith(prefix) or len(authors) == limit:
+                    break
+                authors.append(self._author(index, keys[i]))
+        return authors
+
+
+author_index = AuthorIndex()
+
+
+@receiver(post_save, sender=Publication)
+def update_author_index(sender, instance, **kwargs):
+    # Changes rolled back are not indexed
+    pk, authors = instance.pk, instance.authors
+    transaction.on_commit(lambda: author_index.update(pk, authors))
+
+
+@receiver(post_delete, sender=Publication)
+def remove_from_author_index(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: author_index.remove(pk))
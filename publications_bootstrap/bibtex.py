@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import codecs
 import re
 
 import six
@@ -42,6 +43,9 @@ special_chars = (
     (r'{\i}', 'ı'), (r'\.{I}', 'İ'), ('\\u{g}', 'ğ'), ('\\u{G}', 'Ğ'), (r'\c{s}', 'ş'),
     (r'\c{S}', 'Ş'))  # turkish
 
+# characters delimiting BibTex entries when reading a stream, and quotes of values, but not escaped quotes (accents)
+_delimiters = re.compile(r'\\"|[@{}"]')
+
 
 def parse(string):
     """
@@ -99,3 +103,61 @@ def parse(string):
             bib[-1][key] = value
 
     return bib
+
+
+def iterparse(stream, chunk_size=64 * 1024):
+    """
+    Incrementally parses a file-like object in BibTex format and yields BibTex entries as they are read, without
+    loading the whole bibliography in memory.
+
+    @type  stream: file
+    @param stream: file-like object in BibTex format, either opened in text mode or yielding UTF-8 encoded bytes
+    @type  chunk_size: int
+    @param chunk_size: number of characters (or bytes) read at once from the stream
+
+    @rtype: generator
+    @return: dictionaries representing the entries of the bibliography, see L{parse}
+    """
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    # position up to which the buffer has already been scanned
+    offset = 0
+    # nesting level of braces, entries are complete when back to 0
+    depth = 0
+    # whether within a quoted value, whose braces are not counted, as in parse
+    quoted = False
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if not isinstance(chunk, six.text_type):
+            chunk = decoder.decode(chunk)
+        buffer += chunk
+
+        # end of the last complete entry found in the buffer
+        end = 0
+        for match in _delimiters.finditer(buffer, offset):
+            delimiter = match.group()
+            if quoted:
+                quoted = delimiter != '"'
+            elif delimiter == '"':
+                quoted = depth == 1
+            elif delimiter == '{':
+                depth += 1
+            elif delimiter == '}' and depth > 0:
+                depth -= 1
+                if depth == 0:
+                    end = match.end()
+
+        if end:
+            for entry in parse(buffer[:end]):
+                yield entry
+            buffer = buffer[end:]
+        # a backslash is scanned again, with the quote it may escape
+        offset = len(buffer) - 1 if buffer.endswith('\\') else len(buffer)
+
+    buffer += decoder.decode(b'', final=True)
+    for entry in parse(buffer):
+        yield entry
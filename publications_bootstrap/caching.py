@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Caching of rendered output, invalidated with version counters.
+
+Cached output is keyed on its arguments and on the versions of the data it depends on. Saving or deleting a model
+instance bumps the corresponding version once the transaction is committed, so that the former entries are not used
+anymore and expire from the cache, and that output rendered from the former data meanwhile is not cached under the
+new version.
+
+Caching is disabled by default. The cache must be shared by all the processes serving the application, such as
+memcached, Redis or the database cache, for the versions bumped by a process to invalidate the output cached by the
+others: the `publications_bootstrap.W001` check warns about per-process caches.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.translation import get_language
+
+try:
+    from django.urls import get_script_prefix  # Django 1.10+
+except ImportError:
+    from django.core.urlresolvers import get_script_prefix
+
+from .apps import PublicationsBootstrapConfig
+from .models import Catalog, Publication, PublicationFile, PublicationLink, Type
+
+KEY_PREFIX = 'publications_bootstrap'
+
+# Versions of all the publications, with their types, links and files, of all the catalogs, and of the publications
+# of any catalog
+PUBLICATIONS = 'publications'
+CATALOGS = 'catalogs'
+CATALOG_PUBLICATIONS = 'catalog_publications'
+
+# Maximal size of the streamed responses cached, in bytes, larger ones are only streamed, within the 1 MB limit of the
+# items of memcached
+STREAMED_MAX_SIZE = 512 * 1024
+
+# Backends not shared by the processes serving the application
+LOCAL_CACHE_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+# Lifetime of the process-level indexes when caching is disabled, in seconds, as the changes made by other processes
+# are not known then
+INDEX_MAX_AGE = 60
+
+
+def catalog_version(id_or_title):
+    """
+    Name of the version of a single catalog, given by pk or title.
+    """
+    return 'catalog:{}'.format(str(id_or_title).lower())
+
+
+def get_cache():
+    """
+    Returns the cache configured with `PUBLICATIONS_BOOTSTRAP_CACHE`, or None if caching is disabled, as by default.
+    """
+    alias = PublicationsBootstrapConfig.defaults.get('cache')
+    return caches[alias] if alias else None
+
+
+def _version_key(name):
+    return '{}:version:{}'.format(KEY_PREFIX, name)
+
+
+def _initial_version():
+    # Versions evicted from the cache start again from a later value, so that former entries are not used again
+    return int(time.time() * 1000)
+
+
+def get_versions(cache, names):
+    keys = [_version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _initial_version(), None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key) for key in keys]
+
+
+def index_versions(names):
+    """
+    Returns the versions process-level indexes built from the data of `names` are valid for: their versions in the
+    cache, or the current period of `INDEX_MAX_AGE` seconds if caching is disabled.
+    """
+    cache = get_cache()
+    if cache is None:
+        return int(time.time() // INDEX_MAX_AGE)
+    return get_versions(cache, names)
+
+
+def bump(*names):
+    """
+    Increments the given versions, invalidating the output depending on them.
+    """
+    cache = get_cache()
+    if cache is None:
+        return
+    for name in names:
+        key = _version_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def bump_on_commit(*names):
+    """
+    Increments the given versions once the current transaction, if any, is committed.
+    """
+    transaction.on_commit(lambda: bump(*names))
+
+
+def _cache_key(cache, name, args, versions):
+    # Rendered URLs and translations depend on the script prefix and language
+    parts = (args, get_versions(cache, versions), get_script_prefix(), get_language())
+    return '{}:{}:{}'.format(KEY_PREFIX, name, hashlib.md5(repr(parts).encode('utf-8')).hexdigest())
+
+
+def cached(name, args, versions, render):
+    """
+    Returns the output of `render()`, cached until any of `versions` is bumped.
+
+    Parameters
+    ----------
+    name : str
+        Name of the cached output, e.g. of the template tag rendering it.
+    args : tuple
+        Arguments the output depends on, must have a stable `repr`.
+    versions : list of str
+        Names of the versions of the data the output depends on.
+    render : callable
+        Renders the output when it is not cached.
+    """
+    cache = get_cache()
+    if cache is None:
+        return render()
+    key = _cache_key(cache, name, args, versions)
+    output = cache.get(key)
+    if output is None:
+        output = render()
+        cache.set(key, output)
+    return output
+
+
+def _is_anonymous(request):
+    user = getattr(request, 'user', None)
+    if user is None:
+        return True
+    authenticated = user.is_authenticated
+    return not (authenticated() if callable(authenticated) else authenticated)
+
+
+def _cache_streamed(cache, key, status, headers, streaming_content):
+    # Streams the content, and caches it as a regular response once it is completely sent, unless it is too large
+    content, size = [], 0
+    for chunk in streaming_content:
+        if content is not None:
+            size += len(chunk)
+            if size > STREAMED_MAX_SIZE:
+                content = None
+            else:
+                content.append(chunk)
+        yield chunk
+    if content is None:
+        return
+    response = HttpResponse(b''.join(content), status=status)
+    for header, value in headers:
+        response[header] = value
+    cache.set(key, response)
+
+
+def cache_view(*versions):
+    """
+    Decorator caching the responses of a view to anonymous GET requests until any of `versions` is bumped, and adding
+    the Cache-Control header configured by `PUBLICATIONS_BOOTSTRAP_CACHE_CONTROL` (e.g. `{'public': True,
+    'max_age': 300}`) to them.
+
+    Responses are cached by host, path and query parameters, which include the export format. Only successful
+    responses without cookies are cached, streaming responses once they are completely sent and if they are not larger
+    than `STREAMED_MAX_SIZE`.
+
+    Parameters
+    ----------
+    versions : str or callable
+        Names of the versions of the data the responses depend on, or functions of the arguments of the view returning
+        a list of names.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not _is_anonymous(request):
+                return view(request, *args, **kwargs)
+            cache = get_cache()
+            if cache is None:
+                response = view(request, *args, **kwargs)
+            else:
+                names = []
+                for version in versions:
+                    names.extend(version(*args, **kwargs) if callable(version) else [version])
+                key = _cache_key(cache, 'view', (request.scheme, request.get_host(), request.path,
+                                                 sorted(request.GET.lists())), names)
+                response = cache.get(key)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code == 200 and not response.cookies:
+                        if response.streaming:
+                            response.streaming_content = _cache_streamed(
+                                cache, key, response.status_code, list(response.items()), response.streaming_content)
+                        else:
+                            cache.set(key, response)
+            cache_control = PublicationsBootstrapConfig.defaults.get('cache_control')
+            if cache_control and response.status_code == 200:
+                patch_cache_control(response, **cache_control)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+@receiver(post_save, sender=Publication)
+@receiver(post_delete, sender=Publication)
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+@receiver(post_save, sender=PublicationLink)
+@receiver(post_delete, sender=PublicationLink)
+@receiver(post_save, sender=PublicationFile)
+@receiver(post_delete, sender=PublicationFile)
+def bump_publications(sender, **kwargs):
+    bump_on_commit(PUBLICATIONS)
+
+
+@receiver(post_save, sender=Catalog)
+@receiver(post_delete, sender=Catalog)
+def bump_catalogs(sender, **kwargs):
+    bump_on_commit(CATALOGS)
+
+
+@receiver(m2m_changed, sender=Catalog.publications.through)
+def bump_catalog(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        catalogs = [instance]
+    elif pk_set:
+        catalogs = Catalog.objects.filter(pk__in=pk_set)
+    else:
+        # The catalogs of a publication were cleared, they are not known anymore
+        bump_on_commit(CATALOGS, CATALOG_PUBLICATIONS)
+        return
+    bump_on_commit(CATALOG_PUBLICATIONS,
+                   *[catalog_version(v) for catalog in catalogs for v in (catalog.pk, catalog.title)])
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .apps import PublicationsBootstrapConfig
+from .caching import LOCAL_CACHE_BACKENDS
+
+
+@register()
+def check_cache(app_configs, **kwargs):
+    """
+    Warns if the cache of the publications is not shared by the processes serving the application, in which case the
+    changes made in a process do not invalidate the output cached by the others.
+    """
+    alias = PublicationsBootstrapConfig.defaults.get('cache')
+    if not alias:
+        return []
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        'PUBLICATIONS_BOOTSTRAP_CACHE is set to the cache "{}", which is not shared by the processes serving the '
+        'application.'.format(alias),
+        hint='Use a shared cache, such as memcached, Redis or the database cache, or set PUBLICATIONS_BOOTSTRAP_CACHE '
+             'to None.',
+        obj=backend,
+        id='publications_bootstrap.W001',
+    )]
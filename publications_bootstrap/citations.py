@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Citation styles, formatting publications to HTML for citations and bibliographies, and citation markers.
+
+Styles are registered by name. The built-in ones format publications in Python, with the same output as their
+templates in `publications_bootstrap/citations/`. Any other name or path is rendered with its template.
+
+A new style only needs a `format` method::
+
+    from publications_bootstrap.citations import CitationStyle, register_style
+
+    class IEEEStyle(CitationStyle):
+        def format(self, publication, request=None):
+            ...
+
+    register_style('ieee', IEEEStyle())
+"""
+import os
+import re
+from functools import lru_cache
+
+from django.template.loader import render_to_string
+from django.utils.html import escape, strip_spaces_between_tags
+from django.utils.safestring import mark_safe
+
+from .utils import escape_text
+
+# Types formatted specifically, by pk, as in the templates
+JOURNAL_TYPE = 1
+BOOK_TYPE = 4
+
+
+def template_name(name):
+    """
+    Path of the template of a style, given by name or path.
+    """
+    if os.path.sep not in name:
+        return 'publications_bootstrap/citations/{}.html'.format(name)
+    return name
+
+
+class CitationStyle(object):
+    """
+    Formats publications to HTML.
+    """
+
+    def format(self, publication, request=None):
+        """
+        Returns the citation of a publication.
+
+        Parameters
+        ----------
+        publication : Publication
+        request : HttpRequest
+            Request being rendered, if any, for the context of templates.
+
+        Returns
+        -------
+        SafeText
+        """
+        raise NotImplementedError
+
+    def format_all(self, publications, request=None):
+        """
+        Returns the citations of several publications, in the same order.
+
+        Returns
+        -------
+        list of SafeText
+        """
+        return [self.format(publication, request) for publication in publications]
+
+
+class TemplateStyle(CitationStyle):
+    """
+    Style rendered by a template, with the publication in its context.
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+    def format(self, publication, request=None):
+        return render_to_string(self.template, {'publication': publication}, request=request)
+
+
+class _PythonStyle(CitationStyle):
+    # Options of `flatten_authors`
+    authors = None
+
+    def format(self, publication, request=None):
+        from .templatetags.publication_extras import flatten_authors
+
+        authors = flatten_authors([(author, author.lower().replace(' ', '+')) for author in publication.authors_list],
+                                  self.authors)
+        html = self.format_type(publication, authors, {
+            field: escape_text(getattr(publication, field))
+            for field in ('title', 'journal', 'volume', 'number', 'pages', 'year', 'location', 'publisher', 'doi')})
+        # As rendered within {% spaceless %}
+        return mark_safe(strip_spaces_between_tags(html.strip()))
+
+    def format_type(self, publication, authors, fields):
+        """
+        Returns the HTML of a publication, given its escaped fields.
+        """
+        raise NotImplementedError
+
+
+class ChicagoStyle(_PythonStyle):
+    """
+    http://www.chicagomanualofstyle.org/tools_citationguide.html
+    """
+    authors = 'limit=0&last=, and'
+
+    def format_type(self, publication, authors, fields):
+        if publication.type_id == JOURNAL_TYPE:
+            html = '{authors},\n"{title}" <i>{journal}</i> {volume}'
+            if publication.number:
+                html += ' n°&nbsp;{number}'
+            html += ' ({year})'
+            if publication.doi:
+                html += '<a href="http://dx.doi.org/{doi}">{doi}</a>'
+        elif publication.type_id == BOOK_TYPE:
+            html = '{authors},\n<i>{title}</i> ({location}: {publisher}, {year})'
+            if publication.pages:
+                html += ', {pages}'
+            html += '.'
+        else:
+            html = '{authors},\n"{title}", {year}.'
+        return html.format(authors=authors, **fields)
+
+
+class VancouverStyle(_PythonStyle):
+    """
+    https://www.imperial.ac.uk/media/imperial-college/administration-and-support-services/library/public/vancouver.pdf
+    """
+    authors = 'limit=6'
+
+    def format_type(self, publication, authors, fields):
+        if publication.type_id == JOURNAL_TYPE:
+            html = '{authors}.\n{title}. <i>{journal}</i>. {year}; {volume}'
+            if publication.number:
+                html += ' ({number})'
+            if publication.pages:
+                html += ' {pages}'
+            html += '.'
+        elif publication.type_id == BOOK_TYPE:
+            html = '{authors}.\n<i>{title}</i>. {location}: {publisher};{year}'
+        else:
+            html = '{authors}.\n<i>{title}</i>. {year}.'
+        return html.format(authors=authors, **fields)
+
+
+STYLES = {}
+
+
+def register_style(name, style):
+    """
+    Registers a citation style under a name, usable with `get_citation`, `setup_citations` and
+    `PUBLICATIONS_BOOTSTRAP_CITATION`.
+    """
+    STYLES[name] = style
+
+
+def get_style(name):
+    """
+    Returns the style registered with this name, or else the style rendered by the template of this name or path.
+    """
+    try:
+        return STYLES[name]
+    except KeyError:
+        return TemplateStyle(template_name(name))
+
+
+register_style('chicago', ChicagoStyle())
+register_style('vancouver', VancouverStyle())
+
+
+MARKER_PATTERN = re.compile(
+    r'(?P<sup>^\^?)(?P<open>[<({\[]?)(?P<href>#?)(?P<style>1)(?P<ranging>-?)(?P<separator>[^-]+)')
+CLOSING_BRACKETS = {'[': ']', '(': ')', '{': '}', '<': '>'}
+MARKER_TEMPLATES = {'1': 'numbered'}
+
+
+def parse_marker(marker):
+    """
+    Parses the specification of a citation marker, see `setup_citations`.
+
+    Returns
+    -------
+    tuple
+        Template of the marker and its options, or the given path to a custom template and no option.
+    """
+    if os.path.sep in marker:
+        return marker, {}
+    match = MARKER_PATTERN.match(marker)
+    if match is None:
+        raise ValueError('Invalid citation marker "{}".'.format(marker))
+    options = match.groupdict()
+    if options['open']:
+        options['close'] = CLOSING_BRACKETS[options['open']]
+    options['separator'] = re.sub(r'\s', '&nbsp;', options['separator'])
+    return 'publications_bootstrap/bibliography/markers/{}.html'.format(MARKER_TEMPLATES[options['style']]), options
+
+
+class NumberedMarker(object):
+    """
+    Numbered citation marker, with the same output as the `numbered.html` marker template.
+    """
+
+    def __init__(self, options):
+        self.ranging = bool(options['ranging'])
+        self.separator = options['separator']
+        self.href = bool(options['href'])
+        sup = bool(options['sup'])
+        self.prefix = ('<sup>' if sup else '') + escape(options['open'])
+        self.suffix = escape(options.get('close', '')) + ('</sup>' if sup else '')
+
+    def _link(self, reference):
+        number, publication = reference
+        if self.href:
+            return '<a href="#{}">{}</a>'.format(escape_text(publication.citekey), number)
+        return '<a>{}</a>'.format(number)
+
+    def format(self, references, request=None):
+        """
+        Parameters
+        ----------
+        references : list of list
+            Ranges of consecutive references, as tuples (number, publication).
+        request : HttpRequest
+            Request being rendered, if any, for the context of templates.
+
+        Returns
+        -------
+        SafeText
+        """
+        ranges = []
+        for references_range in references:
+            if self.ranging and len(references_range) > 2:
+                ranges.append(self._link(references_range[0]) + '&#8209;' + self._link(references_range[-1]))
+            else:
+                ranges.append(self.separator.join(self._link(reference) for reference in references_range))
+        return mark_safe(self.prefix + self.separator.join(ranges) + self.suffix)
+
+
+class TemplateMarker(object):
+    """
+    Citation marker rendered by a template, given the `references` and the `marker` options.
+    """
+
+    def __init__(self, template, options):
+        self.template = template
+        self.options = options
+
+    def format(self, references, request=None):
+        return render_to_string(self.template, dict(references=references, marker=self.options), request=request)
+
+
+@lru_cache(maxsize=64)
+def compile_marker(marker, href=True):
+    """
+    Returns the formatter of a citation marker, given by specification or path to a custom template.
+
+    Parameters
+    ----------
+    marker : str
+    href : bool
+        If False, the references are not linked to the bibliography, as in the bibliography itself.
+    """
+    template, options = parse_marker(marker)
+    if not options:
+        # Custom templates get no option
+        return TemplateMarker(template, options)
+    if not href:
+        options = dict(options, href='')
+    return NumberedMarker(options)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Delivery of the PDFs of publications and of their files, once the download view has authorized the request.
+
+Files are handed off to the web server with `X-Sendfile` (Apache, lighttpd) or `X-Accel-Redirect` (nginx) as
+configured with `PUBLICATIONS_BOOTSTRAP_SENDFILE`, or else streamed by Django, honoring single byte ranges.
+
+Download URLs carry the hash of the content of the file, stored when it is saved, so that the responses to them are
+cached as immutable.
+"""
+import mimetypes
+import os
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import Signal
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag, urlquote
+from django.utils.module_loading import import_string
+
+try:
+    from django.urls import reverse  # Django 1.10+
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+from .apps import PublicationsBootstrapConfig
+from .models import Publication, PublicationFile
+
+SENDFILE_HEADERS = {
+    'x-sendfile': 'X-Sendfile',
+    'x-accel-redirect': 'X-Accel-Redirect',
+}
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Lifetime of the responses to versioned URLs
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+file_downloaded = Signal(providing_args=['request', 'publication', 'file'])
+
+
+def download_url(obj):
+    """
+    Returns the URL of the download view for the PDF of a publication, or for a publication file, with the version of
+    its content stored when it was saved.
+    """
+    if isinstance(obj, PublicationFile):
+        url, version = reverse('publications_bootstrap:file', args=[obj.publication_id, obj.pk]), obj.file_hash
+    else:
+        url, version = reverse('publications_bootstrap:pdf', args=[obj.pk]), obj.pdf_hash
+    return '{}?v={}'.format(url, version[:12]) if version else url
+
+
+def has_permission(request, publication, file=None):
+    """
+    Tells whether the request may download the PDF of a publication, or one of its files, with the function configured
+    by `PUBLICATIONS_BOOTSTRAP_DOWNLOAD_PERMISSION` (dotted path), which takes the same arguments. Everyone may
+    download by default.
+    """
+    permission = PublicationsBootstrapConfig.defaults.get('download_permission')
+    if not permission:
+        return True
+    if isinstance(permission, str):
+        permission = import_string(permission)
+    return permission(request, publication, file)
+
+
+class _FileRange(object):
+    # Reads a byte range of a file, without `fileno` so that WSGI file wrappers do not send the whole file
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Parses a single byte range of a `Range` header.
+
+    Returns
+    -------
+    tuple
+        First and last byte of the range, or None if the header is missing, malformed or requests several ranges, in
+        which case the whole file is sent.
+
+    Raises
+    ------
+    ValueError
+        If the range is not satisfiable.
+    """
+    match = RANGE_PATTERN.match(header or '')
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        # Suffix range: the last bytes
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('Unsatisfiable range "{}".'.format(header))
+    return start, end
+
+
+def file_response(request, field_file, version):
+    """
+    Returns the response delivering a stored file, with caching headers keyed on the hash of its content.
+
+    The file is handed off to the web server if `PUBLICATIONS_BOOTSTRAP_SENDFILE` is 'x-sendfile' (with the file
+    system path of the file) or 'x-accel-redirect' (with its name appended to `PUBLICATIONS_BOOTSTRAP_SENDFILE_URL`,
+    an internal location of nginx). Otherwise, it is sent by Django, and a single range of bytes can be requested.
+
+    Parameters
+    ----------
+    request : HttpRequest
+    field_file : FieldFile
+    version : str
+        Hash of the content of the file, as stored when it was saved, or '' if it is unknown.
+    """
+    storage, name = field_file.storage, field_file.name
+    etag = quote_etag(version) if version else None
+
+    response = get_conditional_response(request, etag=etag) if etag else None
+    if response is None:
+        response = _send_file(request, storage, name, etag)
+        if response is None:
+            return None
+
+    if etag:
+        response['ETag'] = etag
+    response['Content-Disposition'] = 'inline; filename="{}"'.format(os.path.basename(name).replace('"', ''))
+    if version and request.GET.get('v') and version.startswith(request.GET['v']):
+        # The URL changes with the content, responses are private as they are authorized
+        patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _send_file(request, storage, name, etag):
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    sendfile = PublicationsBootstrapConfig.defaults.get('sendfile')
+    if sendfile:
+        try:
+            header = SENDFILE_HEADERS[sendfile.lower()]
+        except KeyError:
+            raise ImproperlyConfigured('PUBLICATIONS_BOOTSTRAP_SENDFILE must be one of: {}.'.format(
+                ', '.join(SENDFILE_HEADERS)))
+        response = HttpResponse(content_type=content_type)
+        if header == 'X-Sendfile':
+            response[header] = storage.path(name)
+        else:
+            location = PublicationsBootstrapConfig.defaults.get('sendfile_url')
+            if not location:
+                raise ImproperlyConfigured('PUBLICATIONS_BOOTSTRAP_SENDFILE_URL is required by X-Accel-Redirect.')
+            response[header] = location.rstrip('/') + '/' + urlquote(name)
+        return response
+
+    try:
+        size = storage.size(name)
+    except (IOError, OSError):
+        return None
+    try:
+        # Ranges of another version of the file are not applicable
+        if_range = request.META.get('HTTP_IF_RANGE')
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size) if if_range in (None, etag) else None
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(size)
+        return response
+
+    if byte_range is None:
+        response = FileResponse(storage.open(name, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(_FileRange(storage.open(name, 'rb'), start, end - start + 1),
+                                content_type=content_type, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def send_publication_file(request, publication, file=None):
+    """
+    Returns the response delivering the PDF of a publication, or one of its files, and sends `file_downloaded`, or
+    None if the file does not exist.
+    """
+    if file is not None:
+        field_file, version = file.file, file.file_hash
+    else:
+        field_file, version = publication.pdf, publication.pdf_hash
+    if not field_file:
+        return None
+    response = file_response(request, field_file, version)
+    if response is not None and response.status_code in (200, 206):
+        file_downloaded.send(sender=Publication, request=request, publication=publication, file=file)
+    return response
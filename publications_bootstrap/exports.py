@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming exports of publications.
+
+The export templates are rendered piecewise: the top-level nodes before the loop over the publications, the node
+containing the loop once per chunk of publications, and the nodes after it. Publications are fetched from the
+database with `QuerySet.iterator()` as the response is sent, so that neither the publications nor the whole export are
+held in memory, and the first bytes are sent before the last publications are fetched.
+
+As a consequence, `forloop` counters restart with every chunk in the export templates.
+"""
+from itertools import islice
+
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from django.template.base import NodeList
+from django.template.context import make_context
+from django.template.defaulttags import ForNode
+from django.template.loader import get_template
+
+# Number of publications rendered at once
+EXPORT_CHUNK_SIZE = 200
+
+
+def _loops_over_publications(node):
+    return any(str(loop.sequence.token) == 'publications' for loop in node.get_nodes_by_type(ForNode))
+
+
+def _chunks(publications, size):
+    if isinstance(publications, QuerySet):
+        publications = publications.iterator()
+    publications = iter(publications)
+    while True:
+        chunk = list(islice(publications, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_template(template_name, context, request=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Renders an export template piecewise, see the module documentation.
+
+    Parameters
+    ----------
+    template_name : str
+        Template looping over `publications` at its top level, or within a top-level block tag such as
+        `{% autoescape %}`.
+    context : dict
+        Context of the template, with the `publications` to export as a queryset or an iterable.
+    request : HttpRequest
+    chunk_size : int
+        Number of publications rendered at once.
+
+    Returns
+    -------
+    generator of str
+    """
+    template = get_template(template_name)
+    nodelist = template.template.nodelist
+    try:
+        index = next(i for i, node in enumerate(nodelist) if _loops_over_publications(node))
+    except StopIteration:
+        raise ValueError('Template "{}" does not loop over the publications.'.format(template_name))
+    publications = context['publications']
+    context = make_context(dict(context, publications=[]), request, autoescape=template.backend.engine.autoescape)
+    return _render(template.template, NodeList(nodelist[:index]), nodelist[index], NodeList(nodelist[index + 1:]),
+                   context, _chunks(publications, chunk_size))
+
+
+def _render(template, header, loop, footer, context, chunks):
+    with context.render_context.push_state(template), context.bind_template(template):
+        context.template_name = template.name
+        yield header.render(context)
+        for chunk in chunks:
+            context['publications'] = chunk
+            yield loop.render_annotated(context)
+        yield footer.render(context)
+
+
+def render_export(request, template_name, context, content_type):
+    """
+    Returns a streaming response exporting the `publications` of the context with an export template, see
+    `stream_template`.
+    """
+    return StreamingHttpResponse(stream_template(template_name, context, request), content_type=content_type)
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Counts of the publications matching a set of filters, by value of each filter, e.g. to show how many publications
+each refinement of a search would give.
+
+The counts are computed with a process-level inverted index, holding the pks of the publications by value of each
+facet, so that filtering and counting are set intersections instead of queries. The index is built lazily with a
+few queries, and rebuilt when the versions of the publications or catalogs change in the cache, so that the changes
+made by other processes are seen, or every `INDEX_MAX_AGE` seconds if caching is disabled, or when they are changed in
+this process and the transaction is committed.
+"""
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .authors import _parse_author
+from .caching import CATALOG_PUBLICATIONS, CATALOGS, PUBLICATIONS, index_versions
+from .models import Catalog, Publication, Type
+from .registry import type_registry
+from .utils import _get_status, _get_type, _year_range
+
+FACETS = ('year', 'type', 'status', 'tag', 'author', 'catalog')
+
+# Default number of values of the facets with many values: tags and authors
+FACET_LIMIT = 20
+
+# Versions of the data the index is built from
+VERSIONS = (PUBLICATIONS, CATALOGS, CATALOG_PUBLICATIONS)
+
+
+class FacetIndex(object):
+    """
+    Process-level inverted index of the publications which are not of a hidden type.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+
+    @staticmethod
+    def _versions():
+        return index_versions(VERSIONS)
+
+    def _build(self, versions):
+        facets = {facet: defaultdict(set) for facet in FACETS + ('external',)}
+        authors = {}
+        # Names of the first authors, by key
+        author_names = {}
+        rows = Publication.objects.filter(type__hidden=False).order_by() \
+            .values_list('pk', 'year', 'type_id', 'status', 'tags', 'authors', 'external')
+        for pk, year, type_id, status, tags, authors_, external in rows.iterator():
+            facets['year'][year].add(pk)
+            facets['type'][type_id].add(pk)
+            facets['status'][status.value].add(pk)
+            facets['external'][external].add(pk)
+            for tag in Publication.parse_tags(tags):
+                if tag:
+                    facets['tag'][tag].add(pk)
+            authors[pk] = authors_.lower()
+            first_author = next((author for author in Publication.split_authors(authors_) if author), None)
+            if first_author is not None:
+                key, name = _parse_author(first_author)
+                facets['author'][key].add(pk)
+                author_names.setdefault(key, name)
+        for pk, catalog_id in Catalog.publications.through.objects.values_list('publication_id', 'catalog_id'):
+            if pk in authors:
+                facets['catalog'][catalog_id].add(pk)
+        return {
+            'versions': versions,
+            'facets': facets,
+            'authors': authors,
+            'author_names': author_names,
+            'catalogs': dict(Catalog.objects.values_list('pk', 'title')),
+        }
+
+    @property
+    def index(self):
+        versions = self._versions()
+        index = self._index
+        if index is None or index['versions'] != versions:
+            with self._lock:
+                if self._index is None or self._index['versions'] != versions:
+                    self._index = self._build(versions)
+                index = self._index
+        return index
+
+    def clear(self):
+        self._index = None
+
+    @staticmethod
+    def _filter(index, year, type, tag, author, catalog, status, external):
+        facets = index['facets']
+        if external is None:
+            pks = set(index['authors'])
+        else:
+            pks = facets['external'].get(bool(external), set())
+        if year not in (None, ''):
+            first, last = _year_range(year)
+            pks = pks & set().union(*[publications for y, publications in facets['year'].items()
+                                      if (first is None or y >= first) and (last is None or y <= last)])
+        if type not in (None, ''):
+            pks = pks & facets['type'].get(_get_type(type).pk, set())
+        if tag:
+            pks = pks & facets['tag'].get(tag.lower().strip(), set())
+        if catalog not in (None, ''):
+            try:
+                catalog_id = int(catalog)
+            except ValueError:
+                catalog_id = next((pk for pk, title in index['catalogs'].items()
+                                   if title.lower() == str(catalog).lower()), None)
+            pks = pks & facets['catalog'].get(catalog_id, set())
+        if status:
+            pks = pks & facets['status'].get(_get_status(status).value, set())
+        if author:
+            author = author.lower()
+            pks = {pk for pk in pks if author in index['authors'][pk]}
+        return pks
+
+    def counts(self, facets=FACETS, limit=FACET_LIMIT, year=None, type=None, tag=None, author=None, catalog=None,
+               status=None, external=False):
+        """
+        Counts the publications matching the filters by value of each facet, see `get_facets`.
+        """
+        index = self.index
+        pks = self._filter(index, year, type, tag, author, catalog, status, external)
+        result = {'count': len(pks)}
+        for facet in facets:
+            counts = {}
+            for value, publications in index['facets'][facet].items():
+                count = len(publications.intersection(pks))
+                if count:
+                    counts[value] = count
+            result[facet] = _FACET_VALUES[facet](index, counts, limit)
+        return result
+
+
+def _year_values(index, counts, limit):
+    return [{'value': year, 'label': str(year), 'count': counts[year]} for year in sorted(counts, reverse=True)]
+
+
+def _type_values(index, counts, limit):
+    return [{'value': t.pk, 'label': t.title, 'count': counts[t.pk]} for t in type_registry.all() if t.pk in counts]
+
+
+def _status_values(index, counts, limit):
+    return [{'value': s.value, 'label': str(s.label), 'count': counts[s.value]}
+            for s in Publication.EStatuses if s.value in counts]
+
+
+def _tag_values(index, counts, limit):
+    return [{'value': tag, 'label': tag, 'count': count} for tag, count in _most_common(counts, limit)]
+
+
+def _author_values(index, counts, limit):
+    names = index['author_names']
+    return [{'value': names[key].lower().replace(' ', '+'), 'label': names[key], 'count': count}
+            for key, count in _most_common(counts, limit)]
+
+
+def _catalog_values(index, counts, limit):
+    catalogs = sorted((title, pk) for pk, title in index['catalogs'].items() if pk in counts)
+    return [{'value': pk, 'label': title, 'count': counts[pk]} for title, pk in catalogs]
+
+
+def _most_common(counts, limit):
+    # Ties are ordered by value, so that the output is stable
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+_FACET_VALUES = {
+    'year': _year_values,
+    'type': _type_values,
+    'status': _status_values,
+    'tag': _tag_values,
+    'author': _author_values,
+    'catalog': _catalog_values,
+}
+
+facet_index = FacetIndex()
+
+
+def get_facets(facets=FACETS, limit=FACET_LIMIT, **filters):
+    """
+    Counts the publications matching the filters by value of each facet.
+
+    Parameters
+    ----------
+    facets : iterable of str
+        Facets to count, among `FACETS`.
+    limit : int
+        Maximal number of values of the tag and author facets, the most frequent ones.
+    filters
+        Filters of the publications, as given to `utils.filter_publications`: year, type, tag, author, catalog, status
+        and external.
+
+    Returns
+    -------
+    dict
+        Number of publications matching the filters as `count`, and the values of each facet as a list of dicts with
+        the keys `value` (as given to the filter), `label` and `count`.
+
+    Raises
+    ------
+    ValueError
+        If a facet or a filter is invalid.
+    """
+    facets = tuple(facets)
+    for facet in facets:
+        if facet not in _FACET_VALUES:
+            raise ValueError('Unknown facet "{}", expected one of: {}.'.format(facet, ', '.join(FACETS)))
+    return facet_index.counts(facets, limit, **filters)
+
+
+@receiver(post_save, sender=Publication)
+@receiver(post_delete, sender=Publication)
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+@receiver(post_save, sender=Catalog)
+@receiver(post_delete, sender=Catalog)
+@receiver(m2m_changed, sender=Catalog.publications.through)
+def clear_facet_index(sender, **kwargs):
+    # Rebuilt from the committed data
+    transaction.on_commit(facet_index.clear)
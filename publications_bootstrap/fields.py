@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import hashlib
 
 from django import forms
 from django.db import models
@@ -76,3 +77,54 @@ class NullCharField(models.CharField):
             return None
         else:
             return value
+
+
+def hash_file(field_file):
+    """
+    Returns the SHA-1 of the content of a file field, uploaded or stored, or '' if it is empty or missing.
+    """
+    if not field_file:
+        return ''
+    digest = hashlib.sha1()
+    try:
+        if field_file._committed:
+            with field_file.storage.open(field_file.name, 'rb') as f:
+                for chunk in f.chunks():
+                    digest.update(chunk)
+        else:
+            for chunk in field_file.file.chunks():
+                digest.update(chunk)
+    except (IOError, OSError):
+        return ''
+    return digest.hexdigest()
+
+
+def stored_file_names(instance, hashed_fields):
+    """
+    Returns the names of the files of a model instance, as loaded or saved, by file field.
+    """
+    names = {}
+    for field, _ in hashed_fields:
+        value = instance.__dict__.get(field)
+        names[field] = getattr(value, 'name', value)
+    return names
+
+
+def update_file_hashes(instance, hashed_fields):
+    """
+    Updates the content hashes of the files of a model instance which were uploaded or changed since it was loaded or
+    saved, as recorded by `stored_file_names` in `instance._file_names`.
+
+    Parameters
+    ----------
+    instance : Model
+    hashed_fields : iterable of tuple
+        Names of the file fields and of the fields storing their hashes.
+    """
+    for field, hash_field in hashed_fields:
+        field_file = getattr(instance, field)
+        if not field_file:
+            setattr(instance, hash_field, '')
+        elif not field_file._committed or field_file.name != instance._file_names.get(field) \
+                or not getattr(instance, hash_field):
+            setattr(instance, hash_field, hash_file(field_file))
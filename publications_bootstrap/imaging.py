@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Resizing of images, run in worker processes, which are spawned rather than forked from threaded web server processes.
+
+This module must not depend on Django, so that spawned workers import it without setting Django up.
+"""
+import io
+import os
+import subprocess
+import tempfile
+
+CONTENT_TYPES = {'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+
+
+def _render_pdf(path, width):
+    # First page, rasterized at the given width
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess.check_call(['pdftoppm', '-f', '1', '-l', '1', '-singlefile', '-png', '-scale-to-x', str(width),
+                               '-scale-to-y', '-1', path, os.path.join(directory, 'page')])
+        with open(os.path.join(directory, 'page.png'), 'rb') as f:
+            return f.read()
+
+
+def render_derivatives(source, pdf, widths, formats):
+    """
+    Resizes an image.
+
+    Parameters
+    ----------
+    source : bytes or str
+        Content of the source image, or of the PDF whose first page is rendered, or path of the file.
+    pdf : bool
+    widths : iterable of int
+        Widths of the derivatives, narrower sources are not enlarged.
+    formats : iterable of str
+        Formats of the derivatives, among `CONTENT_TYPES`.
+
+    Returns
+    -------
+    list of tuple
+        Width, height, format and content of each derivative.
+    """
+    from PIL import Image
+
+    if pdf:
+        if isinstance(source, bytes):
+            with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+                f.write(source)
+                f.flush()
+                source = _render_pdf(f.name, max(widths))
+        else:
+            source = _render_pdf(source, max(widths))
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    image.load()
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        # Transparency is flattened on white, as JPEG does not support it
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    derivatives = []
+    for width in sorted({min(width, image.width) for width in widths}):
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+        for format in formats:
+            output = io.BytesIO()
+            if format == 'jpeg':
+                resized.save(output, 'JPEG', quality=85, optimize=True, progressive=True)
+            else:
+                resized.save(output, format.upper(), quality=80)
+            derivatives.append((width, height, format, output.getvalue()))
+    return derivatives
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Import of bibliographies. Each supported format provides a streaming parser yielding entries as dictionaries with the
+same keys as BibTex entries (see `bibtex.parse`), which are then converted to publications and saved by batches.
+"""
+
+import gzip
+import os
+import re
+from collections import OrderedDict
+
+from django.db import transaction
+from django_countries import countries
+
+from . import csl, mods, ris
+from .. import bibtex
+from ..authors import author_index
+from ..models import Publication
+from ..caching import PUBLICATIONS, bump
+from ..facets import facet_index
+from ..registry import type_registry
+
+# mapping of months
+MONTHS = {
+    'jan': 1, 'january': 1,
+    'feb': 2, 'february': 2,
+    'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4,
+    'may': 5,
+    'jun': 6, 'june': 6,
+    'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8,
+    'sep': 9, 'september': 9,
+    'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11,
+    'dec': 12, 'december': 12}
+
+# number of publications written to the database at once
+BATCH_SIZE = 500
+
+COUNTRIES_BY_CODE = dict(countries)
+# Reversed dict
+try:
+    # Python 2.7.x
+    COUNTRIES_BY_NAME = {v: k for k, v in COUNTRIES_BY_CODE.iteritems()}
+except:
+    # Python 3+
+    COUNTRIES_BY_NAME = {v: k for k, v in COUNTRIES_BY_CODE.items()}
+
+
+# streaming parsers of the supported formats
+PARSERS = OrderedDict([
+    ('bibtex', bibtex.iterparse),
+    ('ris', ris.iterparse),
+    ('csl', csl.iterparse),
+    ('mods', mods.iterparse),
+])
+
+FORMAT_NAMES = OrderedDict([
+    ('bibtex', 'BibTex'),
+    ('ris', 'RIS'),
+    ('csl', 'CSL-JSON'),
+    ('mods', 'MODS'),
+])
+
+EXTENSIONS = {
+    '.bib': 'bibtex',
+    '.bibtex': 'bibtex',
+    '.ris': 'ris',
+    '.json': 'csl',
+    '.mods': 'mods',
+    '.xml': 'mods',
+}
+
+
+def open_bibliography(f, name=''):
+    """
+    Returns a binary file-like object with the content of a bibliography file, decompressed if it is gzip-compressed.
+    """
+    if name.lower().endswith('.gz') or f.read(2) == b'\x1f\x8b':
+        f.seek(0)
+        return gzip.GzipFile(fileobj=f, mode='rb')
+    f.seek(0)
+    return f
+
+
+def guess_format(name, default='bibtex'):
+    """
+    Guesses the format of a bibliography file from its extension, ignoring a trailing `.gz`.
+    """
+    name = name.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    return EXTENSIONS.get(os.path.splitext(name)[1], default)
+
+
+def iterparse(f, name='', format=None):
+    """
+    Incrementally parses a bibliography file, optionally gzip-compressed.
+
+    Parameters
+    ----------
+    f : file
+        Binary file-like object.
+    name : str
+        Name of the file, used to guess the format if not given.
+    format : str
+        One of the keys of `PARSERS`.
+
+    Returns
+    -------
+    generator
+        Entries of the bibliography, see `bibtex.parse`.
+    """
+    return PARSERS[format or guess_format(name)](open_bibliography(f, name))
+
+
+def publication_from_entry(entry):
+    """
+    Creates an unsaved publication from a BibTex entry.
+
+    Raises
+    ------
+    ValueError
+        If the entry misses required keys or is of an unknown type.
+    """
+    if not ('title' in entry and 'author' in entry and 'year' in entry):
+        raise ValueError('Make sure that the keys <title>, <author> and <year> are present.')
+
+    # parse authors
+    authors = entry['author'].split(' and ')
+    for i in range(len(authors)):
+        author = authors[i].split(',')
+        author = [author[-1]] + author[:-1]
+        authors[i] = ' '.join(author)
+    authors = ', '.join(authors)
+
+    # add missing keys
+    keys = [
+        'journal',
+        'booktitle',
+        'address',
+        'publisher',
+        'editor',
+        'edition',
+        'institution',
+        'school',
+        'organization',
+        'series',
+        'url',
+        'doi',
+        'isbn',
+        'tags',
+        'note',
+        'abstract',
+        'month']
+
+    for key in keys:
+        if key not in entry:
+            entry[key] = ''
+
+    # map integer fields to integers
+    entry['month'] = Publication.EMonths.get(MONTHS.get(entry['month'].lower(), 0), None)
+
+    for field in ['volume', 'number', 'chapter', 'section']:
+        entry[field] = entry.get(field, None)
+
+    # remove whitespace characters (likely due to line breaks)
+    entry['url'] = re.sub(r'\s', '', entry['url'])
+
+    if 'country' not in entry:
+        entry['country'] = ''
+    else:
+        if entry['country'].strip() in COUNTRIES_BY_NAME:
+            entry['country'] = COUNTRIES_BY_NAME[entry['country'].strip()]
+        elif entry['country'].upper() in COUNTRIES_BY_CODE:
+            entry['country'] = entry['country'].upper()
+        else:
+            entry['country'] = ''
+
+    # determine type
+    publication_type = type_registry.get_by_bibtex_type(entry['type'])
+
+    if publication_type is None:
+        raise ValueError('Type "{}" unknown.'.format(entry['type']))
+
+    return Publication(
+        type_id=publication_type.pk,
+        citekey=entry['key'],
+        title=entry['title'],
+        authors=authors,
+        year=entry['year'],
+        month=entry['month'],
+        journal=entry['journal'],
+        book_title=entry['booktitle'],
+        publisher=entry['publisher'],
+        location=entry['address'],
+        country=entry['country'],
+        editor=entry['editor'],
+        edition=entry['edition'],
+        institution=entry['institution'],
+        school=entry['school'],
+        organization=entry['organization'],
+        series=entry['series'],
+        volume=entry['volume'],
+        number=entry['number'],
+        chapter=entry['chapter'],
+        section=entry['section'],
+        note=entry['note'],
+        url=entry['url'],
+        doi=entry['doi'],
+        isbn=entry['isbn'],
+        external=False,
+        abstract=entry['abstract'],
+        tags=entry['tags'],
+        status=Publication.EStatuses.PUBLISHED)
+
+
+def save_publications(publications, batch_size=BATCH_SIZE):
+    """
+    Writes publications to the database by batches, consuming the given iterable lazily so that only one batch is held
+    in memory at a time.
+
+    Returns
+    -------
+    int
+        Number of publications saved.
+    """
+    count = 0
+    batch = []
+    for publication in publications:
+        # bulk_create does not call save()
+        publication.update_derived_fields()
+        batch.append(publication)
+        if len(batch) >= batch_size:
+            Publication.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        Publication.objects.bulk_create(batch)
+        count += len(batch)
+    if count:
+        # bulk_create does not send the signals invalidating the cached output and the indexes, which are rebuilt from
+        # the committed publications
+        transaction.on_commit(_invalidate)
+    return count
+
+
+def _invalidate():
+    bump(PUBLICATIONS)
+    author_index.clear()
+    facet_index.clear()
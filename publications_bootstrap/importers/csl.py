@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming parser of bibliographies in CSL-JSON format.
+"""
+
+import codecs
+import json
+import re
+
+# convert CSL type to BibTex type
+CSL_TO_BIBTEX = {
+    'article': 'article',
+    'article-journal': 'article',
+    'article-magazine': 'article',
+    'article-newspaper': 'article',
+    'book': 'book',
+    'chapter': 'incollection',
+    'manuscript': 'unpublished',
+    'paper-conference': 'inproceedings',
+    'patent': 'patent',
+    'report': 'techreport',
+    'thesis': 'phdthesis',
+    'webpage': 'online',
+}
+
+# convert CSL variable to BibTex key, for the variables with a plain text value
+CSL_TO_BIBTEX_KEYS = {
+    'title': 'title',
+    'publisher': 'publisher',
+    'publisher-place': 'address',
+    'edition': 'edition',
+    'collection-title': 'series',
+    'volume': 'volume',
+    'issue': 'number',
+    'section': 'section',
+    'chapter-number': 'chapter',
+    'page': 'pages',
+    'DOI': 'doi',
+    'ISBN': 'isbn',
+    'URL': 'url',
+    'note': 'note',
+    'abstract': 'abstract',
+    'keyword': 'tags',
+}
+
+_whitespace = re.compile(r'\s*')
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+
+def _names(names):
+    """
+    Converts a list of CSL names to BibTex names.
+    """
+    result = []
+    for name in names:
+        if 'literal' in name:
+            result.append(name['literal'])
+        else:
+            family = ' '.join(part for part in [name.get('non-dropping-particle'), name.get('family')] if part)
+            result.append(', '.join(part for part in [family, name.get('given')] if part))
+    return ' and '.join(result)
+
+
+def _entry(item):
+    entry = {
+        'type': CSL_TO_BIBTEX.get(item.get('type'), 'misc'),
+        'key': item.get('citation-key') or str(item.get('id', '')),
+    }
+    for variable, key in CSL_TO_BIBTEX_KEYS.items():
+        if item.get(variable) not in (None, ''):
+            entry[key] = str(item[variable])
+
+    if item.get('container-title'):
+        entry['journal' if entry['type'] == 'article' else 'booktitle'] = item['container-title']
+    if item.get('author'):
+        entry['author'] = _names(item['author'])
+    if item.get('editor'):
+        entry['editor'] = _names(item['editor'])
+
+    date_parts = (item.get('issued') or {}).get('date-parts') or [[]]
+    if date_parts[0]:
+        entry['year'] = str(date_parts[0][0])
+        # Months which are not numbers, such as seasons, are ignored
+        month = str(date_parts[0][1]).strip() if len(date_parts[0]) > 1 else ''
+        if month.isdigit() and 1 <= int(month) <= 12:
+            entry['month'] = MONTHS[int(month) - 1]
+    elif (item.get('issued') or {}).get('raw', '')[:4].isdigit():
+        entry['year'] = item['issued']['raw'][:4]
+    return entry
+
+
+def iterparse(stream, chunk_size=64 * 1024):
+    """
+    Incrementally parses a file-like object in CSL-JSON format, i.e. a JSON array of CSL items, decoding one item at a
+    time.
+
+    Parameters
+    ----------
+    stream : file
+        File-like object, opened in text mode or yielding UTF-8 encoded bytes.
+    chunk_size : int
+        Number of characters (or bytes) read at once from the stream.
+
+    Returns
+    -------
+    generator
+        Dictionaries representing the entries of the bibliography, with the same keys as BibTex entries.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    json_decoder = json.JSONDecoder()
+    # The items are decoded from a position in the buffer, which is only trimmed when a chunk is read
+    buffer = ''
+    index = 0
+    eof = False
+    started = False
+    while True:
+        # skip whitespace and separators between items
+        index = _whitespace.match(buffer, index).end()
+        if not started and index < len(buffer):
+            if buffer[index] != '[':
+                raise ValueError('A CSL-JSON bibliography must be an array of items.')
+            index = _whitespace.match(buffer, index + 1).end()
+            started = True
+        if started and buffer.startswith(',', index):
+            index = _whitespace.match(buffer, index + 1).end()
+        if started and buffer.startswith(']', index):
+            return
+
+        if index < len(buffer):
+            try:
+                item, index = json_decoder.raw_decode(buffer, index)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                yield _entry(item)
+                continue
+
+        if eof:
+            if started:
+                raise ValueError('Unexpected end of CSL-JSON bibliography.')
+            return
+        chunk = stream.read(chunk_size)
+        # A chunk of bytes ending within a character decodes to nothing
+        eof = not chunk
+        if not isinstance(chunk, str):
+            chunk = decoder.decode(chunk, final=eof)
+        buffer = buffer[index:] + chunk
+        index = 0
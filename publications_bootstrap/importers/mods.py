@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming parser of bibliographies in MODS XML format.
+"""
+
+import re
+from xml.etree import ElementTree
+
+NS = '{http://www.loc.gov/mods/v3}'
+
+# convert MODS genre to BibTex type, genres exported by this application are the lowercase titles of the types
+GENRE_TO_BIBTEX = {
+    'abstract': 'abstract',
+    'academic journal': 'article',
+    'article': 'article',
+    'book': 'book',
+    'book chapter': 'incollection',
+    'bibliography': 'incollection',
+    'conference': 'inproceedings',
+    'conference publication': 'inproceedings',
+    'journal': 'article',
+    'journal article': 'article',
+    'online': 'misc',
+    'report': 'techreport',
+    'technical report': 'techreport',
+    'thesis': 'phdthesis',
+}
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+
+def _text(element, path):
+    found = element.find(path.replace('mods:', NS))
+    if found is None or found.text is None:
+        return ''
+    return found.text.strip()
+
+
+def _detail(part, detail_type):
+    for detail in part.findall(NS + 'detail'):
+        if detail.get('type') == detail_type:
+            # the value is expected in a <number> element, but exported as text of <detail> by this application
+            return _text(detail, 'mods:number') or (detail.text or '').strip()
+    return ''
+
+
+def _entry(mods):
+    genre = _text(mods, 'mods:genre').lower()
+    entry = {
+        'type': GENRE_TO_BIBTEX.get(genre, 'misc'),
+        'key': '',
+        'title': _text(mods, 'mods:titleInfo/mods:title'),
+    }
+
+    authors = []
+    editors = []
+    for name in mods.findall(NS + 'name'):
+        parts = {part.get('type'): (part.text or '').strip() for part in name.findall(NS + 'namePart')}
+        if 'family' in parts:
+            value = ', '.join(p for p in [parts['family'], parts.get('given')] if p)
+        else:
+            value = parts.get(None, '')
+        roles = [(role.text or '').strip().lower() for role in name.iter(NS + 'roleTerm')]
+        (editors if 'editor' in roles or 'edt' in roles else authors).append(value)
+    if authors:
+        entry['author'] = ' and '.join(authors)
+    if editors:
+        entry['editor'] = ' and '.join(editors)
+
+    origin = mods.find(NS + 'originInfo')
+    if origin is not None:
+        date = _text(origin, 'mods:dateIssued')
+        match = re.match(r'(\d{4})(?:-(\d{1,2}))?', date)
+        if match:
+            entry['year'] = match.group(1)
+            if match.group(2) and 1 <= int(match.group(2)) <= 12:
+                entry['month'] = MONTHS[int(match.group(2)) - 1]
+        entry['publisher'] = _text(origin, 'mods:publisher')
+        entry['address'] = _text(origin, 'mods:place/mods:placeTerm')
+        entry['edition'] = _text(origin, 'mods:edition')
+
+    for related in mods.findall(NS + 'relatedItem'):
+        title = _text(related, 'mods:titleInfo/mods:title')
+        if related.get('type') == 'series':
+            entry['series'] = title
+        elif related.get('type') == 'host':
+            if title:
+                entry['journal' if entry['type'] == 'article' else 'booktitle'] = title
+            if 'year' not in entry:
+                date = _text(related, 'mods:date') or _text(related, 'mods:originInfo/mods:dateIssued')
+                if date[:4].isdigit():
+                    entry['year'] = date[:4]
+            part = related.find(NS + 'part')
+            if part is not None:
+                entry['volume'] = _detail(part, 'volume')
+                entry['number'] = _detail(part, 'issue')
+                start = _text(part, 'mods:extent/mods:start')
+                end = _text(part, 'mods:extent/mods:end')
+                entry['pages'] = '-'.join(p for p in [start, end if end != start else ''] if p)
+
+    for identifier in mods.findall(NS + 'identifier'):
+        identifier_type = identifier.get('type')
+        if identifier_type in ('doi', 'isbn'):
+            entry[identifier_type] = (identifier.text or '').strip()
+        elif identifier_type == 'citekey':
+            entry['key'] = (identifier.text or '').strip()
+
+    for url in mods.iter(NS + 'url'):
+        # PDFs are not imported
+        if url.get('displayLabel') != 'PDF':
+            entry['url'] = (url.text or '').strip()
+            break
+
+    entry['abstract'] = _text(mods, 'mods:abstract')
+    entry['note'] = _text(mods, 'mods:note')
+    topics = [(topic.text or '').strip() for topic in mods.iter(NS + 'topic')]
+    if topics:
+        entry['tags'] = ', '.join(topic for topic in topics if topic)
+
+    # drop empty values, so that missing required keys are detected
+    return {key: value for key, value in entry.items() if value or key == 'key'}
+
+
+def iterparse(stream):
+    """
+    Incrementally parses a file-like object in MODS format, either a single <mods> record or a <modsCollection>.
+    Parsed records are cleared from the tree, so that memory usage does not depend on the number of records.
+
+    Parameters
+    ----------
+    stream : file
+        Binary file-like object.
+
+    Returns
+    -------
+    generator
+        Dictionaries representing the entries of the bibliography, with the same keys as BibTex entries.
+    """
+    root = None
+    # nesting level of <mods> elements, as related items may contain <mods> elements
+    depth = 0
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            if element.tag == NS + 'mods':
+                depth += 1
+            continue
+        if element.tag == NS + 'mods':
+            depth -= 1
+            if depth == 0:
+                yield _entry(element)
+                element.clear()
+                if root is not element:
+                    # drop the reference held by the collection
+                    root.clear()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming parser of bibliographies in RIS format.
+"""
+
+import codecs
+import re
+
+# convert RIS type to BibTex type
+RIS_TO_BIBTEX = {
+    'ABST': 'abstract',
+    'BOOK': 'book',
+    'CHAP': 'incollection',
+    'CONF': 'proceedings',
+    'CPAPER': 'inproceedings',
+    'EBOOK': 'book',
+    'ECHAP': 'incollection',
+    'EJOUR': 'article',
+    'GEN': 'misc',
+    'JFULL': 'article',
+    'JOUR': 'article',
+    'MGZN': 'article',
+    'PAMP': 'booklet',
+    'PAT': 'patent',
+    'RPRT': 'techreport',
+    'THES': 'phdthesis',
+    'UNPB': 'unpublished',
+}
+
+# convert RIS tag to BibTex key, for the tags with a single value
+RIS_TO_BIBTEX_KEYS = {
+    'ID': 'key',
+    'T1': 'title',
+    'JO': 'journal',
+    'JF': 'journal',
+    'BT': 'booktitle',
+    'T3': 'series',
+    'PB': 'publisher',
+    'CY': 'address',
+    'ET': 'edition',
+    'VL': 'volume',
+    'IS': 'number',
+    'SE': 'section',
+    'DO': 'doi',
+    'UR': 'url',
+    'N1': 'note',
+    'AB': 'abstract',
+    'N2': 'abstract',
+}
+
+# BibTex types whose SN tag is an ISBN, rather than the ISSN of a journal or a series
+ISBN_TYPES = {'book'}
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+_line = re.compile(r'^([A-Z][A-Z0-9])  -( (.*))?$')
+
+
+def _entry(fields):
+    entry = {'type': RIS_TO_BIBTEX.get(fields.pop('TY', ['GEN'])[0].upper(), 'misc')}
+    for tag, key in RIS_TO_BIBTEX_KEYS.items():
+        if tag in fields:
+            entry.setdefault(key, fields[tag][0])
+    entry.setdefault('key', '')
+    if 'SN' in fields and entry['type'] in ISBN_TYPES:
+        entry['isbn'] = fields['SN'][0]
+
+    # TI is the primary title, but exported as the book title after T1 by this application
+    titles = fields.get('TI', []) + fields.get('T2', [])
+    if titles:
+        if 'title' not in entry:
+            entry['title'] = titles.pop(0)
+        if titles:
+            entry.setdefault('journal' if entry['type'] == 'article' else 'booktitle', titles[0])
+
+    authors = fields.get('AU', []) + fields.get('A1', [])
+    if authors:
+        entry['author'] = ' and '.join(authors)
+    editors = fields.get('ED', []) + fields.get('A2', [])
+    if editors:
+        entry['editor'] = ' and '.join(editors)
+
+    for tag in ['PY', 'Y1', 'DA']:
+        if tag in fields:
+            # YYYY/MM/DD/other info
+            date = fields[tag][0].split('/')
+            if date[0][:4].isdigit():
+                entry.setdefault('year', date[0][:4])
+            if len(date) > 1 and date[1].isdigit() and 1 <= int(date[1]) <= 12:
+                entry.setdefault('month', MONTHS[int(date[1]) - 1])
+
+    if 'SP' in fields:
+        entry['pages'] = fields['SP'][0]
+        if 'EP' in fields and fields['EP'][0] != fields['SP'][0]:
+            entry['pages'] += '-' + fields['EP'][0]
+
+    if 'doi' not in entry:
+        for value in fields.get('M3', []):
+            if value.lower().startswith('doi:'):
+                entry['doi'] = value[4:].strip()
+
+    if 'KW' in fields:
+        entry['tags'] = ', '.join(fields['KW'])
+    return entry
+
+
+def iterparse(stream):
+    """
+    Incrementally parses a file-like object in RIS format, one line at a time.
+
+    Parameters
+    ----------
+    stream : file
+        File-like object, opened in text mode or yielding UTF-8 encoded bytes.
+
+    Returns
+    -------
+    generator
+        Dictionaries representing the entries of the bibliography, with the same keys as BibTex entries.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    fields = None
+    tag = None
+    for line in stream:
+        if not isinstance(line, str):
+            line = decoder.decode(line)
+        line = line.rstrip('\r\n')
+        match = _line.match(line)
+        if match is None:
+            # continuation of the previous value
+            if fields is not None and tag is not None and line.strip():
+                fields[tag][-1] = (fields[tag][-1] + ' ' + line.strip()).strip()
+            continue
+
+        tag, value = match.group(1), (match.group(3) or '').strip()
+        if tag == 'TY':
+            fields = {}
+        elif fields is None:
+            # outside of a record
+            tag = None
+            continue
+        if tag == 'ER':
+            yield _entry(fields)
+            fields = None
+            tag = None
+            continue
+        fields.setdefault(tag, []).append(value)
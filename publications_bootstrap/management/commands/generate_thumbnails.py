@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Publication
+from ...thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generates the resized thumbnails of publications, from their thumbnail, image or the first page of PDF.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, metavar='id',
+                            help='Publication(s) to process, all by default.')
+        parser.add_argument('--force', action='store_true',
+                            help='Generate the thumbnails again, even if they already exist.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes resizing the images, defaults to the number of CPUs.')
+
+    def handle(self, *args, **options):
+        publications = Publication.objects.all()
+        if options['ids']:
+            publications = publications.filter(pk__in=options['ids'])
+        try:
+            count = generate_thumbnails(publications.iterator(), force=options['force'], workers=options['workers'])
+        except (IOError, OSError) as e:
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS('Successfully generated the thumbnails of {} publications.'.format(count)))
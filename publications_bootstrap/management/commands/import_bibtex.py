@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from ...importers import PARSERS, iterparse, publication_from_entry, save_publications
+from ...validation import validate
+
+
+class Command(BaseCommand):
+    help = 'Imports publications from BibTex, RIS, CSL-JSON or MODS files, optionally gzip-compressed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', metavar='path', help='File(s) to import.')
+        parser.add_argument('--format', choices=list(PARSERS), default=None,
+                            help='Format of the files, guessed from their extension by default.')
+        parser.add_argument('--dry-run', action='store_true', dest='dry_run',
+                            help='Validate all the entries and report the problems, without writing anything.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of worker processes for the validation, defaults to the number of CPUs.')
+
+    def _entries(self, paths, format=None):
+        for path in paths:
+            with open(path, 'rb') as f:
+                for entry in iterparse(f, path, format):
+                    yield entry
+
+    def handle(self, *args, **options):
+        try:
+            if options['dry_run']:
+                self._validate(options)
+            else:
+                self._import(options)
+        except IOError as e:
+            raise CommandError(e)
+
+    def _validate(self, options):
+        report = validate(self._entries(options['paths'], options['format']), workers=options['workers'])
+        invalid = 0
+        for entry in report:
+            if entry['errors']:
+                invalid += 1
+            for message in entry['errors']:
+                self.stdout.write('#{} {}: {}'.format(entry['index'] + 1, entry['key'], message))
+            for message in entry['warnings']:
+                self.stdout.write('#{} {}: warning: {}'.format(entry['index'] + 1, entry['key'], message))
+        summary = '{} entries validated, {} with errors.'.format(len(report), invalid)
+        if invalid:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def _import(self, options):
+        try:
+            # all or nothing, the whole import is rolled back on the first invalid entry
+            with transaction.atomic():
+                entries = self._entries(options['paths'], options['format'])
+                count = save_publications(publication_from_entry(entry) for entry in entries)
+        except (ValueError, IntegrityError) as e:
+            # e.g. a citekey or DOI already used
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS('Successfully added {} publications.'.format(count)))
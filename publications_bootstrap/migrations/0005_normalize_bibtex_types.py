@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+app_label = 'publications_bootstrap'
+
+
+def forwards(apps, schema_editor):
+    # Types now store their normalized BibTex types, instead of normalizing them each time they are loaded
+    Type = apps.get_model(app_label, "Type")
+    for publication_type in Type.objects.all():
+        bibtex_types = publication_type.bibtex_types
+        bibtex_types = bibtex_types.replace('@', '')
+        bibtex_types = bibtex_types.replace(';', ',')
+        bibtex_types = bibtex_types.replace('and', ',')
+        bibtex_types = ', '.join([s.strip().lower() for s in bibtex_types.split(',')])
+        if bibtex_types != publication_type.bibtex_types:
+            Type.objects.filter(pk=publication_type.pk).update(bibtex_types=bibtex_types)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('publications_bootstrap', '0004_catalog_fk_publication'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from publications_bootstrap.tex import tex_to_html
+
+app_label = 'publications_bootstrap'
+
+
+def forwards(apps, schema_editor):
+    # Store the HTML of the titles and abstracts, instead of parsing their TeX math each time they are displayed
+    Publication = apps.get_model(app_label, "Publication")
+    for publication in Publication.objects.only('title', 'abstract').iterator():
+        Publication.objects.filter(pk=publication.pk).update(
+            title_html=tex_to_html(publication.title),
+            abstract_html=tex_to_html(publication.abstract) if publication.abstract else '')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('publications_bootstrap', '0005_normalize_bibtex_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='title_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='abstract_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
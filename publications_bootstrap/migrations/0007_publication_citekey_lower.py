@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.db import migrations
+
+import publications_bootstrap.fields
+
+app_label = 'publications_bootstrap'
+
+
+def forwards(apps, schema_editor):
+    # Store the lowercase citekeys, which must be unique before being indexed by the next migration
+    Publication = apps.get_model(app_label, "Publication")
+    citekeys = defaultdict(list)
+    for pk, citekey in Publication.objects.exclude(citekey=None).values_list('pk', 'citekey').iterator():
+        citekeys[citekey.lower()].append((pk, citekey))
+    duplicates = ['; '.join(citekey for _, citekey in keys) for keys in citekeys.values() if len(keys) > 1]
+    if duplicates:
+        raise ValueError('Citekeys must be unique ignoring case, rename the publications with the citekeys: {}.'.format(
+            ' / '.join(duplicates)))
+    for citekey_lower, [(pk, _)] in citekeys.items():
+        Publication.objects.filter(pk=pk).update(citekey_lower=citekey_lower)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('publications_bootstrap', '0006_publication_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='citekey_lower',
+            field=publications_bootstrap.fields.NullCharField(blank=True, editable=False, max_length=512, null=True),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+import publications_bootstrap.fields
+
+
+class Migration(migrations.Migration):
+    # Separate from the data migration, which PostgreSQL does not allow within the same transaction
+    dependencies = [
+        ('publications_bootstrap', '0007_publication_citekey_lower'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='publication',
+            name='citekey_lower',
+            field=publications_bootstrap.fields.NullCharField(blank=True, editable=False, max_length=512, null=True,
+                                                              unique=True),
+        ),
+    ]
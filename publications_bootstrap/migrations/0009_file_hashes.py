@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from publications_bootstrap.fields import hash_file
+
+app_label = 'publications_bootstrap'
+
+
+def forwards(apps, schema_editor):
+    # Hash the files already stored, missing files are left without hash
+    for model, field, hash_field in (('Publication', 'pdf', 'pdf_hash'), ('PublicationFile', 'file', 'file_hash')):
+        Model = apps.get_model(app_label, model)
+        for instance in Model.objects.exclude(**{field: ''}).exclude(**{field: None}).only('pk', field).iterator():
+            Model.objects.filter(pk=instance.pk).update(**{hash_field: hash_file(getattr(instance, field))})
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('publications_bootstrap', '0008_publication_citekey_lower_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='pdf_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='publicationfile',
+            name='file_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
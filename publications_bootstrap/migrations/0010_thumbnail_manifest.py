@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from publications_bootstrap.fields import hash_file
+
+app_label = 'publications_bootstrap'
+
+
+def forwards(apps, schema_editor):
+    # Hash the images already stored, their thumbnails are generated by the generate_thumbnails command
+    Publication = apps.get_model(app_label, 'Publication')
+    for field, hash_field in (('image', 'image_hash'), ('thumbnail', 'thumbnail_hash')):
+        for publication in Publication.objects.exclude(**{field: ''}).exclude(**{field: None}).only('pk', field) \
+                .iterator():
+            Publication.objects.filter(pk=publication.pk).update(**{hash_field: hash_file(getattr(publication, field))})
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('publications_bootstrap', '0009_file_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='thumbnail_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='thumbnail_manifest',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
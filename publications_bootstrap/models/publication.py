@@ -3,6 +3,7 @@ import warnings
 from string import ascii_uppercase
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.http import urlquote_plus
 from django.utils.translation import ugettext_lazy as _
@@ -10,8 +11,9 @@ from django_countries.fields import CountryField
 from echoices.enums import EChoice, EOrderedChoice
 from echoices.fields import make_echoicefield
 
-from ..fields import NullCharField, PagesField
+from ..fields import NullCharField, PagesField, stored_file_names, update_file_hashes
 from ..models import Type
+from ..tex import tex_to_html
 
 if 'django.contrib.sites' in settings.INSTALLED_APPS:
     from django.contrib.sites.models import Site
@@ -55,6 +57,8 @@ class Publication(models.Model):
     type = models.ForeignKey(Type, db_index=True, on_delete=models.PROTECT)
     citekey = NullCharField(max_length=512, blank=True, null=True, unique=True, db_index=True,
                             help_text='BibTex citation key. Leave blank if unsure.')
+    # Lowercase citekey, indexed for case-insensitive lookups and unique so that they are unambiguous
+    citekey_lower = NullCharField(max_length=512, blank=True, null=True, unique=True, editable=False)
     title = models.CharField(max_length=512, db_index=True)
     authors = models.CharField(max_length=2048,
                                help_text='List of authors separated by commas or <i>and</i>.')
@@ -112,24 +116,33 @@ class Publication(models.Model):
     pdf = models.FileField(upload_to='publications_bootstrap/', verbose_name='PDF', blank=True, null=True)
     image = models.ImageField(upload_to='publications_bootstrap/images/', blank=True, null=True)
     thumbnail = models.ImageField(upload_to='publications_bootstrap/thumbnails/', blank=True, null=True)
+    # SHA-1 of the content of the files, computed when they are saved, versioning their URLs
+    pdf_hash = models.CharField(max_length=40, blank=True, editable=False)
+    image_hash = models.CharField(max_length=40, blank=True, editable=False)
+    thumbnail_hash = models.CharField(max_length=40, blank=True, editable=False)
+    # Name of the manifest of the resized thumbnails, once they are generated
+    thumbnail_manifest = models.CharField(max_length=255, blank=True, editable=False)
     external = models.BooleanField(default=False, db_index=True,
                                    help_text='If publication was written in another lab, mark as external.')
     abstract = models.TextField(blank=True)
+    # HTML of the title and abstract with their TeX math rendered, stored so that listings do not parse them again
+    title_html = models.TextField(blank=True, editable=False)
+    abstract_html = models.TextField(blank=True, editable=False)
     doi = NullCharField(max_length=128, verbose_name='DOI', blank=True, null=True, unique=True)
     isbn = NullCharField(max_length=32, verbose_name='ISBN', blank=True, null=True, unique=True,
                          help_text='Only for a book.')  # A-B-C-D
     status = make_echoicefield(EStatuses, default=EStatuses.PUBLISHED, blank=False)
 
+    # File fields and the fields storing their hashes
+    HASHED_FILES = (('pdf', 'pdf_hash'), ('image', 'image_hash'), ('thumbnail', 'thumbnail_hash'))
+
     def __init__(self, *args, **kwargs):
         models.Model.__init__(self, *args, **kwargs)
 
+        self._file_names = stored_file_names(self, self.HASHED_FILES)
+
         # post-process tags
-        self.tags = self.tags.replace(';', ',')
-        self.tags = self.tags.replace(', and ', ', ')
-        self.tags = self.tags.replace(',and ', ', ')
-        self.tags = self.tags.replace(' and ', ', ')
-        self.tags = [s.strip().lower() for s in self.tags.split(',')]
-        self.tags = ', '.join(self.tags).lower()
+        self.tags = ', '.join(self.parse_tags(self.tags))
 
         self._produce_author_lists()
 
@@ -138,14 +151,8 @@ class Publication(models.Model):
         Parse authors string to create lists of authors.
         """
 
-        # post-process author names
-        self.authors = self.authors.replace(', and ', ', ')
-        self.authors = self.authors.replace(',and ', ', ')
-        self.authors = self.authors.replace(' and ', ', ')
-        self.authors = self.authors.replace(';', ',')
-
         # list of authors
-        self.authors_list = [author.strip() for author in self.authors.split(',')]
+        self.authors_list = self.split_authors(self.authors)
 
         # simplified representation of author names
         self.authors_list_simple = []
@@ -396,15 +403,59 @@ class Publication(models.Model):
 
         return '&'.join(context_obj)
 
+    def render_html(self):
+        """
+        Render the TeX math of the title and abstract to the stored HTML.
+        """
+        self.title_html = tex_to_html(self.title)
+        self.abstract_html = tex_to_html(self.abstract) if self.abstract else ''
+
+    def update_derived_fields(self):
+        """
+        Update the fields derived from the others: the stored HTML, the lowercase citekey and the hashes of the files.
+        """
+        self.render_html()
+        self.citekey_lower = self.citekey.lower() if self.citekey else None
+        update_file_hashes(self, self.HASHED_FILES)
+
+    def save(self, *args, **kwargs):
+        self.update_derived_fields()
+        super(Publication, self).save(*args, **kwargs)
+        self._file_names = stored_file_names(self, self.HASHED_FILES)
+
     def clean(self):
         if not self.citekey:
             self._produce_author_lists()
             self.citekey = self.key()
+        if Publication.objects.filter(citekey_lower=self.citekey.lower()).exclude(pk=self.pk).exists():
+            raise ValidationError({'citekey': 'A publication with this citekey, ignoring case, already exists.'})
 
     @property
     def catalogs(self):
         return self.catalog_set.all()
 
+    @staticmethod
+    def split_authors(authors):
+        """
+        Returns the list of the authors of a string of authors separated by commas, semicolons or 'and'.
+        """
+        authors = authors.replace(', and ', ', ')
+        authors = authors.replace(',and ', ', ')
+        authors = authors.replace(' and ', ', ')
+        authors = authors.replace(';', ',')
+        return [author.strip() for author in authors.split(',')]
+
+    @staticmethod
+    def parse_tags(tags):
+        """
+        Returns the list of the lowercase tags of a string of tags separated by commas, semicolons or 'and'.
+        """
+        tags = tags.replace(';', ',')
+        tags = tags.replace(', and ', ', ')
+        tags = tags.replace(',and ', ', ')
+        tags = tags.replace(' and ', ', ')
+        return [s.strip().lower() for s in tags.split(',')]
+
     @staticmethod
     def simplify_name(name):
         name = name.lower()
@@ -2,6 +2,7 @@
 
 from django.db import models
 
+from ..fields import stored_file_names, update_file_hashes
 from ..models import Publication
 
 
@@ -12,6 +13,19 @@ class PublicationFile(models.Model):
     publication = models.ForeignKey(Publication, on_delete=models.CASCADE)
     description = models.CharField(max_length=256)
     file = models.FileField(upload_to='publications_bootstrap/')
+    # SHA-1 of the content of the file, computed when it is saved, versioning its URL
+    file_hash = models.CharField(max_length=40, blank=True, editable=False)
+
+    HASHED_FILES = (('file', 'file_hash'),)
+
+    def __init__(self, *args, **kwargs):
+        super(PublicationFile, self).__init__(*args, **kwargs)
+        self._file_names = stored_file_names(self, self.HASHED_FILES)
+
+    def save(self, *args, **kwargs):
+        update_file_hashes(self, self.HASHED_FILES)
+        super(PublicationFile, self).save(*args, **kwargs)
+        self._file_names = stored_file_names(self, self.HASHED_FILES)
 
     def __unicode__(self):
         return self.description
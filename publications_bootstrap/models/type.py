@@ -1,9 +1,37 @@
 # -*- coding: utf-8 -*-
 
 from django.db import models
+from django.utils.functional import cached_property
 
 from ordered_model.models import OrderedModel
 
+# convert bibtex type to RIS type
+BIBTEX_TO_RIS = {
+    'article': 'JOUR',
+    'book': 'BOOK',
+    'booklet': 'PAMP',
+    'inbook': 'CHAP',
+    'conference': 'CHAP',
+    'inproceedings': 'CHAP',
+    'incollection': 'CHAP',
+    'manual': 'BOOK',
+    'masterthesis': 'THES',
+    'phdthesis': 'THES',
+    'misc': 'GEN',
+    'proceedings': 'CONF',
+    'techreport': 'RPRT',
+    'unpublished': 'UNPB',
+    'patent': 'PAT',
+    'abstract': 'ABST',
+}
+
+# convert type title to MODS genre, defaults to the lowercase title
+TYPE_TO_MODS_GENRE = {
+    'conference': 'conference publication',
+    'book chapter': 'bibliography',
+    'unpublished': 'article'
+}
+
 
 class Type(OrderedModel):
     class Meta:
@@ -22,47 +50,34 @@ class Type(OrderedModel):
     def __str__(self):
         return self.title
 
-    def __init__(self, *args, **kwargs):
-        OrderedModel.__init__(self, *args, **kwargs)
+    def save(self, *args, **kwargs):
+        # store the normalized representation, so that it does not need to be processed again when loaded
+        self.bibtex_types = ', '.join(self.parse_bibtex_types(self.bibtex_types))
+        self.__dict__.pop('bibtex_type_list', None)
+        super(Type, self).save(*args, **kwargs)
 
-        self.bibtex_types = self.bibtex_types.replace('@', '')
-        self.bibtex_types = self.bibtex_types.replace(';', ',')
-        self.bibtex_types = self.bibtex_types.replace('and', ',')
-        self.bibtex_type_list = [s.strip().lower() for s in self.bibtex_types.split(',')]
-        self.bibtex_types = ', '.join(self.bibtex_type_list)
-        self.bibtex_type = self.bibtex_type_list[0]
+    @cached_property
+    def bibtex_type_list(self):
+        return self.parse_bibtex_types(self.bibtex_types)
+
+    @property
+    def bibtex_type(self):
+        return self.bibtex_type_list[0]
 
     def ris_type(self):
-        # convert bibtex type to RIS type
-        bibtex2ris = {
-            'article': 'JOUR',
-            'book': 'BOOK',
-            'booklet': 'PAMP',
-            'inbook': 'CHAP',
-            'conference': 'CHAP',
-            'inproceedings': 'CHAP',
-            'incollection': 'CHAP',
-            'manual': 'BOOK',
-            'masterthesis': 'THES',
-            'phdthesis': 'THES',
-            'misc': 'GEN',
-            'proceedings': 'CONF',
-            'techreport': 'RPRT',
-            'unpublished': 'UNPB',
-            'patent': 'PAT',
-            'abstract': 'ABST',
-        }
-        return bibtex2ris.get(self.bibtex_type, 'GEN')
+        return BIBTEX_TO_RIS.get(self.bibtex_type, 'GEN')
 
     def mods_genre(self):
         """
         Guesses an appropriate MODS XML genre type.
         """
 
-        type2genre = {
-            'conference': 'conference publication',
-            'book chapter': 'bibliography',
-            'unpublished': 'article'
-        }
         tp = str(self.title).lower()
-        return type2genre.get(tp, tp)
+        return TYPE_TO_MODS_GENRE.get(tp, tp)
+
+    @staticmethod
+    def parse_bibtex_types(bibtex_types):
+        bibtex_types = bibtex_types.replace('@', '')
+        bibtex_types = bibtex_types.replace(';', ',')
+        bibtex_types = bibtex_types.replace('and', ',')
+        return [s.strip().lower() for s in bibtex_types.split(',')]
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Type
+
+
+class TypeRegistry(object):
+    """
+    Process-level index of the publication types, to resolve them by primary key or BibTex type without querying the
+    database. It is built lazily on first access and cleared whenever a type is saved or deleted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _build(self):
+        types = list(Type.objects.all())
+        by_pk = {}
+        by_bibtex_type = {}
+        for t in types:
+            by_pk[t.pk] = t
+            for bibtex_type in t.bibtex_type_list:
+                # types are ordered, the first one declaring a BibTex type wins
+                by_bibtex_type.setdefault(bibtex_type, t)
+        return {
+            'types': types,
+            'by_pk': by_pk,
+            'by_bibtex_type': by_bibtex_type,
+            'bibtex_type': {t.pk: t.bibtex_type for t in types},
+            'ris_type': {t.pk: t.ris_type() for t in types},
+            'mods_genre': {t.pk: t.mods_genre() for t in types},
+        }
+
+    @property
+    def index(self):
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build()
+                index = self._index
+        return index
+
+    def clear(self):
+        self._index = None
+
+    def all(self):
+        return self.index['types']
+
+    def get(self, pk):
+        """
+        Returns the type with the given primary key, or None.
+        """
+        return self.index['by_pk'].get(pk)
+
+    def get_by_bibtex_type(self, bibtex_type):
+        """
+        Returns the first type, in their defined order, declaring the given BibTex type, or None.
+        """
+        return self.index['by_bibtex_type'].get(bibtex_type.lower())
+
+    def bibtex_type_index(self):
+        """
+        Returns a mapping of the BibTex types to the primary key of the corresponding type.
+        """
+        return {bibtex_type: t.pk for bibtex_type, t in self.index['by_bibtex_type'].items()}
+
+    def bibtex_type(self, pk):
+        return self.index['bibtex_type'].get(pk, 'misc')
+
+    def ris_type(self, pk):
+        return self.index['ris_type'].get(pk, 'GEN')
+
+    def mods_genre(self, pk):
+        return self.index['mods_genre'].get(pk, '')
+
+
+type_registry = TypeRegistry()
+
+
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+def clear_type_registry(sender, **kwargs):
+    type_registry.clear()
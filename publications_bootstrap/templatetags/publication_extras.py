@@ -1,27 +1,37 @@
 # -*- coding: utf-8 -*-
 
 import os
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from distutils.version import StrictVersion
-from re import sub
+from functools import lru_cache
+from operator import itemgetter
 
 import django
-from django.template import Library, RequestContext
+from django.db.models import Q
+from django.template import Library, Node, RequestContext, TemplateSyntaxError
+from django.template.base import token_kwargs
 from django.template.loader import get_template, render_to_string
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
 
+try:
+    from django.urls import get_script_prefix, get_urlconf, reverse  # Django 1.10+
+except ImportError:
+    from django.core.urlresolvers import get_script_prefix, get_urlconf, reverse
+
 from ..apps import PublicationsBootstrapConfig
-from ..models import Publication, Catalog, Type
-from ..utils import populate
+from ..caching import CATALOGS, PUBLICATIONS, cached, catalog_version
+from ..citations import CLOSING_BRACKETS, MARKER_PATTERN, MARKER_TEMPLATES, compile_marker, get_style, parse_marker, \
+    template_name
+from ..downloads import download_url as get_download_url
+from ..models import Publication, Catalog
+from ..registry import type_registry
+from ..tex import GREEK_LETTERS, tex_to_html  # noqa
+from ..thumbnails import get_thumbnail as get_publication_thumbnail
+from ..utils import escape_text, filter_publications, get_year_archive, populate, sort_publications
 
 register = Library()
 
-GREEK_LETTERS = \
-    '[Aa]lpha|[Bb]eta|[Gg]amma|[Dd]elta|[Ee]psilon|[Zz]eta|' + \
-    '[Ee]ta|[Tt]heta|[Ll]ambda|[Mm]u|[Nn]u|[Pp]i|[Ss]igma|[Tt]au|' + \
-    '[Pp]hi|[Pp]si|[Cc]hi|[Oo]mega|[Rr]ho|[Xx]i|[Kk]appa'
-
 DEFAULT_MARKER = '[#1-,'
 DEFAULT_CITATION_STYLE = 'chicago'
 DEFAULT_BIBLIOGRAPHY_LAYOUT = 'card'
@@ -39,10 +49,11 @@ def render_template(template, request, context={}):
 class CitationManger:
     import re
 
-    marker_pattern = re.compile(
-        r'(?P<sup>^\^?)(?P<open>[<({\[]?)(?P<href>#?)(?P<style>1)(?P<ranging>-?)(?P<separator>[^-]+)')
-    closing_brackets = {'[': ']', '(': ')', '{': '}', '<': '>'}
-    styles_templates = {'1': 'numbered'}
+    marker_pattern = MARKER_PATTERN
+    closing_brackets = CLOSING_BRACKETS
+    styles_templates = MARKER_TEMPLATES
+    placeholder = '<!-- citation:{} -->'
+    placeholder_pattern = re.compile(r'<!-- citation:(\d+) -->')
 
     def __init__(self, **kwargs):
         marker = kwargs.setdefault('marker', PublicationsBootstrapConfig.defaults.get('marker', DEFAULT_MARKER))
@@ -52,74 +63,227 @@ class CitationManger:
                                          PublicationsBootstrapConfig.defaults.get('bibliography',
                                                                                   DEFAULT_BIBLIOGRAPHY_LAYOUT))
 
-        self.sorting = kwargs.setdefault('sorting',  # FIXME: Not yet supported
+        self.sorting = kwargs.setdefault('sorting',
                                          PublicationsBootstrapConfig.defaults.get('sorting', DEFAULT_SORTING))
 
-        options = {}
-        if os.path.sep not in marker:
-            # Assume it's not a path to a custom template
-            options.update(self.marker_pattern.match(marker).groupdict())
-            if options['open']:
-                options['close'] = self.closing_brackets[options['open']]
-            marker = 'publications_bootstrap/bibliography/markers/{}.html'.format(
-                self.styles_templates[options['style']])
-        self.marker = marker
-        self.marker_options = options
-        self.marker_options['separator'] = self.re.sub(r'\s', '&nbsp;', self.marker_options['separator'])
-        if os.path.sep not in citation:
-            citation = 'publications_bootstrap/citations/{}.html'.format(citation)
-        self.citation = citation
+        # Template and options of the marker, for custom bibliography templates
+        self.marker, self.marker_options = parse_marker(marker)
+        self.marker_format = compile_marker(marker)
+        # Without hyperlink on 'self' item, in the bibliography
+        self.reference_marker_format = compile_marker(marker, href=False)
+        self.citation_style = get_style(citation)
+        # Template of the style, for custom bibliography templates
+        self.citation = template_name(citation)
         if os.path.sep not in bibliography:
             bibliography = 'publications_bootstrap/bibliography/{}.html'.format(bibliography)
         self.bibliography = bibliography
         self.cited = OrderedDict()
+        # Depth of the enclosing `citations` blocks, and the citation tags deferred until the end of the outermost
+        self.deferred = 0
+        self.events = []
+        # Numbers given in advance to the publications cited in deferred tags, see `_numberings`
+        self.numbers = {}
 
     def cite(self, context, *puids):
+        if self.deferred:
+            return self._defer('cite', puids)
+        return self._cite(context, _get_publications(puids, context).values())
+
+    def _cite(self, context, publications):
         references = []
-        for r, p in self.nocite(*puids):
+        for r, p in self._number(publications):
             if references and references[-1][-1][0] + 1 == r:
                 references[-1].append((r, p))
             else:
                 references.append([(r, p)])
-        return render_template(self.marker, context['request'], dict(references=references, marker=self.marker_options))
+        return self.marker_format.format(references, context.get('request'))
 
-    def nocite(self, *puids):
-        from operator import itemgetter
+    def nocite(self, context, *puids):
+        if self.deferred:
+            self._defer('nocite', puids)
+            return []
+        return self._number(_get_publications(puids, context).values())
+
+    def _number(self, publications):
         batch = []
-        for puid in puids:
-            publication = _get_publication(puid)
+        for publication in publications:
             # Ref key is numeric
-            batch.append(self.cited.setdefault(publication.pk, (len(self.cited.keys()) + 1, publication)))
+            number = self.numbers.get(publication.pk) or len(self.cited.keys()) + 1
+            batch.append(self.cited.setdefault(publication.pk, (number, publication)))
         batch.sort(key=itemgetter(0))
         return batch
 
-    def thebibliography(self, context, title=DEFAULT_BIBLIOGRAPHY_TITLE, **kwargs):
-        sorting = kwargs.get('sorting', self.sorting)  # FIXME: Not yet supported
+    def thebibliography(self, context, title=DEFAULT_BIBLIOGRAPHY_TITLE, clear=False, **kwargs):
+        if self.deferred:
+            return self._defer('thebibliography', dict(kwargs, title=title, clear=clear))
+        sorting = kwargs.get('sorting', self.sorting)
         if sorting == 'referenced':
-            references = self.cited.values()
+            references = sorted(self.cited.values(), key=itemgetter(0))
         else:
-            # TODO: by author, by title
-            raise NotImplementedError
+            # Outside of a `citations` block, the markers are already rendered and keep their numbers
+            references = [self.cited[p.pk] for p in sort_publications([p for _, p in self.cited.values()], sorting)]
         marker_options = dict(self.marker_options)
         marker_options.pop('href', None)  # Remove hyperlink on 'self' item
-        return render_template(self.bibliography, context['request'],
-                               dict(title=title, references=references, marker=self.marker,
-                                    marker_options=marker_options, citation=self.citation))
+        request = context.get('request')
+        citations = self.citation_style.format_all([publication for _, publication in references], request)
+        entries = [dict(reference=reference, publication=reference[1], citation=citation,
+                        marker=self.reference_marker_format.format([[reference]], request))
+                   for reference, citation in zip(references, citations)]
+        bibliography = render_template(self.bibliography, request,
+                                       dict(title=title, references=references, entries=entries, marker=self.marker,
+                                            marker_options=marker_options, citation=self.citation))
+        if clear:
+            self.clear()
+        return bibliography
+
+    def _defer(self, tag, arguments):
+        """
+        Record a citation tag until the end of the enclosing `citations` block and return its placeholder.
+        """
+        self.events.append((tag, arguments))
+        return mark_safe(self.placeholder.format(len(self.events) - 1))
+
+    def resolve(self, context, output):
+        """
+        Replace the placeholders in `output` by the citation markers and bibliographies, after having fetched all the
+        cited publications with a single query.
+        """
+        events, self.events = self.events, []
+        publications = _get_publications(
+            [puid for tag, arguments in events if tag != 'thebibliography' for puid in arguments], context)
+        numberings = self._numberings(events, publications)
+        rendered = {}
+        try:
+            self.numbers = numberings.pop(0)
+            for i, (tag, arguments) in enumerate(events):
+                if tag == 'cite':
+                    rendered[i] = self._cite(context, [publications[puid] for puid in arguments])
+                elif tag == 'nocite':
+                    self._number(publications[puid] for puid in arguments)
+                else:
+                    rendered[i] = self.thebibliography(context, **arguments)
+                    if arguments['clear']:
+                        self.numbers = numberings.pop(0)
+        finally:
+            self.numbers = {}
+        return mark_safe(self.placeholder_pattern.sub(lambda m: rendered[int(m.group(1))], output))
+
+    def _numberings(self, events, publications):
+        """
+        Number the publications cited in deferred tags in the order of the bibliography listing them, so that the
+        markers match a bibliography sorted by author, title, etc. The publications cited before keep their numbers, as
+        their markers may already be rendered.
+
+        Returns
+        -------
+        list of dict
+            Numbers by publication pk, for the tags up to each bibliography clearing the references, then the rest.
+        """
+        numberings = []
+        numbers = {pk: number for pk, (number, _) in self.cited.items()}
+        cited = OrderedDict((pk, publication) for pk, (_, publication) in self.cited.items())
+        for tag, arguments in events:
+            if tag != 'thebibliography':
+                for puid in arguments:
+                    cited.setdefault(publications[puid].pk, publications[puid])
+                continue
+            pending = [publication for pk, publication in cited.items() if pk not in numbers]
+            sorting = arguments.get('sorting', self.sorting)
+            if sorting != 'referenced':
+                pending = sort_publications(pending, sorting)
+            for publication in pending:
+                numbers[publication.pk] = len(numbers) + 1
+            if arguments['clear']:
+                numberings.append(numbers)
+                numbers, cited = {}, OrderedDict()
+        numberings.append(numbers)
+        return numberings
 
     def clear(self):
         self.cited.clear()
 
 
-__citations_manager = None
+CITATIONS_MANAGER_ATTR = '_publications_bootstrap_citations'
+PUBLICATIONS_MAP_ATTR = '_publications_bootstrap_publications'
 
 
-def _get_publication(uid):
-    # TODO: add this to a custom models.Manager
+def _page_store(context):
+    """
+    Return the dictionary holding the state of the page being rendered, like the citation manager: the attributes of
+    the request when there is one, so that separately rendered templates of the same page share it, else the root of
+    the render context, which is shared by all the templates included in this rendering.
+    """
+    request = getattr(context, 'request', None) or context.get('request')
+    if request is not None:
+        return request.__dict__
+    return context.render_context.dicts[0]
+
+
+def _get_citations_manager(context, **kwargs):
+    """
+    Return the citation manager of the page being rendered, creating it with `kwargs` when there is none yet.
+    """
+    holder = _page_store(context)
+    manager = holder.get(CITATIONS_MANAGER_ATTR)
+    if manager is None:
+        # Assume new page
+        manager = holder[CITATIONS_MANAGER_ATTR] = CitationManger(**kwargs)
+    return manager
+
+
+def _uid_key(uid):
+    # Citekeys are case-insensitive
     try:
-        pbl = Publication.objects.get(pk=int(uid))
+        return int(uid)
     except ValueError:
-        pbl = Publication.objects.get(citekey__iexact=uid)
-    return pbl
+        return uid.lower()
+
+
+def _get_publication(uid, context=None):
+    return _get_publications([uid], context)[uid]
+
+
+def _get_publications(uids, context=None):
+    """
+    Get several publications with a single query, or none for the publications already got for the same page.
+
+    Parameters
+    ----------
+    uids : iterable of int or str
+        Publication unique ids, either pks or citekeys.
+    context : Context
+        Context of the page being rendered, whose publications are kept by pk and lowercase citekey, so that each of
+        them is queried once.
+
+    Returns
+    -------
+    OrderedDict
+        Publications by unique id, in the order of `uids`.
+
+    Raises
+    ------
+    Publication.DoesNotExist
+        If any of the unique ids matches no publication.
+    """
+    known = _page_store(context).setdefault(PUBLICATIONS_MAP_ATTR, {}) if context is not None else {}
+    uids = list(OrderedDict.fromkeys(uids))
+    pks, citekeys = set(), set()
+    for uid in uids:
+        key = _uid_key(uid)
+        if key not in known:
+            (pks if isinstance(key, int) else citekeys).add(key)
+    if pks or citekeys:
+        publications = Publication.objects.select_related('type')
+        for publication in publications.filter(Q(pk__in=pks) | Q(citekey_lower__in=citekeys)).order_by():
+            known[publication.pk] = publication
+            if publication.citekey_lower:
+                known[publication.citekey_lower] = publication
+    found = OrderedDict()
+    for uid in uids:
+        found[uid] = known.get(_uid_key(uid))
+        if found[uid] is None:
+            raise Publication.DoesNotExist('No publication matches "{}".'.format(uid))
+    return found
 
 
 def _get_catalog(id_or_title):
@@ -142,9 +306,9 @@ def get_publication(context, puid, template='publications_bootstrap/components/p
         Publication unique id, either pk or citekey.
     """
     try:
-        pbl = _get_publication(puid)
-        pbl.links = pbl.publicationlink_set.all()
-        pbl.files = pbl.publicationfile_set.all()
+        pbl = _get_publication(puid, context)
+        if not hasattr(pbl, 'links'):
+            populate([pbl])
 
         return render_template(template, context['request'], {'publication': pbl})
     except Publication.DoesNotExist:
@@ -152,47 +316,117 @@ def get_publication(context, puid, template='publications_bootstrap/components/p
 
 
 @register.simple_tag(takes_context=True)
-def get_publications(context, template='publications_bootstrap/components/publications.html'):
+def preload_publications(context, *puids):
+    """
+    Get the publications used in the page with a single query, plus one for their links and one for their files, so
+    that the following `get_publication`, `get_citation` and `cite` tags do not query them again.
+
+    Parameters
+    ----------
+    context
+    puids
+        Publication(s) unique id, either pk or citekey. Unknown ones are ignored.
+
+    Returns
+    -------
+    str
+        Empty string
+    """
+    try:
+        _get_publications(puids, context)
+    except Publication.DoesNotExist:
+        pass  # Reported by the tags using them
+    known = _page_store(context)[PUBLICATIONS_MAP_ATTR]
+    publications = OrderedDict()
+    for publication in (known.get(_uid_key(puid)) for puid in puids):
+        if publication is not None and not hasattr(publication, 'links'):
+            publications[publication.pk] = publication
+    if publications:
+        populate(list(publications.values()))
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def get_publications(context, template='publications_bootstrap/components/publications.html', **kwargs):
     """
-    Get all publications.
+    Get all publications, or some of them.
+
+    The output is cached until a publication, type, link or file is changed.
+
+    Parameters
+    ----------
+    context
+    template : str
+    kwargs
+        Filters, ordering and slicing, applied by the database: year, type, tag, author, catalog, status, order, limit
+        and offset. See `utils.filter_publications`. For example::
+
+            {% get_publications year='2010-2014' type='article' tag='population coding' limit=10 %}
     """
 
-    types = Type.objects.filter(hidden=False)
-    publications = Publication.objects.select_related()
-    publications = publications.filter(external=False, type__in=types)
+    def render():
+        publications = list(filter_publications(Publication.objects.select_related('type'), **kwargs))
 
-    if not publications:
-        return render_template('publications_bootstrap/components/empty.html', context['request'])
+        if not publications:
+            return render_template('publications_bootstrap/components/empty.html', context['request'])
+
+        populate(publications)  # load custom links and files
+        return render_template(template, context['request'], {'publications': publications})
 
-    publications = publications.order_by('-year', '-month', '-id')
-    populate(publications)  # load custom links and files
-    return render_template(template, context['request'], {'publications': publications})
+    versions = [PUBLICATIONS]
+    if kwargs.get('catalog') not in (None, ''):
+        versions += [CATALOGS, catalog_version(kwargs['catalog'])]
+    return mark_safe(cached('get_publications', (template, sorted(kwargs.items())), versions, render))
 
 
 @register.simple_tag(takes_context=True)
 def get_catalog(context, id_or_title, template='publications_bootstrap/components/section.html'):
     """
     Get a publication catalog.
+
+    The output is cached until a publication or a catalog is changed.
     """
-    try:
-        catalog = _get_catalog(id_or_title)
 
-        publications = catalog.publications.all()
-        if not publications:
-            raise Publication.DoesNotExist
-        publications = publications.order_by('-year', '-month', '-id')
-
-        # load custom links and files
-        populate(publications)
-
-        return render_template(template, context['request'], {'title': id_or_title, 'publications': publications})
-    except Catalog.DoesNotExist:
-        return render_template('publications_bootstrap/components/empty.html', context['request'],
-                               {'error': True, 'alert':
-                                   {'heading': 'Zut!',
-                                    'message': 'There is no such catalog named "%"'.format(id_or_title)}})
-    except Publication.DoesNotExist:
-        return render_template('publications_bootstrap/components/empty.html', context['request'])
+    def render():
+        try:
+            catalog = _get_catalog(id_or_title)
+
+            publications = list(catalog.publications.order_by('-year', '-month', '-id'))
+            if not publications:
+                raise Publication.DoesNotExist
+
+            # load custom links and files
+            populate(publications)
+
+            return render_template(template, context['request'], {'title': id_or_title, 'publications': publications})
+        except Catalog.DoesNotExist:
+            return render_template('publications_bootstrap/components/empty.html', context['request'],
+                                   {'error': True, 'alert':
+                                       {'heading': 'Zut!',
+                                        'message': 'There is no such catalog named "%"'.format(id_or_title)}})
+        except Publication.DoesNotExist:
+            return render_template('publications_bootstrap/components/empty.html', context['request'])
+
+    return mark_safe(cached('get_catalog', (str(id_or_title), template),
+                            [PUBLICATIONS, CATALOGS, catalog_version(id_or_title)], render))
+
+
+@register.simple_tag(takes_context=True)
+def year_archive(context, by_type=False, template='publications_bootstrap/components/year_archive.html'):
+    """
+    Render the years of the publications with their number of publications, linked to their page.
+
+    The years are cached until a publication or a type is changed.
+
+    Parameters
+    ----------
+    context
+    by_type : bool
+        Whether to also show the number of publications of each type.
+    template : str
+        Template receiving the `years`, as returned by `utils.get_year_archive`.
+    """
+    return render_template(template, context.get('request'), {'years': get_year_archive(by_type), 'by_type': by_type})
 
 
 @register.simple_tag(takes_context=True)
@@ -205,26 +439,27 @@ def get_citation(context, puid, style=DEFAULT_CITATION_STYLE):
     context
     puid : int
         Publication unique id, either pk or citekey.
-    style
+    style : str
+        Name of a registered citation style (see `publications_bootstrap.citations`), or else name or path of a
+        template.
 
     Returns
     -------
 
     """
-    pbl = _get_publication(puid)
-    if os.path.sep not in style:
-        style = 'publications_bootstrap/citations/{}.html'.format(style)
-    return render_template(style, context['request'], {'publication': pbl})
+    pbl = _get_publication(puid, context)
+    return get_style(style).format(pbl, context.get('request'))
 
 
-@register.simple_tag(takes_context=False)
-def setup_citations(**kwargs):
+@register.simple_tag(takes_context=True)
+def setup_citations(context, **kwargs):
     """
     Define parameters for the layout of the citation marker and style and the bibliography.
     Will remain until it is redefined with `setup_citations` or reset with `thebibliography(reset=True)`.
 
     Parameters
     ----------
+    context
     kwargs
         marker : str
             Marker specifications or path to custom template. Specifications are a mini-language:
@@ -238,9 +473,11 @@ def setup_citations(**kwargs):
             * and separate the citations with a comma without trailing space (,; must be at least one char different
               from '-').
         citation : str
-            Template name in default location or path to custom template
+            Name of a registered citation style, or template name in default location or path to custom template
         bibliography : str
             Template name in default location or path to custom template
+        sorting : str
+            Default order of the references in the bibliography, see `thebibliography`
 
     Returns
     -------
@@ -248,8 +485,7 @@ def setup_citations(**kwargs):
         Empty string
 
     """
-    global __citations_manager
-    __citations_manager = CitationManger(**kwargs)
+    _page_store(context)[CITATIONS_MANAGER_ATTR] = CitationManger(**kwargs)
     return ''
 
 
@@ -271,19 +507,17 @@ def cite(context, *puids, **kwargs):
     -------
 
     """
-    if __citations_manager is None:
-        # Assume new page
-        setup_citations(**kwargs)
-    return __citations_manager.cite(context, *puids)
+    return _get_citations_manager(context, **kwargs).cite(context, *puids)
 
 
-@register.simple_tag(takes_context=False)
-def nocite(*puids, **kwargs):
+@register.simple_tag(takes_context=True)
+def nocite(context, *puids, **kwargs):
     """
     Like \nocite{} in LaTeX, add the publication(s) to the bibliography but generate no marker.
 
     Parameters
     ----------
+    context
     puids
         Publication unique id, either pk or citekey.
 
@@ -293,10 +527,7 @@ def nocite(*puids, **kwargs):
         Empty string
 
     """
-    if __citations_manager is None:
-        # Assume new page
-        setup_citations(**kwargs)
-    __citations_manager.nocite(*puids)
+    _get_citations_manager(context, **kwargs).nocite(context, *puids)
     return ''
 
 
@@ -310,42 +541,123 @@ def thebibliography(context, clear=True, reset=False, **kwargs):
     context
     clear : bool
         Clear the references of cited publications. Else, the next bibliography will also contain the publications
-        listed here, as the references persist through the templates.
+        listed here, as the references persist through the templates rendered for the same request.
     reset : bool
         The next bibliography will be generated using new settings. Otherwise, the next bibliographies will all use the
         same parameters as this one, unless `setup_citations` is used.
     kwargs
-        Not yet supported, for future features
+        title : str
+            Title of the bibliography
+        sorting : str
+            Order of the references: 'referenced' (order of citation), 'author', 'title', 'year' or 'citekey'. Within
+            a `citations` block, the references are numbered in this order; otherwise they keep the numbers of their
+            markers.
 
     Returns
     -------
 
     """
-    global __citations_manager
-    bibliography = __citations_manager.thebibliography(context, **kwargs)
-    if clear:
-        __citations_manager.clear()
+    bibliography = _get_citations_manager(context).thebibliography(context, clear=clear, **kwargs)
     if reset:
-        __citations_manager = None
+        _page_store(context).pop(CITATIONS_MANAGER_ATTR, None)
     return bibliography
 
 
+class CitationsNode(Node):
+    def __init__(self, nodelist, kwargs):
+        self.nodelist = nodelist
+        self.kwargs = kwargs
+
+    def render(self, context):
+        kwargs = {key: value.resolve(context) for key, value in self.kwargs.items()}
+        manager = _get_citations_manager(context, **kwargs)
+        manager.deferred += 1
+        try:
+            output = self.nodelist.render(context)
+        except Exception:
+            if manager.deferred == 1:
+                manager.events = []
+            raise
+        finally:
+            manager.deferred -= 1
+        if manager.deferred:
+            # The outermost block resolves the citations
+            return output
+        return manager.resolve(context, output)
+
+
+@register.tag
+def citations(parser, token):
+    """
+    Defer the rendering of the `cite`, `nocite` and `thebibliography` tags enclosed until `endcitations`, so that all
+    the cited publications are fetched with a single query, instead of one query per `cite`.
+
+    Usage::
+
+        {% citations marker='^[#1-,' %}
+            ... {% cite 'Ecker2014a' 2 %} ...
+            {% thebibliography %}
+        {% endcitations %}
+
+    The keyword arguments are the same as `setup_citations`, and are only effective if no citation has been set up
+    yet for the page.
+    """
+    bits = token.split_contents()[1:]
+    kwargs = token_kwargs(bits, parser)
+    if bits:
+        raise TemplateSyntaxError("'citations' only accepts keyword arguments, got '{}'".format(' '.join(bits)))
+    nodelist = parser.parse(('endcitations',))
+    parser.delete_first_token()
+    return CitationsNode(nodelist, kwargs)
+
+
 @register.filter()
 def tex_parse(string):
     """
     Renders some basic TeX math to HTML.
     """
-    string = string.replace('{', '').replace('}', '')
+    return tex_to_html(string)
+
+
+@register.filter()
+def bibtex_type(publication):
+    """
+    BibTex type of a publication, resolved without querying its type.
+    """
+    return type_registry.bibtex_type(publication.type_id)
 
-    def tex_replace(match):
-        return \
-            sub(r'\^(\w)', r'<sup>\1</sup>',
-                sub(r'\^\{(.*?)\}', r'<sup>\1</sup>',
-                    sub(r'\_(\w)', r'<sub>\1</sub>',
-                        sub(r'\_\{(.*?)\}', r'<sub>\1</sub>',
-                            sub(r'\\(' + GREEK_LETTERS + ')', r'&\1;', match.group(1))))))
 
-    return mark_safe(sub(r'\$([^\$]*)\$', tex_replace, escape(string)))
+@register.filter()
+def ris_type(publication):
+    """
+    RIS type of a publication, resolved without querying its type.
+    """
+    return type_registry.ris_type(publication.type_id)
+
+
+@register.filter()
+def mods_genre(publication):
+    """
+    MODS genre of a publication, resolved without querying its type.
+    """
+    return type_registry.mods_genre(publication.type_id)
+
+
+@register.simple_tag()
+def get_thumbnail(publication):
+    """
+    Thumbnail of a publication, with its smallest JPEG as `src` (and its `width` and `height`) and `srcsets` by content
+    type, or None.
+    """
+    return get_publication_thumbnail(publication)
+
+
+@register.filter()
+def download_url(obj):
+    """
+    URL of the download view for the PDF of a publication, or for a publication file, versioned by content.
+    """
+    return get_download_url(obj)
 
 
 @register.filter(is_safe=False)
@@ -353,16 +665,79 @@ def as_list(o):
     return [o]
 
 
-@register.filter()
-def flatten_authors(authors, args=None):
+AuthorsOptions = namedtuple('AuthorsOptions', ['separator', 'limit', 'last', 'et_al', 'template'])
+
+
+@lru_cache(maxsize=256)
+def _authors_options(args):
+    """
+    Options of `flatten_authors`, parsed once per argument string.
+    """
     from django.http import QueryDict
     qs = QueryDict(args)
     separator = qs.get('separator', ',')
-    limit = max(int(qs.get('limit', 8)), 0)
+    return AuthorsOptions(separator=separator,
+                          limit=max(int(qs.get('limit', 8)), 0),
+                          last=qs.get('last', separator),
+                          et_al=qs.get('et_al', ',&nbsp;<i>et al.</i>'),
+                          template=qs.get('template', PublicationsBootstrapConfig.defaults.get('authors_template')))
+
+
+@lru_cache(maxsize=8192)
+def _author_link(author, author_escaped, urlconf, prefix):
+    # The URL configuration and script prefix are part of the key, as they change the URL
+    url = reverse('publications_bootstrap:author', args=[author_escaped], urlconf=urlconf)
+    return '<a href="{}">{}</a>'.format(escape(url), escape_text(author))
+
+
+@register.filter()
+def flatten_authors(authors, args=None):
+    """
+    Render a list of authors as links to their publications.
+
+    Parameters
+    ----------
+    authors : list of tuple
+        Authors names and their escaped version, as given by `Publication.authors_escaped`.
+    args : str
+        Options as a query string:
+        separator : str
+            Between authors, ',' by default.
+        limit : int
+            Maximal number of authors displayed, 8 by default, 0 for all.
+        last : str
+            Separator before the last author, ignored if not all the authors are displayed. `separator` by default.
+        et_al : str
+            HTML appended if some authors are not displayed, ',&nbsp;<i>et al.</i>' by default.
+        template : str
+            Path to a custom template rendering the authors, for example
+            'publications_bootstrap/filters/authors.html'. Can also be set with
+            `PUBLICATIONS_BOOTSTRAP_AUTHORS_TEMPLATE`. By default, the authors are rendered without template.
+
+    Returns
+    -------
+    SafeText
+    """
+    options = _authors_options(args)
+    limit = options.limit
     # 'last' is ignored if it can not be applied (limit < #authors)
-    last = qs.get('last', separator) if not limit or limit >= len(authors) else separator
-    limit = limit if limit > 0 else ''
-    et_al = qs.get('et_al', ',&nbsp;<i>et al.</i>')
-    template = qs.get('template', 'publications_bootstrap/filters/authors.html')
-    return render_to_string(template,
-                            dict(authors=authors, limit=str(limit), separator=separator, last=last, et_al=et_al))
+    complete = not limit or limit >= len(authors)
+    last = options.last if complete else options.separator
+    if options.template:
+        return render_to_string(options.template,
+                                dict(authors=authors, limit=str(limit or ''), separator=options.separator, last=last,
+                                     et_al=options.et_al))
+
+    displayed = authors[:limit] if limit else authors
+    urlconf, prefix = get_urlconf(), get_script_prefix()
+    separator, last = escape(options.separator) + '\n', escape(last) + '\n'
+    html = []
+    for i, (author, author_escaped) in enumerate(displayed, 1):
+        html.append(_author_link(author, author_escaped, urlconf, prefix))
+        if i == len(displayed) - 1:
+            html.append(last)
+        elif i < len(displayed):
+            html.append(separator)
+    if not complete:
+        html.append(options.et_al)
+    return mark_safe(''.join(html))
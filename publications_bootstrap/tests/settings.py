@@ -47,6 +47,9 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Cached output would outlive the data of the test which rendered it, tests enable the cache when needed
+PUBLICATIONS_BOOTSTRAP_CACHE = None
+
 # MEDIA CONFIGURATION
 # ------------------------------------------------------------------------------
 # See: https://docs.djangoproject.com/en/stable/ref/settings/#media-root
@@ -1,15 +1,19 @@
 # -*- coding: utf-8 -*-
 import warnings
 from distutils.version import StrictVersion
+from unittest import mock
 
 import django
 from django.contrib.auth.models import User
+from django.db import connection
 from django.http import HttpRequest
-from django.template import RequestContext, Template
-from django.test import TestCase
+from django.template import Context, RequestContext, Template
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 
 from ..models import Catalog, Publication, PublicationLink, Type
 from ..templatetags.publication_extras import tex_parse
+from ..utils import filter_publications, sort_publications
 
 try:
     from django.urls import reverse  # Django 1.10+
@@ -38,6 +42,48 @@ class Tests(TestCase):
         self.assertTrue('J.-P. Lies' in publication.authors_list)
         self.assertTrue(('J.-P.', 'Lies') in publication.authors_list_split)
 
+    def test_by_year(self):
+        hidden = Type.objects.create(title='Hidden', description='Hidden', bibtex_types='hidden', hidden=True)
+        Publication.objects.create(type=hidden, authors='A. Hidden', title='Hidden', year=2013)
+        response = self.client.get('/publications/')
+        self.assertEqual([(year, [p.citekey for p in publications]) for year, publications in response.context['years']],
+                         [(2014, ['Ecker2014a', 'Gerhard2014a']), (2013, ['Chagas2013a']),
+                          (2011, ['Theis2011a', 'Ecker2011a'])])
+        self.assertEqual(response.context['year_counts'], [(2014, 2), (2013, 1), (2011, 2)])
+        # The publications, their links and their files
+        with self.assertNumQueries(3):
+            response = self.client.get('/publications/year/2013/')
+        self.assertEqual(response.context['year_counts'], [(2013, 1)])
+        content = self.client.get('/publications/year/2013/?bibtex').getvalue().decode('utf-8')
+        self.assertEqual(content.count('@article{'), 1)
+        self.assertIn('@article{Chagas2013a,', content)
+
+    def test_by_filters(self):
+        response = self.client.get('/publications/filter/?author=bethge&year=2013-&type=article')
+        self.assertEqual([p.citekey for p in response.context['publications']], ['Ecker2014a', 'Chagas2013a'])
+        response = self.client.get('/publications/filter/?author=bethge&tag=noise+correlations&order=year&limit=1&json')
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual([(p['citekey'], p['link']) for p in response.json()['publications']],
+                         [('Ecker2011a', '/publications/4/')])
+        self.assertEqual(response.json()['publications'][0]['authors'][:2], ['A. S. Ecker', 'P. Berens'])
+        response = self.client.get('/publications/filter/?catalog=highlights&bibtex')
+        self.assertEqual(response.getvalue().strip(), b'')
+        for format in ['plain', 'bibtex', 'mods', 'ris', 'rss']:
+            response = self.client.get('/publications/filter/?year=2011&' + format)
+            self.assertEqual(response.status_code, 200)
+            content = response.getvalue()
+            self.assertTrue(b'Theis' in content and b'Ecker' in content and b'Chagas' not in content)
+        PublicationLink.objects.create(publication_id=1, description='Slides', url='http://slides.test')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/publications/filter/?author=bethge&limit=1')
+        self.assertEqual([p.links for p in response.context['publications']][0][0].description, 'Slides')
+        self.assertFalse(any('LIMIT' in query['sql'] and 'IN (SELECT' in query['sql'] for query in queries))
+        self.assertEqual(self.client.get('/publications/filter/?order=foo').status_code, 400)
+        for query in ['limit=-1', 'offset=-3&limit=2', 'offset=-1&json']:
+            self.assertEqual(self.client.get('/publications/filter/?' + query).status_code, 400)
+        self.assertEqual(self.client.get('/publications/filter/?year=foo&json').json(),
+                         {'error': 'Invalid year or range of years "foo".'})
+
     def test_citekey(self):
         publication = Publication.objects.create(
             type=Type.objects.get(pk=1),
@@ -283,6 +329,23 @@ class Tests(TestCase):
 
         self.assertEqual(list(publication.catalogs), [catalog])
 
+    def test_type_registry(self):
+        from ..registry import type_registry
+
+        self.assertEqual(type_registry.get_by_bibtex_type('conference'), Type.objects.get(pk=2))
+        self.assertEqual(type_registry.get_by_bibtex_type('ARTICLE'), Type.objects.get(pk=1))
+        self.assertIsNone(type_registry.get_by_bibtex_type('foobar'))
+        self.assertEqual(type_registry.ris_type(1), 'JOUR')
+        self.assertEqual(type_registry.mods_genre(2), 'conference publication')
+
+        # Invalidated on save
+        self.addCleanup(type_registry.clear)  # Changes are rolled back after the test
+        publication_type = Type.objects.get(pk=6)
+        publication_type.bibtex_types = '@Online; Misc and Dataset'
+        publication_type.save()
+        self.assertEqual(Type.objects.get(pk=6).bibtex_types, 'online, misc, dataset')
+        self.assertEqual(type_registry.get_by_bibtex_type('dataset'), publication_type)
+
     def test_unapi(self):
         self.assertEqual(self.client.get('/publications/unapi/').status_code, 200)
         self.assertEqual(self.client.get('/publications/unapi/?id=1').status_code, 200)
@@ -293,6 +356,143 @@ class Tests(TestCase):
         self.assertEqual(self.client.get('/publications/unapi/?id=1&format=foobar').status_code, 406)
 
 
+    def test_download(self):
+        import hashlib
+        import shutil
+        import tempfile
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import FileSystemStorage
+        from django.test import override_settings
+        from ..apps import PublicationsBootstrapConfig
+        from ..downloads import download_url, file_downloaded
+        from ..models import PublicationFile
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.assertEqual(self.client.get('/publications/1/pdf/').status_code, 404)
+        publication = Publication.objects.get(pk=1)
+        publication.pdf.save('paper.pdf', ContentFile(b'%PDF-1.4 content'))
+        downloads = []
+        receiver = lambda sender, **kwargs: downloads.append(kwargs['file'])  # noqa: E731
+        file_downloaded.connect(receiver)
+        self.addCleanup(file_downloaded.disconnect, receiver)
+
+        response = self.client.get('/publications/1/pdf/')
+        self.assertEqual(response.getvalue(), b'%PDF-1.4 content')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(self.client.get('/publications/1/pdf/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(len(downloads), 1)
+
+        # Versioned URLs, by the hash stored when the file is saved
+        self.assertEqual(publication.pdf_hash, hashlib.sha1(b'%PDF-1.4 content').hexdigest())
+        publication = Publication.objects.get(pk=1)
+        with mock.patch.object(FileSystemStorage, 'open', side_effect=AssertionError), \
+                mock.patch.object(FileSystemStorage, 'size', side_effect=AssertionError):
+            publication.save()
+            url = download_url(publication)
+        self.assertEqual(url, '/publications/1/pdf/?v=' + publication.pdf_hash[:12])
+        self.assertIn('immutable', self.client.get(url)['Cache-Control'])
+        self.assertContains(self.client.get('/publications/1/'), url)
+
+        # Ranges
+        response = self.client.get('/publications/1/pdf/', HTTP_RANGE='bytes=2-4')
+        self.assertEqual((response.status_code, response.getvalue()), (206, b'DF-'))
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/16')
+        self.assertEqual(self.client.get('/publications/1/pdf/', HTTP_RANGE='bytes=-7').getvalue(), b'content')
+        self.assertEqual(self.client.get('/publications/1/pdf/', HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"other"')
+                         .status_code, 200)
+        self.assertEqual(self.client.get('/publications/1/pdf/', HTTP_RANGE='bytes=16-').status_code, 416)
+
+        # Publication files
+        file = PublicationFile.objects.create(publication=publication, description='Data')
+        file.file.save('data.csv', ContentFile(b'a,b'))
+        self.assertEqual(PublicationFile.objects.get(pk=file.pk).file_hash, hashlib.sha1(b'a,b').hexdigest())
+        self.assertEqual(self.client.get('/publications/1/files/{}/'.format(file.pk)).getvalue(), b'a,b')
+        self.assertEqual(downloads[-1], file)
+        self.assertEqual(self.client.get('/publications/2/files/{}/'.format(file.pk)).status_code, 404)
+
+        # Hand-off to the web server
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'sendfile': 'x-sendfile'}):
+            response = self.client.get('/publications/1/pdf/')
+            self.assertEqual(response['X-Sendfile'], publication.pdf.path)
+            self.assertEqual(response.content, b'')
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'sendfile': 'x-accel-redirect',
+                                                                    'sendfile_url': '/protected/'}):
+            response = self.client.get('/publications/1/pdf/')
+            self.assertEqual(response['X-Accel-Redirect'], '/protected/' + publication.pdf.name)
+
+        # Access control
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {
+                'download_permission': lambda request, publication, file: request.user.is_authenticated}):
+            self.assertEqual(self.client.get('/publications/1/pdf/').status_code, 403)
+
+    def test_thumbnails(self):
+        import io
+        import shutil
+        import tempfile
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import FileSystemStorage
+        from django.core.management import call_command
+        from django.test import override_settings
+        from PIL import Image
+        from ..thumbnails import WIDTHS, get_manifest, get_thumbnail
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        image = io.BytesIO()
+        Image.new('RGBA', (400, 200), (255, 0, 0, 128)).save(image, 'PNG')
+        publication = Publication.objects.get(pk=2)
+        publication.image.save('figure.png', ContentFile(image.getvalue()))
+        self.assertIsNone(get_thumbnail(publication))
+
+        out = io.StringIO()
+        call_command('generate_thumbnails', '2', workers=1, stdout=out)
+        self.assertIn('thumbnails of 1 publications', out.getvalue())
+        publication.refresh_from_db()
+        self.assertTrue(publication.thumbnail_manifest.endswith('/{}/manifest.json'.format(publication.image_hash)))
+        manifest = get_manifest(publication)
+        self.assertEqual(sorted({derivative['width'] for derivative in manifest}), [WIDTHS[0], WIDTHS[1], 400])
+        self.assertEqual({derivative['height'] for derivative in manifest if derivative['width'] == 400}, {200})
+        with Image.open(publication.image.storage.path(manifest[0]['name'])) as derivative:
+            self.assertEqual(derivative.size, (manifest[0]['width'], manifest[0]['height']))
+
+        thumbnail = get_thumbnail(publication)
+        self.assertEqual((thumbnail.width, thumbnail.height), (160, 80))
+        self.assertTrue(thumbnail.src.endswith('/160.jpg'))
+        self.assertEqual(thumbnail.srcsets['image/jpeg'].count('w, '), 2)
+
+        # Generated once
+        out = io.StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('thumbnails of 0 publications', out.getvalue())
+
+        Catalog.objects.get(pk=1).publications.add(publication)
+        tpl = Template("""{% load publication_extras %}{% get_catalog 'highlights' """
+                       """'publications_bootstrap/components/publications_with_thumbnails.html' %}""")
+        # Rendering reads the stored manifest, neither the images nor their sizes
+        with mock.patch.object(FileSystemStorage, 'size', side_effect=AssertionError), \
+                mock.patch('shutil.which', side_effect=AssertionError):
+            res = tpl.render(RequestContext(HttpRequest()))
+        self.assertIn('srcset="{}"'.format(thumbnail.srcsets['image/jpeg']), res)
+        self.assertIn('loading="lazy"', res)
+
+        # Another image makes the thumbnails stale
+        image = io.BytesIO()
+        Image.new('RGB', (100, 100)).save(image, 'PNG')
+        publication.image.save('other.png', ContentFile(image.getvalue()))
+        self.assertEqual(publication.thumbnail_manifest, '')
+        self.assertIsNone(get_thumbnail(publication))
+
 class AdminTests(TestCase):
     fixtures = ['initial_data.json', 'test_data.json']
 
@@ -391,6 +591,201 @@ class AdminTests(TestCase):
         self.assertEqual(len(publications), 1)
         self.assertTrue(publications[0].title.startswith('How Good is 85%?'))
 
+    def test_bibtex_import_file(self):
+        import gzip
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        for name, content in [('test.bib', TEST_BIBLIOGRAPHY.encode('utf-8')),
+                              ('test.bib.gz', gzip.compress(TEST_BIBLIOGRAPHY.encode('utf-8')))]:
+            existing = list(Publication.objects.values_list('pk', flat=True))
+            self.client.post('/admin/publications_bootstrap/publication/import_bibtex/',
+                             {'bibliography_file': SimpleUploadedFile(name, content)}, follow=False)
+
+            imported = Publication.objects.exclude(pk__in=existing)
+            self.assertEqual(imported.count(), TEST_BIBLIOGRAPHY_COUNT, name)
+            imported.delete()
+
+    def test_bibtex_import_validate(self):
+        count = Publication.objects.count()
+        response = self.client.post('/admin/publications_bootstrap/publication/import_bibtex/',
+                                    {'bibliography': TEST_BIBLIOGRAPHY + '@foobar{key, title={T}, author={A}, year=1}',
+                                     '_validate': 'Validate only'})
+
+        self.assertEqual(len(response.context['report']), TEST_BIBLIOGRAPHY_COUNT + 1)
+        self.assertEqual(response.context['report_errors'], 1)
+        self.assertContains(response, 'Type &quot;foobar&quot; unknown.')
+        self.assertEqual(Publication.objects.count(), count)
+
+    def test_bibtex_import_rollback(self):
+        count = Publication.objects.count()
+        response = self.client.post('/admin/publications_bootstrap/publication/import_bibtex/',
+                                    {'bibliography': TEST_BIBLIOGRAPHY + '@foobar{key, title={T}, author={A}, year=1}'})
+
+        self.assertContains(response, 'Type &quot;foobar&quot; unknown.')
+        self.assertEqual(Publication.objects.count(), count)
+
+
+VALIDATION_BIBLIOGRAPHY = r"""
+@article{Valid2020, title={Valid}, author={Doe, John}, year={2020}, month={foo}, country={Narnia}}
+@article{Ecker2014a, title={Clashing citekey}, author={Doe, John}, year={2020}}
+@foobar{Unknown2020, title={Unknown type}, author={Doe, John}, year={2020}}
+@article{Incomplete2020, title={Incomplete}, year={20x0}}
+@article{Doi2020a, title={DOI}, author={Doe, John}, year={2020}, doi={10.1523/JNEUROSCI.2539-11.2011}}
+@article{Doi2020b, title={DOI}, author={Doe, John}, year={2020}, doi={10.1000/duplicate}}
+@article{Doi2020c, title={DOI}, author={Doe, John}, year={2020}, doi={10.1000/duplicate}}
+"""
+
+
+class BibTexTests(TestCase):
+    fixtures = ['initial_data.json', 'test_data.json']
+
+    def test_validate(self):
+        from ..bibtex import parse
+        from ..validation import validate
+
+        for workers in [1, 2]:
+            report = validate(parse(VALIDATION_BIBLIOGRAPHY), workers=workers, chunk_size=2)
+            self.assertEqual([r['key'] for r in report],
+                             ['Valid2020', 'Ecker2014a', 'Unknown2020', 'Incomplete2020', 'Doi2020a', 'Doi2020b',
+                              'Doi2020c'])
+            self.assertEqual(report[0]['errors'], [])
+            self.assertEqual(report[0]['warnings'], ['Invalid month "foo" will be ignored.',
+                                                     'Unknown country "Narnia" will be ignored.'])
+            self.assertEqual(report[1]['errors'], ['A publication with citekey "Ecker2014a" already exists.'])
+            self.assertEqual(report[2]['errors'], ['Type "foobar" unknown.'])
+            self.assertEqual(report[3]['errors'], ['Missing key <author>.', 'Invalid year "20x0".'])
+            self.assertEqual(report[4]['errors'],
+                             ['A publication with doi "10.1523/JNEUROSCI.2539-11.2011" already exists.'])
+            self.assertEqual(report[5]['errors'], [])
+            self.assertEqual(report[6]['errors'], ['Duplicate doi "10.1000/duplicate", already used by entry #6.'])
+
+    def test_import_bibtex_command(self):
+        import os
+        import tempfile
+        from django.core.management import call_command, CommandError
+        from django.utils.six import StringIO
+
+        count = Publication.objects.count()
+        fd, path = tempfile.mkstemp(suffix='.bib')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write(VALIDATION_BIBLIOGRAPHY)
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, '7 entries validated, 5 with errors.'):
+            call_command('import_bibtex', path, dry_run=True, workers=1, stdout=out)
+        self.assertIn('#3 Unknown2020: Type "foobar" unknown.', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('import_bibtex', path, stdout=out)
+        self.assertEqual(Publication.objects.count(), count)
+
+        # Constraints of the database are reported too
+        with open(path, 'w') as f:
+            f.write('@article{Duplicate2020, author={A. Author}, title={Duplicate}, journal={J}, year={2020}, '
+                    'doi={10.1523/JNEUROSCI.2539-11.2011}}')
+        with self.assertRaises(CommandError):
+            call_command('import_bibtex', path, stdout=out)
+        self.assertEqual(Publication.objects.count(), count)
+
+        with open(path, 'w') as f:
+            f.write(TEST_BIBLIOGRAPHY)
+        call_command('import_bibtex', path, stdout=out)
+        self.assertEqual(Publication.objects.count() - count, TEST_BIBLIOGRAPHY_COUNT)
+
+    def test_iterparse(self):
+        import io
+        from ..bibtex import iterparse, parse
+
+        expected = parse(TEST_BIBLIOGRAPHY)
+        for chunk_size in [1, 7, 64, 64 * 1024]:
+            self.assertEqual(list(iterparse(io.StringIO(TEST_BIBLIOGRAPHY), chunk_size)), expected)
+            self.assertEqual(list(iterparse(io.BytesIO(TEST_BIBLIOGRAPHY.encode('utf-8')), chunk_size)), expected)
+
+        # Braces within quoted values are not counted, nor escaped quotes
+        bibliography = ('@misc{Closing, note = "a } b", author = "M{\\"u}ller", year = 2021}\n'
+                        '@misc{Opening, title = "Sets {a", year = 2022}\n@misc{Next, year = 2023}\n')
+        expected = parse(bibliography)
+        self.assertEqual([(e['key'], e.get('note'), e.get('title')) for e in expected],
+                         [('Closing', 'a b', None), ('Opening', None, 'Sets {a'), ('Next', None, None)])
+        for chunk_size in [1, 7, 64 * 1024]:
+            self.assertEqual(list(iterparse(io.StringIO(bibliography), chunk_size)), expected)
+        # Entries are still yielded as they are read
+        stream = io.StringIO(bibliography)
+        next(iterparse(stream, 16))
+        self.assertLess(stream.tell(), len(bibliography))
+
+
+TEST_CSL_JSON = '''[
+  {"id": "Kummerer2014a", "type": "article-journal", "title": "Deep Gaze I",
+   "author": [{"family": "Kümmerer", "given": "Matthias"}, {"family": "Theis", "given": "Lucas"},
+              {"literal": "Bethge Lab"}],
+   "container-title": "ArXiv e-prints", "issued": {"date-parts": [[2014, 11]]}, "DOI": "10.0000/deepgaze",
+   "volume": "1411", "page": "1-12"},
+  {"id": "Gauss1809", "type": "book", "title": "Theoria motus", "author": [{"family": "Gauss", "given": "C. F."}],
+   "issued": {"date-parts": [[1809]]}, "publisher": "Perthes", "publisher-place": "Hamburg"}
+]'''
+
+
+class ImportersTests(TestCase):
+    fixtures = ['initial_data.json', 'test_data.json']
+
+    def _roundtrip(self, format, url):
+        import io
+        from ..importers import iterparse
+
+        entries = list(iterparse(io.BytesIO(self.client.get(url).getvalue()), format=format))
+        publications = Publication.objects.filter(external=False).exclude(type__hidden=True)
+        self.assertEqual(len(entries), publications.count())
+        for entry, publication in zip(entries, publications.order_by('-year', '-month', '-id')):
+            self.assertEqual(entry['title'], publication.title)
+            self.assertEqual(entry['year'], str(publication.year))
+            self.assertEqual(len(entry['author'].split(' and ')), len(publication.authors_list))
+        return entries
+
+    def test_ris(self):
+        import io
+        from ..importers import iterparse
+
+        entries = self._roundtrip('ris', '/publications/?ris')
+        self.assertEqual(entries[0]['type'], 'article')
+        self.assertEqual(entries[0]['author'].split(' and ')[0], 'Ecker, A. S.')
+
+        # SN is the ISSN of articles, and the ISBN of books
+        ris = 'TY  - JOUR\nT1  - Article\nSN  - 0270-6474\nER  - \nTY  - BOOK\nT1  - Book\nSN  - 978-3-16\nER  - \n'
+        entries = list(iterparse(io.BytesIO(ris.encode('utf-8')), format='ris'))
+        self.assertEqual([entry.get('isbn') for entry in entries], [None, '978-3-16'])
+
+    def test_mods(self):
+        entries = self._roundtrip('mods', '/publications/?mods')
+        self.assertEqual(entries[0]['type'], 'article')
+        self.assertEqual(entries[0]['author'].split(' and ')[0], 'Ecker, A. S.')
+
+    def test_csl(self):
+        import io
+        from ..importers import csl, iterparse, publication_from_entry, save_publications
+
+        for chunk_size in [1, 16, 64 * 1024]:
+            entries = list(csl.iterparse(io.StringIO(TEST_CSL_JSON), chunk_size))
+            self.assertEqual([e['key'] for e in entries], ['Kummerer2014a', 'Gauss1809'])
+            # Chunks of bytes may end within a character
+            entries = list(csl.iterparse(io.BytesIO(TEST_CSL_JSON.encode('utf-8')), chunk_size))
+            self.assertEqual([e['key'] for e in entries], ['Kummerer2014a', 'Gauss1809'])
+        self.assertEqual(entries[0]['author'], 'Kümmerer, Matthias and Theis, Lucas and Bethge Lab')
+        self.assertEqual(entries[0]['journal'], 'ArXiv e-prints')
+        self.assertEqual(entries[0]['month'], 'nov')
+        entries = list(csl.iterparse(io.StringIO('[{"id": "a", "issued": {"date-parts": [[2014, "spring"]]}}, '
+                                                 '{"id": "b", "issued": {"date-parts": [["2015", "03"]]}}]')))
+        self.assertEqual([(e['year'], e.get('month')) for e in entries], [('2014', None), ('2015', 'mar')])
+
+        count = Publication.objects.count()
+        entries = iterparse(io.BytesIO(TEST_CSL_JSON.encode('utf-8')), 'bibliography.json')
+        self.assertEqual(save_publications(publication_from_entry(entry) for entry in entries), 2)
+        self.assertEqual(Publication.objects.count() - count, 2)
+        publication = Publication.objects.get(citekey='Kummerer2014a')
+        self.assertEqual(publication.authors_list[:2], ['M. Kümmerer', 'L. Theis'])
+        self.assertEqual(publication.month, Publication.EMonths.NOV)
+        self.assertEqual(Publication.objects.get(citekey='Gauss1809').type, Type.objects.get(title='Book'))
+
 
 class TestExtras(TestCase):
     fixtures = ['initial_data.json', 'test_data.json']
@@ -400,6 +795,20 @@ class TestExtras(TestCase):
         # tex_parse is used to replace simple LaTeX code in publication titles
         self.assertEqual(tex_parse(u'$L_p$-spherical'), u'L<sub>p</sub>-spherical')
         self.assertEqual(tex_parse(u'$L^2$-spherical'), u'L<sup>2</sup>-spherical')
+        self.assertEqual(tex_parse(u'$\\alpha_{1}$ & $\\Omega^n$'), u'&alpha;<sub>1</sub> &amp; &Omega;<sup>n</sup>')
+        self.assertEqual(tex_parse(u'<b>$^_a$</b>'), u'&lt;b&gt;^<sub>a</sub>&lt;/b&gt;')
+
+        # The HTML of the title and abstract is stored when saved
+        publication = Publication.objects.get(pk=1)
+        publication.title = u'$L_p$-nested symmetric distributions'
+        publication.abstract = u'Without math & co'
+        publication.save()
+        publication = Publication.objects.get(pk=1)
+        self.assertEqual(publication.title_html, u'L<sub>p</sub>-nested symmetric distributions')
+        self.assertEqual(publication.abstract_html, u'Without math &amp; co')
+        res = Template("""{% load publication_extras %}{% get_publication 1 %}""").render(RequestContext(HttpRequest()))
+        self.assertIn(u'L<sub>p</sub>-nested symmetric distributions', res)
+        self.assertIn(u'Without math &amp; co', res)
 
     def test_flatten_authors(self):
         # Default values
@@ -455,10 +864,37 @@ class TestExtras(TestCase):
 <a href="/publications/b.+sengupta/">B. Sengupta</a> and
 <a href="/publications/m.+st%C3%BCttgen/">M. Stüttgen</a>&nbsp;<b>et al.</b>""")
 
+    def test_flatten_authors_template(self):
+        # The custom template renders the same as the default formatter
+        from publications_bootstrap.templatetags.publication_extras import flatten_authors
+        template = 'template=publications_bootstrap/filters/authors.html'
+        for publication in Publication.objects.all():
+            for args in ['', 'limit=3', 'limit=0&last=, and', 'limit=6&last=, and', 'separator=;&et_al=...']:
+                self.assertEqual(flatten_authors(publication.authors_escaped(), args),
+                                 flatten_authors(publication.authors_escaped(), '&'.join([args, template])))
+
     def test__get_publication(self):
         from publications_bootstrap.templatetags import publication_extras
         self.assertEqual(publication_extras._get_publication(2), publication_extras._get_publication('Chagas2013a'))
 
+    def test_citekey_lower(self):
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, transaction
+        from publications_bootstrap.templatetags import publication_extras
+        publication = Publication.objects.get(pk=2)
+        publication.citekey = 'ChagasEtAl2013'
+        publication.save()
+        self.assertEqual(Publication.objects.get(citekey_lower='chagasetal2013').pk, 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(publication_extras._get_publication('CHAGASETAL2013').pk, 2)
+        self.assertIn('"citekey_lower" IN', queries[0]['sql'])
+        # Citekeys are unique ignoring case
+        duplicate = Publication.objects.get(pk=3)
+        duplicate.citekey = 'chagasEtAl2013'
+        self.assertRaises(ValidationError, duplicate.clean)
+        with transaction.atomic():
+            self.assertRaises(IntegrityError, duplicate.save)
+
     def test_get_publication(self):
         tpl = Template("""{% load publication_extras %}{% get_publication 2 %}""")
         res = tpl.render(RequestContext(HttpRequest()))
@@ -474,11 +910,54 @@ class TestExtras(TestCase):
             """<div class="alert alert-info" role="alert"><h4 class="alert-heading">Sorry</h4><p>There are no publications.</p></div>""",
             res)
 
+    def test_preload_publications(self):
+        body = """{% get_publication 1 %}{% get_citation 'ecker2014a' %}{% cite 1 2 %}{% get_publication 'Chagas2013a' %}"""
+        tpl = Template("""{% load publication_extras %}""" + body)
+        # Each publication is queried once, with its links and files
+        with self.assertNumQueries(6):
+            expected = tpl.render(RequestContext(HttpRequest()))
+        tpl = Template("""{% load publication_extras %}{% preload_publications 1 'CHAGAS2013A' 'NoCitekey' %}""" + body)
+        with self.assertNumQueries(3):
+            self.assertEqual(tpl.render(RequestContext(HttpRequest())), expected)
+
     def test_get_publications(self):
         tpl = Template("""{% load publication_extras %}{% get_publications %}""")
         tpl.render(RequestContext(HttpRequest()))
         # TODO: some assertions
 
+    def test_get_publications_filters(self):
+        def citekeys(**kwargs):
+            return [p.citekey for p in filter_publications(**kwargs)]
+
+        self.assertEqual(citekeys(), ['Ecker2014a', 'Gerhard2014a', 'Chagas2013a', 'Theis2011a', 'Ecker2011a'])
+        self.assertEqual(citekeys(year=2011), ['Theis2011a', 'Ecker2011a'])
+        self.assertEqual(citekeys(year='2012-'), ['Ecker2014a', 'Gerhard2014a', 'Chagas2013a'])
+        self.assertEqual(citekeys(year='2012-2013'), ['Chagas2013a'])
+        self.assertEqual(citekeys(type='Book Chapter'), ['Gerhard2014a'])
+        self.assertEqual(citekeys(type='incollection'), citekeys(type=5))
+        self.assertEqual(citekeys(tag='Noise correlations'), ['Ecker2014a', 'Ecker2011a'])
+        self.assertEqual(citekeys(tag='population'), ['Ecker2014a'])
+        self.assertEqual(citekeys(author='ecker'), ['Ecker2014a', 'Ecker2011a'])
+        self.assertEqual(citekeys(status='published', order='year,citekey', limit=2, offset=1),
+                         ['Theis2011a', 'Chagas2013a'])
+        self.assertEqual(citekeys(status='draft'), [])
+        Catalog.objects.get(pk=1).publications.add(3)
+        self.assertEqual(citekeys(catalog='highlights'), ['Theis2011a'])
+        for kwargs in [dict(year='20x1'), dict(type='foobar'), dict(status='foobar'), dict(order='authors'),
+                       dict(limit=-1), dict(offset=-3, limit=2), dict(offset='-1')]:
+            self.assertRaises(ValueError, filter_publications, **kwargs)
+
+        # A single query with LIMIT
+        with CaptureQueriesContext(connection) as queries:
+            citekeys(year='2011-2014', type='article', order='-year', limit=3)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LIMIT 3', queries[0]['sql'])
+
+        tpl = Template("""{% load publication_extras %}{% get_publications author='ecker' limit=1 %}""")
+        res = tpl.render(RequestContext(HttpRequest()))
+        self.assertIn('href="/publications/1/"', res)
+        self.assertNotIn('href="/publications/4/"', res)
+
     def test__get_catalog(self):
         from publications_bootstrap.templatetags import publication_extras
         self.assertEqual(publication_extras._get_catalog(1), publication_extras._get_catalog('highlights'))
@@ -508,6 +987,101 @@ class TestExtras(TestCase):
 
         self.assertGreater(len(tpl.render(RequestContext(HttpRequest())).strip()), 0)
 
+    def test_streaming_exports(self):
+        from django.template.loader import render_to_string
+        from ..exports import stream_template
+        response = self.client.get('/publications/year/2011/?mods')
+        self.assertTrue(response.streaming)
+        content = response.getvalue().decode('utf-8')
+        self.assertEqual(content.count('<modsCollection'), 1)
+        self.assertEqual(content.count('<mods version="3.2"'), 2)
+
+        publications = Publication.objects.order_by('-year', '-month', '-id')
+        for export in ('txt', 'bib', 'mods', 'ris', 'rss'):
+            template = 'publications_bootstrap/export/publications.' + export
+            context = {'publications': publications, 'url': 'http://testserver/publications/'}
+            self.assertEqual(''.join(stream_template(template, context, chunk_size=2)),
+                             render_to_string(template, context))
+        with self.assertRaises(ValueError):
+            stream_template('publications_bootstrap/export/publication.bib', {'publications': publications})
+
+    def test_facets(self):
+        from ..apps import PublicationsBootstrapConfig
+        from ..authors import author_index
+        from ..caching import PUBLICATIONS, bump
+        from ..facets import get_facets
+        author_index.clear()
+        self.addCleanup(author_index.clear)
+        Catalog.objects.get(pk=1).publications.add(Publication.objects.get(pk=2))
+        facets = get_facets()
+        self.assertEqual(facets['count'], 5)
+        self.assertEqual(facets['year'], [{'value': 2014, 'label': '2014', 'count': 2},
+                                          {'value': 2013, 'label': '2013', 'count': 1},
+                                          {'value': 2011, 'label': '2011', 'count': 2}])
+        self.assertEqual([(t['label'], t['count']) for t in facets['type']], [('Journal', 4), ('Book Chapter', 1)])
+        self.assertEqual(facets['status'], [{'value': 'p', 'label': 'published', 'count': 5}])
+        self.assertEqual(facets['author'][:2], [{'value': 'a.+s.+ecker', 'label': 'A. S. Ecker', 'count': 2},
+                                                {'value': 'a.+chagas', 'label': 'A. Chagas', 'count': 1}])
+        self.assertEqual(facets['catalog'], [{'value': 1, 'label': 'Highlights', 'count': 1}])
+        tags = {t['value']: t['count'] for t in facets['tag']}
+        self.assertEqual((tags['noise correlations'], tags['natural image statistics'], tags['gpfa']), (2, 2, 1))
+
+        facets = get_facets(['year', 'tag'], limit=1, author='bethge', year='2014')
+        self.assertEqual(facets['count'], 2)
+        self.assertEqual(set(facets), {'count', 'year', 'tag'})
+        self.assertEqual(len(facets['tag']), 1)
+
+        # Changes made by other processes, which send no signal here, are seen once the version is bumped
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'cache': 'default'}):
+            get_facets(['author'])
+            Publication.objects.filter(pk=2).update(authors='Z. Zed, A. S. Ecker')
+            bump(PUBLICATIONS)
+            self.assertIn({'value': 'z.+zed', 'label': 'Z. Zed', 'count': 1}, get_facets(['author'])['author'])
+
+        response = self.client.get('/publications/facets/?facets=type&type=article')
+        self.assertEqual(response.json(), {'count': 4, 'type': [{'value': 1, 'label': 'Journal', 'count': 4}]})
+        self.assertEqual(self.client.get('/publications/facets/?facets=foo').status_code, 400)
+        self.assertEqual(self.client.get('/publications/facets/?year=abc').status_code, 400)
+
+    def test_citation_styles(self):
+        from ..citations import TemplateStyle, get_style, template_name
+        publications = list(Publication.objects.all())
+        # Cover the specific formats of books, and the optional fields
+        publications[1].type_id, publications[1].pages, publications[1].doi = 4, '12-15', '10.1/a&b'
+        publications[2].number, publications[2].volume, publications[2].pages = None, None, '1'
+        publications[3].type_id, publications[3].title = 6, '<i>&</i>'
+        for name in ['chicago', 'vancouver']:
+            style = get_style(name)
+            self.assertNotIsInstance(style, TemplateStyle)
+            self.assertEqual(style.format_all(publications), TemplateStyle(template_name(name)).format_all(publications))
+        self.assertIsInstance(get_style('foo/bar.html'), TemplateStyle)
+
+    def test_citation_markers(self):
+        from ..citations import NumberedMarker, TemplateMarker, compile_marker, parse_marker
+        p = list(Publication.objects.all())
+        references = [[(1, p[0])], [(3, p[1]), (4, p[2])], [(6, p[3]), (7, p[4]), (8, p[0])]]
+        for marker in ['[#1-,', '^(1, ', '<#1;', '{1-, ', '1,', '^#1-,']:
+            for href in [True, False]:
+                formatter = compile_marker(marker, href)
+                self.assertIsInstance(formatter, NumberedMarker)
+                template, options = parse_marker(marker)
+                if not href:
+                    options['href'] = ''
+                self.assertEqual(formatter.format(references), TemplateMarker(template, options).format(references))
+        self.assertEqual(compile_marker('[#1-,').format(references[2:]),
+                         '[<a href="#{}">6</a>&#8209;<a href="#{}">8</a>]'.format(p[3].citekey, p[0].citekey))
+        self.assertIsInstance(compile_marker('foo/bar.html'), TemplateMarker)
+        self.assertIsInstance(compile_marker('foo/bar.html', href=False), TemplateMarker)
+        self.assertRaises(ValueError, parse_marker, 'foo')
+
+        # Custom marker templates are rendered without options
+        tpl = Template("""{% load publication_extras %}"""
+                       """{% setup_citations marker='publications_bootstrap/bibliography/markers/numbered.html' %}"""
+                       """{% cite 2 5 %}{% thebibliography reset=True %}""")
+        res = tpl.render(RequestContext(HttpRequest()))
+        self.assertTrue(res.startswith('<a>1</a><a>2</a>'))
+        self.assertInHTML('<div class="d-flex mr-1"><a>1</a></div>', res)
+
     def test_get_citation(self):
         tpl = Template("""{% load publication_extras %}{% get_citation 2 %}""")
         citation = tpl.render(RequestContext(HttpRequest()))
@@ -534,19 +1108,28 @@ Functional analysis of ultra high information rates conveyed by rat vibrissal pr
         # TODO: test other publication types
 
     def test_cite(self):
+        # References are numbered per request
+        request = HttpRequest()
         tpl = Template("""{% load publication_extras %}{% cite 2 %}""")
-        self.assertEqual(tpl.render(RequestContext(HttpRequest())), """[<a href="#Chagas2013a">1</a>]""")
+        self.assertEqual(tpl.render(RequestContext(request)), """[<a href="#Chagas2013a">1</a>]""")
         tpl = Template("""{% load publication_extras %}{% cite 1 2 %}""")
-        self.assertEqual(tpl.render(RequestContext(HttpRequest())),
+        self.assertEqual(tpl.render(RequestContext(request)),
                          """[<a href="#Chagas2013a">1</a>,<a href="#Ecker2014a">2</a>]""")
         tpl = Template("""{% load publication_extras %}{% cite 1 5 2 %}""")
-        self.assertEqual(tpl.render(RequestContext(HttpRequest())),
+        self.assertEqual(tpl.render(RequestContext(request)),
                          """[<a href="#Chagas2013a">1</a>&#8209;<a href="#Gerhard2014a">3</a>]""")
         tpl = Template("""{% load publication_extras %}{% cite 2 5 %}""")
-        self.assertEqual(tpl.render(RequestContext(HttpRequest())),
+        self.assertEqual(tpl.render(RequestContext(request)),
                          """[<a href="#Chagas2013a">1</a>,<a href="#Gerhard2014a">3</a>]""")
         tpl = Template("""{% load publication_extras %}{% cite 'ThisIsNoCitekey' %}""")
-        self.assertRaises(Publication.DoesNotExist, tpl.render, RequestContext(HttpRequest()))
+        self.assertRaises(Publication.DoesNotExist, tpl.render, RequestContext(request))
+        # A new request starts a new bibliography
+        tpl = Template("""{% load publication_extras %}{% cite 5 %}""")
+        self.assertEqual(tpl.render(RequestContext(HttpRequest())), """[<a href="#Gerhard2014a">1</a>]""")
+        # Without request, the references are shared by a single rendering
+        tpl = Template("""{% load publication_extras %}{% cite 5 %}{% cite 2 %}""")
+        self.assertEqual(tpl.render(Context()), """[<a href="#Gerhard2014a">1</a>][<a href="#Chagas2013a">2</a>]""")
+        self.assertEqual(tpl.render(Context()), """[<a href="#Gerhard2014a">1</a>][<a href="#Chagas2013a">2</a>]""")
         # TODO: test other params: sup, open/close, href
 
     def test_nocite(self):
@@ -558,7 +1141,7 @@ Functional analysis of ultra high information rates conveyed by rat vibrissal pr
         self.assertRaises(Publication.DoesNotExist, tpl.render, RequestContext(HttpRequest()))
 
     def test_thebibliography(self):
-        tpl = Template("""{% load publication_extras %}{% thebibliography %}""")
+        tpl = Template("""{% load publication_extras %}{% nocite 2 1 5 3 %}{% thebibliography %}""")
         res = tpl.render(RequestContext(HttpRequest()))
         self.assertIn("""<div class="card mt-5 bibliography">""", res)
         self.assertInHTML("""<h4 class="card-title">References</h4>""", res)
@@ -596,13 +1179,300 @@ Functional analysis of ultra high information rates conveyed by rat vibrissal pr
                 self.assertInHTML("""<a href="/publications/a.+s.+ecker/">A. S. Ecker</a>""", res)
 
         tpl = Template("""{% load publication_extras %}{% nocite 2 %}{% thebibliography sorting='foobar' %}""")
-        self.assertRaises(NotImplementedError, tpl.render, RequestContext(HttpRequest()))
+        self.assertRaises(ValueError, tpl.render, RequestContext(HttpRequest()))
+
+    def test_thebibliography_sorting(self):
+        # Markers already rendered keep their numbers
+        tpl = Template("""{% load publication_extras %}{% cite 1 %}{% cite 3 %}{% thebibliography sorting='year' %}""")
+        res = tpl.render(RequestContext(HttpRequest()))
+        self.assertTrue(res.startswith("""[<a href="#Ecker2014a">1</a>][<a href="#Theis2011a">2</a>]"""))
+        self.assertLess(res.index('id="Theis2011a"'), res.index('id="Ecker2014a"'))
+
+        # Within a citations block, the references are numbered in the order of the bibliography
+        tpl = Template("""{% load publication_extras %}{% citations sorting='year' %}{% cite 1 %}{% cite 3 %}
+{% thebibliography %}{% cite 5 2 %}{% thebibliography sorting='author' %}{% endcitations %}""")
+        res = tpl.render(RequestContext(HttpRequest()))
+        self.assertTrue(res.startswith("""[<a href="#Ecker2014a">2</a>][<a href="#Theis2011a">1</a>]"""))
+        self.assertLess(res.index('id="Theis2011a"'), res.index('id="Ecker2014a"'))
+        self.assertIn("""[<a href="#Chagas2013a">1</a>,<a href="#Gerhard2014a">2</a>]""", res)
+        self.assertLess(res.index('id="Ecker2014a"'), res.index('id="Chagas2013a"'))
+        self.assertLess(res.index('id="Chagas2013a"'), res.index('id="Gerhard2014a"'))
+
+        publications = Publication.objects.filter(pk__in=[1, 2, 3, 5])
+        self.assertEqual([p.citekey for p in sort_publications(publications, 'author')],
+                         ['Chagas2013a', 'Ecker2014a', 'Gerhard2014a', 'Theis2011a'])
+        self.assertEqual([p.citekey for p in sort_publications(publications, 'year')][:2],
+                         ['Theis2011a', 'Chagas2013a'])
+
+    def test_citations(self):
+        body = """{% cite 2 %} and {% cite 'ecker2014a' 5 2 %}{% nocite 3 %}{% thebibliography %}"""
+        tpl = Template("""{% load publication_extras %}""" + body)
+        expected = tpl.render(RequestContext(HttpRequest()))
+        tpl = Template("""{% load publication_extras %}{% citations %}""" + body + """{% endcitations %}""")
+        with self.assertNumQueries(1):
+            res = tpl.render(RequestContext(HttpRequest()))
+        self.assertEqual(res, expected)
+        self.assertIn("""[<a href="#Chagas2013a">1</a>] and [<a href="#Chagas2013a">1</a>&#8209;""", res)
+        self.assertIn("""<li class="list-group-item" id="Theis2011a">""", res)
+        self.assertNotIn('<!--', res)
+
+        # Cited publications are unknown until the end of the block
+        tpl = Template("""{% load publication_extras %}{% citations %}{% cite 'ThisIsNoCitekey' %}{% endcitations %}""")
+        self.assertRaises(Publication.DoesNotExist, tpl.render, RequestContext(HttpRequest()))
 
     def test_settings(self):
         # TODO: default values set in django.conf.settings
         pass
 
 
+class IndexTests(TransactionTestCase):
+    # The indexes are updated once transactions are committed
+    fixtures = ['initial_data.json', 'test_data.json']
+
+    def test_author_index(self):
+        from ..apps import PublicationsBootstrapConfig
+        from django.db import transaction
+        from ..authors import author_index
+        from ..caching import PUBLICATIONS, bump
+        author_index.clear()
+        self.addCleanup(author_index.clear)  # Changes are rolled back after the test
+        self.assertEqual([(a.name, a.count) for a in author_index.search('bet')], [('M. Bethge', 5)])
+        self.assertEqual([a.key for a in author_index.search('  Ecker ')], ['ecker a. s.'])
+        self.assertEqual(len(author_index.search('s', limit=2)), 2)
+        self.assertEqual(author_index.search('foo'), [])
+        # The index is updated when publications are saved or deleted
+        publication = Publication.objects.create(type=Type.objects.get(pk=1), authors=u'Ralf M. Häfner and M. Bethge',
+                                                 title=u'Title', year=2014)
+        self.assertEqual([(a.name, a.slug, a.count) for a in author_index.search('haef')],
+                         [('R. M. Häfner', 'r.+m.+häfner', 1)])
+        self.assertEqual(author_index.search('bethge')[0].count, 6)
+        publication.authors = u'M. Bethge'
+        publication.save()
+        self.assertEqual(author_index.search('haef'), [])
+        publication.delete()
+        self.assertEqual(author_index.search('bethge')[0].count, 5)
+        self.assertEqual(len(author_index.all()), 17)
+
+        # Changes rolled back are not indexed
+        with self.assertRaises(ValueError), transaction.atomic():
+            Publication.objects.create(type=Type.objects.get(pk=1), authors='Y. Phantom', title='Title', year=2014)
+            raise ValueError
+        self.assertEqual(author_index.search('phantom'), [])
+
+        response = self.client.get('/publications/authors/autocomplete/?q=th&limit=1')
+        self.assertEqual(response.json(), {'authors': [{'name': 'L. Theis', 'count': 3, 'url': '/publications/l.+theis/'}]})
+        self.assertEqual(self.client.get('/publications/authors/autocomplete/').json(), {'authors': []})
+        response = self.client.get('/publications/authors/')
+        self.assertContains(response, '<a href="/publications/l.+theis/">L. Theis</a>', html=True)
+        self.assertEqual([initial for initial, _ in response.context['initials']][:3], ['B', 'C', 'D'])
+        response = self.client.get('/publications/authors/?q=the')
+        self.assertEqual([a.name for a in response.context['authors']], ['L. Theis'])
+
+        # Changes made by other processes, which send no signal here, are seen once the version is bumped
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'cache': 'default'}):
+            author_index.search('zed')
+            Publication.objects.filter(pk=2).update(authors='Z. Zed')
+            self.assertEqual(author_index.search('zed'), [])
+            bump(PUBLICATIONS)
+            self.assertEqual([a.name for a in author_index.search('zed')], ['Z. Zed'])
+
+
+    def test_facet_index_rollback(self):
+        from django.db import transaction
+        from ..facets import facet_index, get_facets
+        facet_index.clear()
+        self.addCleanup(facet_index.clear)
+        self.assertEqual(get_facets(['year'])['count'], 5)
+        with self.assertRaises(ValueError), transaction.atomic():
+            Publication.objects.create(type=Type.objects.get(pk=1), authors='Y. Phantom', title='Title', year=2014)
+            get_facets(['year'])
+            raise ValueError
+        self.assertEqual(get_facets(['year'])['count'], 5)
+
+class CachingTests(TransactionTestCase):
+    # Versions are bumped once transactions are committed
+    fixtures = ['initial_data.json', 'test_data.json']
+
+    def test_cached_output(self):
+        from django.core.cache import cache
+        from ..apps import PublicationsBootstrapConfig
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'cache': 'default'}):
+            tpl = Template("""{% load publication_extras %}{% get_publications %}|{% get_catalog 'highlights' %}""")
+            res = tpl.render(RequestContext(HttpRequest()))
+            self.assertIn('Functional analysis of ultra high information rates', res.split('|')[0])
+            self.assertNotIn('Functional analysis of ultra high information rates', res.split('|')[1])
+            with self.assertNumQueries(0):
+                self.assertEqual(tpl.render(RequestContext(HttpRequest())), res)
+
+            # Catalog membership invalidates the catalog
+            Catalog.objects.get(title__iexact='highlights').publications.add(Publication.objects.get(pk=2))
+            res = tpl.render(RequestContext(HttpRequest()))
+            self.assertIn('Functional analysis of ultra high information rates', res.split('|')[1])
+
+            # Publication changes invalidate both
+            publication = Publication.objects.get(pk=2)
+            publication.title = 'Analysis of information rates'
+            publication.save()
+            res = tpl.render(RequestContext(HttpRequest()))
+            self.assertNotIn('Functional analysis', res)
+            self.assertEqual(res.count('Analysis of information rates'), 2)
+
+    def test_year_archive(self):
+        from django.core.cache import cache
+        from ..apps import PublicationsBootstrapConfig
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'cache': 'default'}):
+            response = self.client.get('/publications/years/')
+            self.assertEqual(response.json()['years'], [{'year': 2014, 'count': 2, 'url': '/publications/year/2014/'},
+                                                        {'year': 2013, 'count': 1, 'url': '/publications/year/2013/'},
+                                                        {'year': 2011, 'count': 2, 'url': '/publications/year/2011/'}])
+            response = self.client.get('/publications/years/?types')
+            self.assertEqual(response.json()['years'][0]['types'], [
+                {'id': 1, 'title': 'Journal', 'description': 'Journal Articles', 'count': 1},
+                {'id': 5, 'title': 'Book Chapter', 'description': 'Book Chapters', 'count': 1}])
+
+            tpl = Template("""{% load publication_extras %}{% year_archive by_type=True %}""")
+            res = tpl.render(RequestContext(HttpRequest()))
+            self.assertInHTML('<a href="/publications/year/2013/">2013</a>', res)
+            with self.assertNumQueries(0):
+                self.assertEqual(tpl.render(RequestContext(HttpRequest())), res)
+
+            # Publication changes invalidate the archive
+            Publication.objects.get(pk=2).delete()
+            self.assertEqual([y['year'] for y in self.client.get('/publications/years/').json()['years']], [2014, 2011])
+
+    def test_cached_views(self):
+        from django.core.cache import cache
+        from ..apps import PublicationsBootstrapConfig
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'cache': 'default',
+                                                                    'cache_control': {'public': True, 'max_age': 60}}):
+            response = self.client.get('/publications/year/2011/?bibtex')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+            content = response.getvalue()
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get('/publications/year/2011/?bibtex').content, content)
+
+            # Large exports are only streamed
+            with mock.patch('publications_bootstrap.caching.STREAMED_MAX_SIZE', 100):
+                self.assertEqual(self.client.get('/publications/year/2011/?ris').getvalue(),
+                                 self.client.get('/publications/year/2011/?ris').getvalue())
+                with self.assertNumQueries(1):
+                    self.client.get('/publications/year/2011/?ris').getvalue()
+
+            # Export formats are cached separately
+            self.assertEqual(self.client.get('/publications/year/2011/?plain')['Content-Type'],
+                             'text/plain; charset=UTF-8')
+
+            # Publication changes invalidate the views
+            publication = Publication.objects.get(pk=3)
+            publication.title = 'Analysis of information rates'
+            publication.save()
+            self.assertIn(b'Analysis of information rates',
+                          self.client.get('/publications/year/2011/?bibtex').getvalue())
+
+            # Catalog membership invalidates the catalog
+            self.assertNotContains(self.client.get('/publications/catalog/highlights/'), 'Chagas')
+            Catalog.objects.get(pk=1).publications.add(Publication.objects.get(pk=2))
+            self.assertContains(self.client.get('/publications/catalog/highlights/'), 'Chagas')
+
+            # Errors are not cached
+            self.assertEqual(self.client.get('/publications/filter/?year=abc').status_code, 400)
+            self.assertNotIn('Cache-Control', self.client.get('/publications/filter/?year=abc'))
+
+    def test_cache_check(self):
+        from ..apps import PublicationsBootstrapConfig
+        from ..checks import check_cache
+        self.assertEqual(check_cache(None), [])
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'cache': 'default'}):
+            self.assertEqual([warning.id for warning in check_cache(None)], ['publications_bootstrap.W001'])
+
+    def test_bump_on_commit(self):
+        from django.core.cache import cache
+        from django.db import transaction
+        from ..apps import PublicationsBootstrapConfig
+        from ..caching import PUBLICATIONS, cached
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch.dict(PublicationsBootstrapConfig.defaults, {'cache': 'default'}):
+            with transaction.atomic():
+                publication = Publication.objects.get(pk=2)
+                publication.title = 'Analysis of information rates'
+                publication.save()
+                # Rendered meanwhile by another request, from the former data
+                self.assertEqual(cached('test', (), [PUBLICATIONS], lambda: 'former'), 'former')
+            self.assertEqual(cached('test', (), [PUBLICATIONS], lambda: 'current'), 'current')
+
+            # Nothing is bumped when the transaction is rolled back
+            cached('test', (), [PUBLICATIONS], lambda: 'current')
+            with self.assertRaises(ValueError), transaction.atomic():
+                Publication.objects.get(pk=2).save()
+                raise ValueError
+            self.assertEqual(cached('test', (), [PUBLICATIONS], lambda: 'other'), 'current')
+
+
+    def test_import_invalidates_on_commit(self):
+        import io
+        from django.db import transaction
+        from ..importers import csl, publication_from_entry, save_publications
+
+        entries = list(csl.iterparse(io.StringIO(TEST_CSL_JSON)))
+        with mock.patch('publications_bootstrap.importers.author_index') as author_index:
+            with transaction.atomic():
+                save_publications(publication_from_entry(entry) for entry in entries)
+                # Other processes would rebuild it from the publications committed before the import
+                self.assertFalse(author_index.clear.called)
+            self.assertTrue(author_index.clear.called)
+
+class ConcurrentCitationsTests(TransactionTestCase):
+    fixtures = ['initial_data.json', 'test_data.json']
+
+    def test_concurrent_requests(self):
+        from threading import Barrier, Thread
+        from django.db import connection
+
+        pages = {
+            'first': ('1 2', '3'),
+            'second': ('5', '4 1'),
+            'third': ('3', '2'),
+        }
+        barrier = Barrier(len(pages))
+        results, errors = {}, []
+
+        def render(name, first, second):
+            try:
+                request = HttpRequest()
+                tpl = Template('{{% load publication_extras %}}{{% cite {} %}}'.format(first))
+                tpl.render(RequestContext(request))
+                # Let the other requests cite their publications in between
+                barrier.wait(timeout=10)
+                tpl = Template('{{% load publication_extras %}}{{% cite {} %}}{{% thebibliography %}}'.format(second))
+                results[name] = tpl.render(RequestContext(request))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=render, args=(name,) + puids) for name, puids in pages.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        for name, puids in pages.items():
+            cited = set(int(puid) for puid in ' '.join(puids).split())
+            for publication in Publication.objects.all():
+                if publication.pk in cited:
+                    self.assertIn('id="{}"'.format(publication.citekey), results[name])
+                else:
+                    self.assertNotIn('id="{}"'.format(publication.citekey), results[name])
+
+
 TEST_BIBLIOGRAPHY_COUNT = 11
 TEST_BIBLIOGRAPHY = r"""
 @article{Bethge2002c,
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import re
+from functools import lru_cache
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+GREEK_LETTERS = \
+    '[Aa]lpha|[Bb]eta|[Gg]amma|[Dd]elta|[Ee]psilon|[Zz]eta|' + \
+    '[Ee]ta|[Tt]heta|[Ll]ambda|[Mm]u|[Nn]u|[Pp]i|[Ss]igma|[Tt]au|' + \
+    '[Pp]hi|[Pp]si|[Cc]hi|[Oo]mega|[Rr]ho|[Xx]i|[Kk]appa'
+
+# Number of distinct strings whose HTML is kept in memory
+CACHE_SIZE = 4096
+
+_math = re.compile(r'\$([^\$]*)\$')
+# A superscript is not followed by a subscript, which is replaced first: '^_a' gives '^<sub>a</sub>'
+_symbols = re.compile(r'\\(?P<greek>' + GREEK_LETTERS + r')|_(?P<sub>\w)|\^(?P<sup>(?!_\w)\w)')
+
+
+def _replace_symbol(match):
+    greek, sub, sup = match.group('greek', 'sub', 'sup')
+    if greek is not None:
+        return '&{};'.format(greek)
+    if sub is not None:
+        return '<sub>{}</sub>'.format(sub)
+    return '<sup>{}</sup>'.format(sup)
+
+
+def _replace_math(match):
+    return _symbols.sub(_replace_symbol, match.group(1))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def tex_to_html(string):
+    """
+    Renders some basic TeX math to HTML: greek letters, one-character subscripts and superscripts between dollars.
+    Braces are removed, and the rest of the string is escaped.
+
+    Parameters
+    ----------
+    string : str
+
+    Returns
+    -------
+    SafeText
+    """
+    string = string.replace('{', '').replace('}', '')
+    return mark_safe(_math.sub(_replace_math, escape(string)))
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Thumbnails of publications, resized to several widths in JPEG and, if Pillow supports it, WebP.
+
+Thumbnails are generated from the `thumbnail` uploaded by hand, else from the `image`, else from the first page of the
+`pdf`, rendered with `pdftoppm` (poppler) if it is installed, in bulk with the `generate_thumbnails` command. With
+`PUBLICATIONS_BOOTSTRAP_THUMBNAILS = True`, they are also generated once a publication is saved, off the request path,
+in a single worker process. The worker is spawned rather than forked from the (possibly threaded) web server process,
+and lives as long as this process.
+
+Derivatives are stored under the content hash of their source, stored when it is saved, along with a manifest listing
+them, which is written last. The name of the manifest is then stored in the publication: templates read it, and never
+generate anything nor look for files.
+"""
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from .apps import PublicationsBootstrapConfig
+from .caching import PUBLICATIONS, bump
+from .imaging import CONTENT_TYPES, render_derivatives
+from .models import Publication
+
+logger = logging.getLogger(__name__)
+
+# Widths of the derivatives, in pixels, narrower sources are not enlarged
+WIDTHS = (160, 320, 640)
+
+DERIVATIVES_DIRECTORY = 'publications_bootstrap/derivatives'
+
+MANIFEST = 'manifest.json'
+
+Thumbnail = namedtuple('Thumbnail', ['src', 'width', 'height', 'srcsets'])
+
+
+@lru_cache(maxsize=None)
+def _formats():
+    from PIL import features
+
+    return ('webp', 'jpeg') if features.check('webp') else ('jpeg',)
+
+
+@lru_cache(maxsize=None)
+def _renders_pdf():
+    return shutil.which('pdftoppm') is not None
+
+
+def _source(publication):
+    """
+    Returns the file the thumbnails of a publication are generated from, the hash of its content and whether it is a
+    PDF, or None.
+    """
+    for field, hash_field, pdf in (('thumbnail', 'thumbnail_hash', False), ('image', 'image_hash', False),
+                                   ('pdf', 'pdf_hash', True)):
+        if getattr(publication, hash_field) and (not pdf or _renders_pdf()):
+            return getattr(publication, field), getattr(publication, hash_field), pdf
+    return None
+
+
+def _directory(version):
+    return '{}/{}/{}'.format(DERIVATIVES_DIRECTORY, version[:2], version)
+
+
+def _source_data(field_file):
+    # Workers read local files themselves
+    try:
+        return field_file.path
+    except NotImplementedError:
+        with field_file.storage.open(field_file.name, 'rb') as f:
+            return f.read()
+
+
+def _store(version, derivatives, storage=default_storage):
+    directory = _directory(version)
+    manifest = []
+    for width, height, format, content in derivatives:
+        name = '{}/{}.{}'.format(directory, width, 'jpg' if format == 'jpeg' else format)
+        if storage.exists(name):
+            storage.delete(name)
+        name = storage.save(name, ContentFile(content))
+        manifest.append({'width': width, 'height': height, 'format': format, 'name': name})
+    name = '{}/{}'.format(directory, MANIFEST)
+    if storage.exists(name):
+        storage.delete(name)
+    name = storage.save(name, ContentFile(json.dumps(manifest).encode('utf-8')))
+    # Publications whose source changed meanwhile are left alone
+    Publication.objects.filter(Q(thumbnail_hash=version) | Q(image_hash=version) | Q(pdf_hash=version)) \
+        .update(thumbnail_manifest=name)
+    # update() sends no signal invalidating the cached output
+    bump(PUBLICATIONS)
+    return manifest
+
+
+@lru_cache(maxsize=4096)
+def _read_manifest(storage, name):
+    # Missing manifests raise, and are not cached
+    with storage.open(name, 'rb') as f:
+        return json.loads(f.read().decode('utf-8'))
+
+
+def get_manifest(publication, storage=default_storage):
+    """
+    Returns the derivatives of the thumbnail of a publication, as dicts with the keys `width`, `height`, `format` and
+    `name` (in the storage), or None if they are not generated.
+    """
+    if not publication.thumbnail_manifest:
+        return None
+    try:
+        return _read_manifest(storage, publication.thumbnail_manifest)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def get_thumbnail(publication, storage=default_storage):
+    """
+    Returns the thumbnail of a publication, with the smallest JPEG as `src` and a `srcset` by format, or the
+    thumbnail uploaded by hand if no derivative is generated, or None.
+    """
+    manifest = get_manifest(publication, storage)
+    if not manifest:
+        if publication.thumbnail:
+            return Thumbnail(publication.thumbnail.url, None, None, {})
+        return None
+    # Browsers use the first source they support, WebP comes first
+    srcsets = OrderedDict()
+    for derivative in manifest:
+        srcsets.setdefault(derivative['format'], []).append('{} {}w'.format(storage.url(derivative['name']),
+                                                                            derivative['width']))
+    src = next(derivative for derivative in manifest if derivative['format'] == 'jpeg')
+    return Thumbnail(storage.url(src['name']), src['width'], src['height'],
+                     OrderedDict((CONTENT_TYPES[format], ', '.join(srcset)) for format, srcset in srcsets.items()))
+
+
+def _pending_source(publication, force=False):
+    # Returns the hash of the source, its content or path and whether it is a PDF, or None if it is already processed
+    source = _source(publication)
+    if source is None or (publication.thumbnail_manifest and not force):
+        return None
+    field_file, version, pdf = source
+    return version, _source_data(field_file), pdf
+
+
+def generate_thumbnails(publications, force=False, workers=None, storage=default_storage):
+    """
+    Generates the derivatives of the thumbnails of publications.
+
+    Parameters
+    ----------
+    publications : iterable of Publication
+    force : bool
+        If True, derivatives already generated are generated again.
+    workers : int
+        Number of worker processes resizing the images, defaults to the number of CPUs. The images are resized in this
+        process if it is 1.
+
+    Returns
+    -------
+    int
+        Number of publications whose thumbnails were generated.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    formats = _formats()
+    sources = (source for source in (_pending_source(publication, force) for publication in publications)
+               if source is not None)
+    count = 0
+    if workers <= 1:
+        for version, data, pdf in sources:
+            _store(version, render_derivatives(data, pdf, WIDTHS, formats), storage)
+            count += 1
+        return count
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for version, data, pdf in sources:
+            pending.append((version, executor.submit(render_derivatives, data, pdf, WIDTHS, formats)))
+            # bound the number of images held in memory
+            if len(pending) >= 2 * workers:
+                version, future = pending.pop(0)
+                _store(version, future.result(), storage)
+                count += 1
+        for version, future in pending:
+            _store(version, future.result(), storage)
+            count += 1
+    return count
+
+
+_pool = None
+
+
+def _shutdown_pool():
+    _pool.close()
+    _pool.join()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # A single worker, not to compete with the requests served by this process
+        _pool = multiprocessing.get_context('spawn').Pool(1)
+        atexit.register(_shutdown_pool)
+    return _pool
+
+
+def schedule_thumbnails(publication):
+    """
+    Generates the derivatives of the thumbnail of a publication in a worker process, if they are missing.
+    """
+    source = _pending_source(publication)
+    if source is None:
+        return
+    version, data, pdf = source
+
+    def store(derivatives):
+        # Called in a thread of the pool, which has its own connection
+        try:
+            _store(version, derivatives)
+        except Exception:
+            logger.exception('Thumbnails of publication %s could not be stored.', publication.pk)
+        finally:
+            connection.close()
+
+    def error(exception):
+        logger.error('Thumbnails of publication %s could not be generated: %s', publication.pk, exception)
+
+    _get_pool().apply_async(render_derivatives, (data, pdf, WIDTHS, _formats()), callback=store,
+                            error_callback=error)
+
+
+@receiver(pre_save, sender=Publication)
+def clear_stale_manifest(sender, instance, raw=False, **kwargs):
+    # The hashes of the files are updated before the publication is saved
+    source = _source(instance)
+    if instance.thumbnail_manifest and (source is None or not instance.thumbnail_manifest.startswith(
+            _directory(source[1]) + '/')):
+        instance.thumbnail_manifest = ''
+
+
+@receiver(post_save, sender=Publication)
+def generate_publication_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw or not PublicationsBootstrapConfig.defaults.get('thumbnails', False) or instance.thumbnail_manifest \
+            or _source(instance) is None:
+        return
+    transaction.on_commit(lambda: schedule_thumbnails(instance))
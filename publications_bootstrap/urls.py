@@ -8,9 +8,16 @@ app_name = 'publications_bootstrap'
 urlpatterns = [
     url(r'^$', views.by_year, name='index'),
     url(r'^(?P<publication_id>\d+)/$', views.by_id, name='id'),
+    url(r'^(?P<publication_id>\d+)/pdf/$', views.download, name='pdf'),
+    url(r'^(?P<publication_id>\d+)/files/(?P<file_id>\d+)/$', views.download, name='file'),
     url(r'^year/(?P<year>\d+)/$', views.by_year, name='year'),
+    url(r'^years/$', views.year_archive, name='years'),
     url(r'^tag/(?P<tag>.+)/$', views.by_tag, name='tag'),
     url(r'^catalog/(?P<title>.+)/$', views.for_catalog, name='catalog'),
     url(r'^unapi/$', views.by_unapi, name='unapi'),
+    url(r'^filter/$', views.by_filters, name='filter'),
+    url(r'^facets/$', views.facets, name='facets'),
+    url(r'^authors/$', views.author_directory, name='authors'),
+    url(r'^authors/autocomplete/$', views.author_autocomplete, name='authors_autocomplete'),
     url(r'^(?P<name>.+)/$', views.by_author, name='author'),
 ]
@@ -1,6 +1,17 @@
 # -*- coding: utf-8 -*-
 
-from .models import PublicationLink, PublicationFile
+import locale
+import re
+import unicodedata
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import Count, Q
+from django.utils.html import escape
+
+from .caching import PUBLICATIONS, cached
+from .models import Publication, PublicationLink, PublicationFile
+from .registry import type_registry
 
 
 def populate(publications):
@@ -21,3 +32,236 @@ def populate(publications):
         publications_[link.publication_id].links.append(link)
     for file in publication_files:
         publications_[file.publication_id].files.append(file)
+
+
+_escaped_characters = re.compile('[&<>"\']')
+
+
+def escape_text(value):
+    """
+    Same as `django.utils.html.escape`, but faster on the many strings that do not need to be escaped.
+    """
+    value = str(value)
+    return escape(value) if _escaped_characters.search(value) else value
+
+
+def collation_key(string):
+    """
+    Locale-aware sort key of a string, ignoring case, accents and TeX braces.
+    """
+    string = unicodedata.normalize('NFKD', string.replace('{', '').replace('}', ''))
+    string = ''.join(c for c in string if not unicodedata.combining(c))
+    return locale.strxfrm(string.casefold())
+
+
+def _authors_key(publication):
+    return [(collation_key(family), collation_key(given)) for given, family in publication.authors_list_split]
+
+
+# Sort keys of publications by bibliography sorting, computed once per publication
+SORTING_KEYS = {
+    'author': lambda p: (_authors_key(p), p.year, collation_key(p.title)),
+    'title': lambda p: (collation_key(p.title), _authors_key(p), p.year),
+    'year': lambda p: (p.year, p.month.value if p.month else 0, _authors_key(p), collation_key(p.title)),
+    'citekey': lambda p: collation_key(p.citekey or ''),
+}
+
+
+def sort_publications(publications, sorting):
+    """
+    Sort publications by author, title, year or citekey.
+
+    Parameters
+    ----------
+    publications : iterable of Publication
+    sorting : str
+        One of the keys of `SORTING_KEYS`.
+
+    Returns
+    -------
+    list
+    """
+    try:
+        key = SORTING_KEYS[sorting]
+    except KeyError:
+        raise ValueError('Unknown sorting "{}", expected one of: referenced, {}.'.format(
+            sorting, ', '.join(sorted(SORTING_KEYS))))
+    return sorted(publications, key=key)
+
+
+# Fields publications can be ordered by, with an optional '-' prefix for descending order
+ORDER_FIELDS = ('year', 'month', 'title', 'citekey', 'id', 'type')
+DEFAULT_ORDER = '-year,-month,-id'
+
+
+def _year_range(year):
+    """
+    Parses a year, or a range of years such as '2010-2014', '2010-' or '-2014', to a tuple (first, last) of int or None.
+    """
+    year = str(year).strip()
+    first, dash, last = year.partition('-')
+    try:
+        first = int(first) if first else None
+        last = int(last) if last else None
+    except ValueError:
+        raise ValueError('Invalid year or range of years "{}".'.format(year))
+    return (first, last) if dash else (first, first)
+
+
+def _get_type(type_):
+    """
+    Resolves a publication type given by pk, title or BibTex type, without query.
+    """
+    try:
+        publication_type = type_registry.get(int(type_))
+    except ValueError:
+        publication_type = next((t for t in type_registry.all() if t.title.lower() == type_.lower()), None) \
+                           or type_registry.get_by_bibtex_type(type_)
+    if publication_type is None:
+        raise ValueError('Unknown publication type "{}".'.format(type_))
+    return publication_type
+
+
+def _get_status(status):
+    for s in Publication.EStatuses:
+        if str(status).lower() in (s.value, s.name.lower(), str(s.label).lower()):
+            return s
+    raise ValueError('Unknown status "{}".'.format(status))
+
+
+def filter_publications(publications=None, year=None, type=None, tag=None, author=None, catalog=None, status=None,
+                        order=DEFAULT_ORDER, limit=None, offset=None, external=False):
+    """
+    Filter, order and slice publications with a single query. Publications of hidden types are always excluded.
+
+    Parameters
+    ----------
+    publications : QuerySet
+        Publications to filter, all of them by default.
+    year : int or str
+        Year, or range of years such as '2010-2014', '2010-' or '-2014'.
+    type : int or str
+        Publication type, by pk, title or BibTex type.
+    tag : str
+        One of the tags of the publications.
+    author : str
+        Part of the name of one of the authors, case-insensitive.
+    catalog : int or str
+        Catalog, by pk or title.
+    status : str
+        Status, by value or name, e.g. 'p' or 'published'.
+    order : str
+        Comma-separated fields, among `ORDER_FIELDS`, prefixed with '-' for descending order.
+    limit : int
+        Maximal number of publications, non-negative.
+    offset : int
+        Number of publications skipped, non-negative.
+    external : bool or None
+        Whether to get external publications, or None for all of them.
+
+    Returns
+    -------
+    QuerySet
+
+    Raises
+    ------
+    ValueError
+        If an argument is invalid.
+    """
+    if publications is None:
+        publications = Publication.objects.all()
+    publications = publications.filter(type__hidden=False)
+    if external is not None:
+        publications = publications.filter(external=external)
+    if year not in (None, ''):
+        first, last = _year_range(year)
+        if first is not None:
+            publications = publications.filter(year__gte=first)
+        if last is not None:
+            publications = publications.filter(year__lte=last)
+    if type not in (None, ''):
+        publications = publications.filter(type_id=_get_type(type).pk)
+    if tag:
+        # Tags are stored lowercase and separated by ', '
+        tag = tag.lower().strip()
+        publications = publications.filter(Q(tags__iexact=tag) | Q(tags__istartswith=tag + ', ') |
+                                           Q(tags__iendswith=', ' + tag) | Q(tags__icontains=', ' + tag + ', '))
+    if author:
+        publications = publications.filter(authors__icontains=author)
+    if catalog not in (None, ''):
+        try:
+            publications = publications.filter(catalog__pk=int(catalog))
+        except ValueError:
+            publications = publications.filter(catalog__title__iexact=catalog)
+    if status:
+        publications = publications.filter(status=_get_status(status))
+
+    fields = [field.strip() for field in (order or DEFAULT_ORDER).split(',') if field.strip()]
+    for field in fields:
+        if field.lstrip('-') not in ORDER_FIELDS:
+            raise ValueError('Invalid order "{}", expected fields among: {}.'.format(field, ', '.join(ORDER_FIELDS)))
+    publications = publications.order_by(*fields)
+
+    offset = int(offset or 0)
+    if offset < 0:
+        raise ValueError('Invalid offset "{}", expected a non-negative integer.'.format(offset))
+    if limit not in (None, ''):
+        limit = int(limit)
+        if limit < 0:
+            raise ValueError('Invalid limit "{}", expected a non-negative integer.'.format(limit))
+        publications = publications[offset:offset + limit]
+    elif offset:
+        publications = publications[offset:]
+    return publications
+
+
+def year_counts(publications):
+    """
+    Count publications by year with a single aggregate query.
+
+    Parameters
+    ----------
+    publications : QuerySet
+
+    Returns
+    -------
+    list of tuple
+        Years and their number of publications, latest year first.
+    """
+    return list(publications.order_by().values_list('year').annotate(count=Count('id')).order_by('-year'))
+
+
+def get_year_archive(by_type=False):
+    """
+    Years of the publications listed by `by_year`, with their number of publications, computed with a single
+    aggregate query and cached until a publication or a type is changed.
+
+    Parameters
+    ----------
+    by_type : bool
+        Whether to also count the publications of each type, in the order of the types.
+
+    Returns
+    -------
+    list of dict
+        Years, latest first, as dicts with the keys `year`, `count` and, by type, `types`: a list of dicts with the
+        keys `id`, `title`, `description` and `count`.
+    """
+
+    def compute():
+        publications = filter_publications()
+        if not by_type:
+            return [{'year': year, 'count': count} for year, count in year_counts(publications)]
+        order = {t.pk: i for i, t in enumerate(type_registry.all())}
+        rows = publications.order_by().values_list('year', 'type_id').annotate(count=Count('id')).order_by('-year')
+        archive = []
+        for year, group in groupby(rows, key=itemgetter(0)):
+            types = []
+            for _, type_id, count in sorted(group, key=lambda row: order.get(row[1], len(order))):
+                publication_type = type_registry.get(type_id)
+                types.append({'id': type_id, 'title': publication_type.title,
+                              'description': publication_type.description, 'count': count})
+            archive.append({'year': year, 'count': sum(t['count'] for t in types), 'types': types})
+        return archive
+
+    return cached('year_archive', (bool(by_type),), [PUBLICATIONS], compute)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Dry-run validation of bibliography entries before an import.
+
+The per-entry checks only rely on plain lookup tables, so that they can run in worker processes without database
+access. Conflicts with existing publications are then checked in the main process with batched queries.
+"""
+
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# number of entries validated at once by a worker
+CHUNK_SIZE = 1000
+
+# number of values looked up at once in the database, below the limit of variables of SQLite
+QUERY_BATCH_SIZE = 500
+
+# fields which must be unique among all publications, mapped to the corresponding key of the BibTex entries
+UNIQUE_FIELDS = (('citekey', 'key'), ('doi', 'doi'), ('isbn', 'isbn'))
+
+# fields unique ignoring case, mapped to the column of their lowercase values
+CASE_INSENSITIVE_FIELDS = {'citekey': 'citekey_lower'}
+
+
+def _validate_entry(entry, lookups):
+    errors = []
+    warnings = []
+    for key in ['title', 'author', 'year']:
+        if not entry.get(key):
+            errors.append('Missing key <{}>.'.format(key))
+    if entry.get('year'):
+        try:
+            int(entry['year'])
+        except ValueError:
+            errors.append('Invalid year "{}".'.format(entry['year']))
+    if entry.get('type', '').lower() not in lookups['types']:
+        errors.append('Type "{}" unknown.'.format(entry.get('type', '')))
+    month = entry.get('month', '')
+    if month and month.lower() not in lookups['months']:
+        warnings.append('Invalid month "{}" will be ignored.'.format(month))
+    country = entry.get('country', '')
+    if country and country.strip() not in lookups['countries_by_name'] \
+            and country.upper() not in lookups['countries_by_code']:
+        warnings.append('Unknown country "{}" will be ignored.'.format(country))
+    return errors, warnings
+
+
+def _validate_chunk(start, entries, lookups):
+    reports = []
+    for index, entry in enumerate(entries, start):
+        errors, warnings = _validate_entry(entry, lookups)
+        reports.append({
+            'index': index,
+            'key': entry.get('key', ''),
+            'type': entry.get('type', ''),
+            'title': entry.get('title', ''),
+            'errors': errors,
+            'warnings': warnings,
+            'unique': {field: entry.get(key, '').strip() or None for field, key in UNIQUE_FIELDS},
+        })
+    return reports
+
+
+def _chunks(entries, chunk_size):
+    entries = iter(entries)
+    start = 0
+    while True:
+        chunk = list(islice(entries, chunk_size))
+        if not chunk:
+            break
+        yield start, chunk
+        start += len(chunk)
+
+
+def _validate_entries(entries, lookups, workers, chunk_size):
+    if workers <= 1:
+        for start, chunk in _chunks(entries, chunk_size):
+            for report in _validate_chunk(start, chunk, lookups):
+                yield report
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for start, chunk in _chunks(entries, chunk_size):
+            pending.append(executor.submit(_validate_chunk, start, chunk, lookups))
+            # bound the number of chunks held in memory, results are yielded in order
+            if len(pending) >= 2 * workers:
+                for report in pending.pop(0).result():
+                    yield report
+        for future in pending:
+            for report in future.result():
+                yield report
+
+
+def _check_unique(reports):
+    """
+    Flags entries whose unique values are repeated within the bibliography or already used by a publication.
+    """
+    from .models import Publication
+
+    for field, _ in UNIQUE_FIELDS:
+        column = CASE_INSENSITIVE_FIELDS.get(field, field)
+        indexes = defaultdict(list)
+        for report in reports:
+            value = report['unique'][field]
+            if value is not None:
+                indexes[value.lower() if column != field else value].append(report)
+
+        for duplicates in indexes.values():
+            for report in duplicates[1:]:
+                report['errors'].append('Duplicate {} "{}", already used by entry #{}.'.format(
+                    field, report['unique'][field], duplicates[0]['index'] + 1))
+
+        values = list(indexes.keys())
+        for i in range(0, len(values), QUERY_BATCH_SIZE):
+            batch = values[i:i + QUERY_BATCH_SIZE]
+            existing = Publication.objects.filter(**{column + '__in': batch}).values_list(column, flat=True)
+            for value in existing:
+                for report in indexes[value]:
+                    report['errors'].append('A publication with {} "{}" already exists.'.format(
+                        field, report['unique'][field]))
+
+
+def validate(entries, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Validates BibTex entries without writing anything to the database.
+
+    Parameters
+    ----------
+    entries : iterable
+        Entries, as returned by `bibtex.parse` or the parsers of `importers`.
+    workers : int
+        Number of worker processes, defaults to the number of CPUs. Entries are validated in the current process if
+        lower than 2.
+    chunk_size : int
+        Number of entries sent to a worker at once.
+
+    Returns
+    -------
+    list
+        One report per entry, in order, as a dict with the keys `index`, `key`, `type`, `title`, `errors` and
+        `warnings`. An entry with errors can not be imported, warnings report values which would be ignored.
+    """
+    from .importers import COUNTRIES_BY_CODE, COUNTRIES_BY_NAME, MONTHS
+    from .registry import type_registry
+
+    lookups = {
+        'types': set(type_registry.bibtex_type_index()),
+        'months': set(MONTHS),
+        'countries_by_name': set(COUNTRIES_BY_NAME),
+        'countries_by_code': set(COUNTRIES_BY_CODE),
+    }
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    reports = list(_validate_entries(entries, lookups, workers, chunk_size))
+    _check_unique(reports)
+    for report in reports:
+        del report['unique']
+    return reports
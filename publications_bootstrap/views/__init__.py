@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 
-from .author import by_author
+from .author import author_autocomplete, author_directory, by_author
 from .id import by_id
 from .tag import by_tag
 from .catalog import for_catalog
+from .download import download
+from .facets import facets
+from .filter import by_filters
 from .unapi import by_unapi
-from .year import by_year
+from .year import by_year, year_archive
@@ -3,12 +3,26 @@
 from collections import defaultdict
 from string import capwords
 
+from django.http import JsonResponse
 from django.shortcuts import render
 
+try:
+    from django.urls import reverse  # Django 1.10+
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+from ..caching import PUBLICATIONS, cache_view
+from ..exports import render_export
+from ..authors import author_index
 from ..models import Type, Publication
 from ..utils import populate
 
+# Default and maximal number of authors suggested by `author_autocomplete`
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
 
+@cache_view(PUBLICATIONS)
 def by_author(request, name):
     fullname = capwords(name.replace('+', ' '))
     fullname = fullname.replace(' Von ', ' von ').replace(' Van ', ' van ')
@@ -65,27 +79,27 @@ def by_author(request, name):
         t.publications = publications_by_type[t.id]
 
     if 'plain' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.txt', {'publications': publications},
-                      content_type='text/plain; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.txt', {'publications': publications},
+                             content_type='text/plain; charset=UTF-8')
 
     if 'bibtex' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.bib', {'publications': publications},
-                      content_type='text/x-bibtex; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.bib', {'publications': publications},
+                             content_type='text/x-bibtex; charset=UTF-8')
 
     if 'mods' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.mods', {'publications': publications},
-                      content_type='application/xml; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.mods', {'publications': publications},
+                             content_type='application/xml; charset=UTF-8')
 
     if 'ris' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.ris', {'publications': publications},
-                      content_type='application/x-research-info-systems; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.ris', {'publications': publications},
+                             content_type='application/x-research-info-systems; charset=UTF-8')
 
     if 'rss' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.rss',
-                      {'url': 'http://' + request.get_host() + request.path,
-                       'author': fullname,
-                       'publications': publications
-                       }, content_type='application/rss+xml; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.rss',
+                             {'url': 'http://' + request.get_host() + request.path,
+                              'author': fullname,
+                              'publications': publications
+                              }, content_type='application/rss+xml; charset=UTF-8')
 
     # load custom links and files
     populate(publications)
@@ -93,3 +107,42 @@ def by_author(request, name):
     return render(request, 'publications_bootstrap/pages/author.html', {'publications': publications,
                                                                         'types': types,
                                                                         'author': fullname})
+
+
+@cache_view(PUBLICATIONS)
+def author_directory(request):
+    """
+    Lists the authors, optionally those whose name (family name first) starts with the `q` parameter, grouped by the
+    initial of their family name.
+    """
+    query = request.GET.get('q', '')
+    authors = author_index.search(query) if query else author_index.all()
+    initials = []
+    for author in authors:
+        initial = author.key[:1].upper()
+        if not initials or initials[-1][0] != initial:
+            initials.append((initial, []))
+        initials[-1][1].append(author)
+
+    return render(request, 'publications_bootstrap/pages/authors.html', {'initials': initials,
+                                                                         'authors': authors,
+                                                                         'query': query})
+
+
+@cache_view(PUBLICATIONS)
+def author_autocomplete(request):
+    """
+    Suggests the authors whose name (family name first) starts with the `q` parameter, as JSON.
+    """
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    query = request.GET.get('q', '')
+    authors = author_index.search(query, max(limit, 0)) if query.strip() else []
+
+    return JsonResponse({'authors': [{
+        'name': author.name,
+        'count': author.count,
+        'url': reverse('publications_bootstrap:author', args=[author.slug]),
+    } for author in authors]})
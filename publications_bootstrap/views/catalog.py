@@ -2,10 +2,13 @@
 
 from django.shortcuts import render
 
+from ..caching import CATALOGS, PUBLICATIONS, cache_view, catalog_version
+from ..exports import render_export
 from ..models import Catalog
 from ..utils import populate
 
 
+@cache_view(PUBLICATIONS, CATALOGS, lambda title: [catalog_version(title)])
 def for_catalog(request, title):
     try:
         catalog = Catalog.objects.get(title__iexact=title)
@@ -14,23 +17,24 @@ def for_catalog(request, title):
         publications = publications.order_by('-year', '-month', '-id')
 
         if 'plain' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.txt', {'publications': publications},
-                          content_type='text/plain; charset=UTF-8')
+            return render_export(request, 'publications_bootstrap/export/publications.txt',
+                                 {'publications': publications}, content_type='text/plain; charset=UTF-8')
 
         if 'bibtex' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.bib', {'publications': publications},
-                          content_type='text/x-bibtex; charset=UTF-8')
+            return render_export(request, 'publications_bootstrap/export/publications.bib',
+                                 {'publications': publications}, content_type='text/x-bibtex; charset=UTF-8')
 
         if 'mods' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.mods', {'publications': publications},
-                          content_type='application/xml; charset=UTF-8')
+            return render_export(request, 'publications_bootstrap/export/publications.mods',
+                                 {'publications': publications}, content_type='application/xml; charset=UTF-8')
 
         if 'ris' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.ris', {'publications': publications},
-                          content_type='application/x-research-info-systems; charset=UTF-8')
+            return render_export(request, 'publications_bootstrap/export/publications.ris',
+                                 {'publications': publications},
+                                 content_type='application/x-research-info-systems; charset=UTF-8')
 
         if 'rss' in request.GET:
-            return render(request, 'publications_bootstrap/export/publications.rss', {
+            return render_export(request, 'publications_bootstrap/export/publications.rss', {
                 'url': 'http://' + request.get_host() + request.path,
                 'publications': publications
             }, content_type='application/rss+xml; charset=UTF-8')
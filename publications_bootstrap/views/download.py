@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+from django.shortcuts import render
+
+from ..downloads import has_permission, send_publication_file
+from ..models import Publication, PublicationFile
+
+
+def _error(request, message, status):
+    return render(request, 'publications_bootstrap/base.html', {
+        'error': True,
+        'alert': {'message': message}},
+                  status=status)
+
+
+def download(request, publication_id, file_id=None):
+    """
+    Delivers the PDF of a publication, or one of its files, once the request is authorized, see
+    `downloads.file_response`.
+    """
+    try:
+        publication = Publication.objects.get(pk=publication_id)
+        file = publication.publicationfile_set.get(pk=file_id) if file_id else None
+    except (Publication.DoesNotExist, PublicationFile.DoesNotExist):
+        return _error(request, "There is no such file for the publication with this id: {}".format(publication_id),
+                      404)
+
+    if not has_permission(request, publication, file):
+        return _error(request, "You are not allowed to download this file.", 403)
+
+    response = send_publication_file(request, publication, file)
+    if response is None:
+        return _error(request, "There is no such file for the publication with this id: {}".format(publication_id),
+                      404)
+    return response
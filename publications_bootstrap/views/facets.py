@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+from django.http import JsonResponse
+
+from ..caching import CATALOGS, CATALOG_PUBLICATIONS, PUBLICATIONS, cache_view
+from ..facets import FACET_LIMIT, FACETS, get_facets
+
+# Parameters filtering the publications whose facets are counted
+FILTERS = ('year', 'type', 'tag', 'author', 'catalog', 'status')
+
+
+@cache_view(PUBLICATIONS, CATALOGS, CATALOG_PUBLICATIONS)
+def facets(request):
+    """
+    Counts of the publications matching the filters given as parameters, by value of each facet, as JSON.
+
+    The `facets` parameter selects some of the facets, separated by commas, and `limit` the number of values of the tag
+    and author facets.
+    """
+    filters = {name: request.GET[name] for name in FILTERS if request.GET.get(name)}
+    try:
+        names = [name.strip() for name in request.GET['facets'].split(',')] if request.GET.get('facets') else FACETS
+        limit = int(request.GET.get('limit', FACET_LIMIT))
+        return JsonResponse(get_facets(names, max(limit, 0), **filters))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+from django.http import JsonResponse
+from django.shortcuts import render
+
+try:
+    from django.urls import reverse  # Django 1.10+
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+from ..caching import CATALOGS, CATALOG_PUBLICATIONS, PUBLICATIONS, cache_view
+from ..exports import render_export
+from ..models import Publication
+from ..utils import DEFAULT_ORDER, filter_publications, populate
+
+# Parameters filtering the publications, as given to `filter_publications`
+FILTERS = ('year', 'type', 'tag', 'author', 'catalog', 'status')
+
+
+def _as_json(publication):
+    return {
+        'id': publication.pk,
+        'citekey': publication.citekey,
+        'type': publication.type.title,
+        'title': publication.title,
+        'authors': publication.authors_list,
+        'year': publication.year,
+        'month': publication.month.value if publication.month else None,
+        'journal': publication.journal,
+        'book_title': publication.book_title,
+        'publisher': publication.publisher,
+        'volume': publication.volume,
+        'number': publication.number,
+        'pages': publication.pages,
+        'doi': publication.doi,
+        'url': publication.url,
+        'tags': [tag for tag in publication.tags.split(', ') if tag],
+        'link': reverse('publications_bootstrap:id', args=[publication.pk]),
+    }
+
+
+@cache_view(PUBLICATIONS, CATALOGS, CATALOG_PUBLICATIONS)
+def by_filters(request):
+    """
+    Publications matching all the given criteria: `year` (or range of years such as `2018-`), `type`, `tag`, `author`,
+    `catalog` and `status`, ordered by `order` and sliced by `limit` and `offset`, see `filter_publications`.
+    """
+    filters = {name: request.GET[name] for name in FILTERS if request.GET.get(name)}
+    order = request.GET.get('order') or DEFAULT_ORDER
+    try:
+        publications = filter_publications(Publication.objects.select_related('type'), order=order,
+                                           limit=request.GET.get('limit'), offset=request.GET.get('offset'),
+                                           **filters)
+        if 'json' in request.GET:
+            count = filter_publications(**filters).count()
+    except ValueError as e:
+        if 'json' in request.GET:
+            return JsonResponse({'error': str(e)}, status=400)
+        return render(request, 'publications_bootstrap/base.html', {
+            'error': True,
+            'alert': {'message': str(e)}},
+                      status=400)
+
+    if 'json' in request.GET:
+        return JsonResponse({'count': count, 'publications': [_as_json(p) for p in publications]})
+
+    if 'plain' in request.GET:
+        return render_export(request, 'publications_bootstrap/export/publications.txt', {'publications': publications},
+                             content_type='text/plain; charset=UTF-8')
+
+    if 'bibtex' in request.GET:
+        return render_export(request, 'publications_bootstrap/export/publications.bib', {'publications': publications},
+                             content_type='text/x-bibtex; charset=UTF-8')
+
+    if 'mods' in request.GET:
+        return render_export(request, 'publications_bootstrap/export/publications.mods', {'publications': publications},
+                             content_type='application/xml; charset=UTF-8')
+
+    if 'ris' in request.GET:
+        return render_export(request, 'publications_bootstrap/export/publications.ris', {'publications': publications},
+                             content_type='application/x-research-info-systems; charset=UTF-8')
+
+    if 'rss' in request.GET:
+        return render_export(request, 'publications_bootstrap/export/publications.rss', {
+            'url': 'http://' + request.get_host() + request.get_full_path(),
+            'publications': publications
+        }, content_type='application/rss+xml; charset=UTF-8')
+
+    # load custom links and files, of the sliced publications, which cannot be a subquery with LIMIT on MySQL
+    publications = list(publications)
+    populate(publications)
+
+    return render(request, 'publications_bootstrap/pages/filter.html', {
+        'publications': publications,
+        'filters': filters,
+        'title': "publications for {}".format(', '.join('{} {}'.format(k, v) for k, v in sorted(filters.items())))
+        if filters else None})
@@ -2,9 +2,11 @@
 
 from django.shortcuts import render
 
+from ..caching import PUBLICATIONS, cache_view
 from ..models import Publication
 
 
+@cache_view(PUBLICATIONS)
 def by_id(request, publication_id):
     try:
         publication = Publication.objects.get(pk=publication_id)
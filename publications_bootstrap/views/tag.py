@@ -2,10 +2,13 @@
 
 from django.shortcuts import render
 
+from ..caching import PUBLICATIONS, cache_view
+from ..exports import render_export
 from ..models import Publication
 from ..utils import populate
 
 
+@cache_view(PUBLICATIONS)
 def by_tag(request, tag):
     tag = tag.lower().replace(' ', '+')
     candidates = Publication.objects.filter(tags__icontains=tag.split('+')[0], external=False)
@@ -16,20 +19,20 @@ def by_tag(request, tag):
             publications.append(publication)
 
     if 'plain' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.txt', {'publications': publications},
-                      content_type='text/plain; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.txt', {'publications': publications},
+                             content_type='text/plain; charset=UTF-8')
 
     if 'bibtex' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.bib', {'publications': publications},
-                      content_type='text/x-bibtex; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.bib', {'publications': publications},
+                             content_type='text/x-bibtex; charset=UTF-8')
 
     if 'mods' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.mods', {'publications': publications},
-                      content_type='application/xml; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.mods', {'publications': publications},
+                             content_type='application/xml; charset=UTF-8')
 
     if 'ris' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.ris', {'publications': publications},
-                      content_type='application/x-research-info-systems; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.ris', {'publications': publications},
+                             content_type='application/x-research-info-systems; charset=UTF-8')
 
     # load custom links and files
     populate(publications)
@@ -3,9 +3,11 @@
 from django.http import HttpResponse
 from django.shortcuts import render
 
+from ..caching import PUBLICATIONS, cache_view
 from ..models import Publication
 
 
+@cache_view(PUBLICATIONS)
 def by_unapi(request):
     """
     This view implements unAPI 1.0 (see http://unapi.info).
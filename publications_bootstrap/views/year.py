@@ -1,55 +1,71 @@
 # -*- coding: utf-8 -*-
 
+from itertools import groupby
+from operator import attrgetter
+
+from django.http import JsonResponse
 from django.shortcuts import render
 
+try:
+    from django.urls import reverse  # Django 1.10+
+except ImportError:
+    from django.core.urlresolvers import reverse
+
+from ..caching import PUBLICATIONS, cache_view
+from ..exports import render_export
 from ..models import Publication
-from ..utils import populate
+from ..utils import filter_publications, get_year_archive, populate
 
 
+@cache_view(PUBLICATIONS)
 def by_year(request, year=None):
-    years = []
-    publications = Publication.objects.select_related()
-    if year:
-        publications = publications.filter(year=year, external=False)
-    else:
-        publications = publications.filter(external=False)
-    publications = publications.order_by('-year', '-month', '-id')
-
-    for publication in publications:
-        if publication.type.hidden:
-            continue
-        if not years or (years[-1][0] != publication.year):
-            years.append((publication.year, []))
-        years[-1][1].append(publication)
+    # Publications of hidden types are excluded by the query
+    publications = filter_publications(Publication.objects.select_related('type'), year=year)
 
     if 'plain' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.txt',
-                      {'publications': sum([y[1] for y in years], [])},
-                      content_type='text/plain; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.txt',
+                             {'publications': publications},
+                             content_type='text/plain; charset=UTF-8')
 
     if 'bibtex' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.bib',
-                      {'publications': sum([y[1] for y in years], [])},
-                      content_type='text/x-bibtex; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.bib',
+                             {'publications': publications},
+                             content_type='text/x-bibtex; charset=UTF-8')
 
     if 'mods' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.mods',
-                      {'publications': sum([y[1] for y in years], [])},
-                      content_type='application/xml; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.mods',
+                             {'publications': publications},
+                             content_type='application/xml; charset=UTF-8')
 
     if 'ris' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.ris',
-                      {'publications': sum([y[1] for y in years], [])},
-                      content_type='application/x-research-info-systems; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.ris',
+                             {'publications': publications},
+                             content_type='application/x-research-info-systems; charset=UTF-8')
 
     if 'rss' in request.GET:
-        return render(request, 'publications_bootstrap/export/publications.rss',
-                      {'url': 'http://' + request.get_host() + request.path,
-                       'publications': sum([y[1] for y in years], [])},
-                      content_type='application/rss+xml; charset=UTF-8')
+        return render_export(request, 'publications_bootstrap/export/publications.rss',
+                             {'url': 'http://' + request.get_host() + request.path,
+                              'publications': publications},
+                             content_type='application/rss+xml; charset=UTF-8')
 
     # load custom links and files
     populate(publications)
 
-    return render(request, 'publications_bootstrap/pages/years.html', {'publications': publications,
-                                                                       'years': years})
+    # publications are ordered by year first
+    years = [(y, list(group)) for y, group in groupby(publications, key=attrgetter('year'))]
+
+    return render(request, 'publications_bootstrap/pages/years.html', {
+        'publications': publications,
+        'years': years,
+        # counted from the publications fetched, without aggregate query
+        'year_counts': [(y, len(group)) for y, group in years]})
+
+
+@cache_view(PUBLICATIONS)
+def year_archive(request):
+    """
+    Years of the publications with their number of publications as JSON, also by type with the `types` parameter.
+    """
+    years = get_year_archive('types' in request.GET)
+    return JsonResponse({'years': [dict(year, url=reverse('publications_bootstrap:year', args=[year['year']]))
+                                   for year in years]})
@@ -31,11 +31,12 @@ setup(
     long_description=README,
     url=REPO_URL,
     download_url=REPO_URL + 'releases/tag/v' + __version__,
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     include_package_data=True,
+    python_requires='>=3.4',
     install_requires=[
-        'Django>=1.9.13',
-        'Pillow>=2.4.0',
+        'Django>=1.11',
+        'Pillow>=4.2.0',
         'django-countries>=4.0',
         'django-ordered-model>=1.4.1',
         'six>=1.10.0',
@@ -47,18 +48,15 @@ setup(
         'Development Status :: 5 - Production/Stable',
         'Environment :: Web Environment',
         'Framework :: Django',
-        'Framework :: Django :: 1.8',
-        'Framework :: Django :: 1.9',
-        'Framework :: Django :: 1.10',
         'Framework :: Django :: 1.11',
+        'Framework :: Django :: 2.0',
         'Intended Audience :: Developers',
         'Intended Audience :: Science/Research',
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',